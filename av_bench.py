@@ -0,0 +1,365 @@
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import av_log
+from av_bus import CONTROL_COMMANDS, ControlCommands, DataBus
+from av_control import DEFAULT_SETPOINTS, PIDBank
+from av_fusion import SensorFusion
+from av_metrics import MetricsRegistry
+from av_redundancy import STANDBY_MODES
+from av_sm1 import (AvionicsMissionComputer, DataLogger, FlightControlSystem, NavigationSystem, SensorData,
+                    ai_check)
+from av_route import synthetic_grid
+from av_sensor_models import SensorModel
+from av_spatial import SpatialIndex, synthetic_points
+from av_telemetry import TelemetryDownlink, TelemetryReceiver
+from av_validation import SENSOR_VALIDATOR
+
+# Micro and end-to-end benchmarks for the avionics core.
+#
+#   python av_bench.py                          run and print results
+#   python av_bench.py --save bench.json        store a baseline
+#   python av_bench.py --compare bench.json     exit 1 on regressions
+#
+# Timings are the best per-operation time over several repeats, which is the
+# most stable statistic on a shared box. Memory benchmarks report bytes
+# retained per logged sample once a logger has reached steady state.
+
+BENCHMARKS = {}
+
+
+def benchmark(name, unit="ns/op"):
+    def register(fn):
+        BENCHMARKS[name] = (fn, unit)
+        return fn
+    return register
+
+
+def time_per_op(fn, number, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.disable()
+        t0 = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter_ns() - t0
+        gc.enable()
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / number
+
+
+def _sensor(seed=1):
+    sensor = SensorData(seed)
+    sensor.update()
+    return sensor
+
+
+@benchmark("sensor_update")
+def bench_sensor_update(number, repeat):
+    return time_per_op(SensorData(1).update, number, repeat)
+
+
+@benchmark("ai_check_sensor_payload")
+def bench_ai_check(number, repeat):
+    payload = _sensor().__dict__
+    return time_per_op(lambda: ai_check(payload), number, repeat)
+
+
+@benchmark("validator_sensor_payload")
+def bench_validator(number, repeat):
+    payload = _sensor().__dict__
+    return time_per_op(lambda: SENSOR_VALIDATOR(payload), number, repeat)
+
+
+@benchmark("data_logger_log_data")
+def bench_log_data(number, repeat):
+    logger = DataLogger(capacity=4096)
+    sensor = _sensor()
+    return time_per_op(lambda: logger.log_data(sensor), number, repeat)
+
+
+@benchmark("data_logger_validate_window_6000", "ns/window")
+def bench_validate_window(number, repeat):
+    logger = DataLogger(capacity=6000)
+    sensor = SensorData(1)
+    for _ in range(6000):
+        sensor.update()
+        logger.log_data(sensor)
+    return time_per_op(logger.validate_window, max(number // 100, 1), repeat)
+
+
+@benchmark("flight_control_update")
+def bench_flight_control(number, repeat):
+    control = FlightControlSystem()
+    sensor = _sensor()
+    return time_per_op(lambda: control.update(sensor), number, repeat)
+
+
+@benchmark("pid_update_many_1000_aircraft", "ns/step")
+def bench_pid_update_many(number, repeat):
+    bank = PIDBank(1000)
+    setpoints = np.tile(DEFAULT_SETPOINTS, (1000, 1))
+    measured = setpoints + np.random.default_rng(1).normal(0.0, 1.0, setpoints.shape)
+    return time_per_op(lambda: bank.update_many(setpoints, measured, 0.01), max(number // 10, 1), repeat)
+
+
+def _redundant_samples(n, seed=1):
+    # (channels, n) primary and backup samples of one shared flight
+    primary = SensorModel(seed, truth_seed=0)
+    backup = SensorModel(seed + 1, truth_seed=0)
+    return (np.array([primary.next_values() for _ in range(n)]).T,
+            np.array([backup.next_values() for _ in range(n)]).T)
+
+
+@benchmark("sensor_fusion_update")
+def bench_sensor_fusion(number, repeat):
+    primary, backup = _redundant_samples(2)
+    fusion = SensorFusion()
+    fusion.update(primary[:, 0], backup[:, 0])
+    p, b = primary[:, 1].tolist(), backup[:, 1].tolist()
+    return time_per_op(lambda: fusion.update(p, b), number, repeat)
+
+
+@benchmark("sensor_fusion_batch_per_sample", "ns/sample")
+def bench_sensor_fusion_batch(number, repeat):
+    # Offline fusion of ten simulated minutes at 100 Hz
+    primary, backup = _redundant_samples(60000)
+    out = np.empty_like(primary)
+    elapsed = time_per_op(lambda: SensorFusion().fuse_batch(primary, backup, out), 1, repeat)
+    return elapsed / primary.shape[1]
+
+
+@benchmark("navigation_update")
+def bench_navigation(number, repeat):
+    navigation = NavigationSystem()
+    sensor = _sensor()
+    return time_per_op(lambda: navigation.update(sensor), number, repeat)
+
+
+@benchmark("navigation_update_route_graph")
+def bench_navigation_route_graph(number, repeat):
+    # Per-tick cost with a planned route over a 40000 waypoint grid (search excluded)
+    navigation = NavigationSystem(synthetic_grid(200, 200))
+    sensor = _sensor()
+    navigation.update(sensor)
+    return time_per_op(lambda: navigation.update(sensor), number, repeat)
+
+
+@benchmark("spatial_nearest_100k")
+def bench_spatial_nearest(number, repeat):
+    index = SpatialIndex(*synthetic_points(100000))
+    return time_per_op(lambda: index.nearest(20.0, 30.0, 3), max(number // 10, 1), repeat)
+
+
+@benchmark("tick_all_subsystems", "ns/tick")
+def bench_tick(number, repeat):
+    # One step of every mission computer task, in TASK_PERIODS order
+    computer = AvionicsMissionComputer(seed=1, clock=time.monotonic)
+    steps = [getattr(computer, name + "_step") for name in computer.TASK_PERIODS if name != "task_metrics"]
+
+    def tick():
+        for step in steps:
+            step()
+    try:
+        return time_per_op(tick, max(number // 10, 1), repeat)
+    finally:
+        computer.stop()
+
+
+def _standby_cost(mode):
+    # Backup task cost per tick while the primary is healthy
+    def bench(number, repeat):
+        computer = AvionicsMissionComputer(seed=1, clock=time.monotonic, standby=mode)
+        try:
+            return time_per_op(computer.backup_sensor_data_step, number, repeat)
+        finally:
+            computer.stop()
+    return bench
+
+
+def _failover_latency(mode):
+    # Handover time from fault detection to the backup's first sample, best of `repeat` failovers
+    def bench(number, repeat):
+        best = None
+        for _ in range(repeat):
+            computer = AvionicsMissionComputer(seed=1, clock=time.monotonic, standby=mode)
+            try:
+                for _ in range(1000):
+                    computer.backup_sensor_data_step()
+                    computer.sensor_data_step()
+                computer.sensor_redundancy.inject_fault("primary")
+                computer.sensor_data_step()
+            finally:
+                computer.stop()
+            latency = computer.sensor_redundancy.history[-1].switchover_latency * 1e9
+            best = latency if best is None else min(best, latency)
+        return best
+    return bench
+
+
+for _mode in STANDBY_MODES:
+    benchmark(f"standby_{_mode}_backup_step", "ns/tick")(_standby_cost(_mode))
+    benchmark(f"failover_{_mode}_switchover", "ns")(_failover_latency(_mode))
+
+
+@benchmark("bus_publish_to_subscriber")
+def bench_bus_publish(number, repeat):
+    # One message to a queued subscriber (its oldest entries are shed), excluding the consumer
+    bus = DataBus()
+    bus.subscribe(CONTROL_COMMANDS, capacity=64)
+    message = ControlCommands(0.0, 0.0, 0.0, 0.0, 0.5)
+    return time_per_op(lambda: bus.publish(CONTROL_COMMANDS, message), number, repeat)
+
+
+def _downlink_frames(capacity):
+    # Loopback downlink (the undrained receiver lets the kernel drop overflow) and one frame to send
+    computer = AvionicsMissionComputer(seed=1, clock=time.monotonic)
+    try:
+        computer.sensor_data_step()
+    finally:
+        computer.stop()
+    receiver = TelemetryReceiver(("127.0.0.1", 0))
+    return receiver, TelemetryDownlink(receiver.address, capacity=capacity), computer.sensor_frames.read()
+
+
+@benchmark("telemetry_enqueue_frame")
+def bench_telemetry_enqueue(number, repeat):
+    # Cost to the producing task; encoding and sending happen on the sender thread
+    receiver, downlink, frame = _downlink_frames(number * repeat)
+    elapsed = time_per_op(lambda: downlink.send_frame(frame), number, repeat)
+    downlink.close()
+    receiver.close()
+    return elapsed
+
+
+@benchmark("telemetry_flush_per_frame", "ns/frame")
+def bench_telemetry_flush(number, repeat):
+    # Encoding plus datagram sends, per frame
+    receiver, downlink, frame = _downlink_frames(number)
+    best = None
+    for _ in range(repeat):
+        for _ in range(number):
+            downlink.send_frame(frame)
+        t0 = time.perf_counter_ns()
+        downlink.flush()
+        elapsed = time.perf_counter_ns() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    downlink.close()
+    receiver.close()
+    return best / number
+
+
+@benchmark("metrics_snapshot", "ns/snapshot")
+def bench_metrics_snapshot(number, repeat):
+    # Collect and render every mission computer metric, as the snapshot thread does
+    computer = AvionicsMissionComputer(seed=1, clock=time.monotonic)
+    registry = MetricsRegistry()
+    computer.register_metrics(registry)
+    try:
+        for name in computer.TASK_PERIODS:
+            if name != "task_metrics":
+                computer.timed_step(name)()
+        return time_per_op(registry.collect, max(number // 100, 1), repeat)
+    finally:
+        computer.stop()
+
+
+@benchmark("data_logger_retained_bytes_per_sample", "bytes/sample")
+def bench_logger_memory(number, repeat):
+    # Memory growth between two points after the ring buffer has wrapped.
+    # Tracing starts before the warm-up so memory freed later is accounted for.
+    tracemalloc.start()
+    logger = DataLogger(capacity=1000)
+    sensor = _sensor()
+    for _ in range(2000):
+        logger.log_data(sensor)
+    before = tracemalloc.get_traced_memory()[0]
+    samples = max(number, 10000)
+    for _ in range(samples):
+        logger.log_data(sensor)
+    growth = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return max(growth, 0) / samples
+
+
+def run(selected=None, number=20000, repeat=5):
+    av_log.configure(level="OFF")
+    results = {}
+    for name, (fn, unit) in BENCHMARKS.items():
+        if selected and not any(pattern in name for pattern in selected):
+            continue
+        results[name] = {"value": fn(number, repeat), "unit": unit}
+    av_log.shutdown()
+    return results
+
+
+def environment():
+    return {
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def compare(results, baseline, threshold, slack=1.0):
+    # A result regresses when it exceeds baseline * (1 + threshold) + slack;
+    # slack keeps near-zero memory figures from flagging on noise
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        limit = reference["value"] * (1.0 + threshold) + slack
+        if result["value"] > limit:
+            regressions.append((name, reference["value"], result["value"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Avionics core benchmarks")
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="compare against a JSON baseline, exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown (default 0.25)")
+    parser.add_argument("--filter", action="append", help="only run benchmarks containing this text")
+    parser.add_argument("--number", type=int, default=20000, help="operations per repeat")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.number, args.repeat)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    for name, result in results.items():
+        line = f"{name:42s} {result['value']:14.1f} {result['unit']}"
+        if baseline is not None and name in baseline.get("results", {}):
+            reference = baseline["results"][name]["value"]
+            if reference:
+                line += f"   ({(result['value'] / reference - 1.0) * 100:+.1f}% vs baseline)"
+        print(line)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for name, reference, value in regressions:
+            print(f"REGRESSION {name}: {value:.1f} > {reference:.1f} (threshold {args.threshold:.0%})")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+import threading
+from collections import deque, namedtuple
+
+from av_control import CONTROL_AXES
+from av_frames import SensorFrame, capture_frame, frame_from_values
+from av_log import get_logger
+
+# In-process publish/subscribe data bus between the avionics subsystems.
+#
+# Each topic carries one message type and caches its latest message, so a
+# consumer can always read current state without waiting. Messages are
+# immutable tuples handed to every consumer by reference: nothing is copied
+# on delivery, and no consumer can change what another one sees. Consumers
+# attach in one of three ways:
+#   read / read_newer   latest value, for periodic tasks that want the
+#                       newest state and skip the rest
+#   listen              callback on the publishing thread; must be quick.
+#                       One that raises is counted, logged and skipped
+#   subscribe           bounded queue per consumer across any set of
+#                       topics. A full queue drops its oldest message (and
+#                       counts it), so a slow consumer never holds up the
+#                       publisher. get() sleeps until a message arrives.
+# A topic has a single publisher, which is what keeps it lock-free for readers.
+# Attaching and detaching consumers swaps copy-on-write tuples under the
+# topic's lock, so publish() itself never takes it.
+
+log_bus = get_logger("bus")
+
+SENSOR_FRAMES = "sensor_frames"
+CONTROL_COMMANDS = "control_commands"
+ROUTE = "route"
+POWER_STATUS = "power_status"
+THREAT_LEVEL = "threat_level"
+BITE_RESULTS = "bite_results"
+ATTITUDE = "attitude"
+
+ControlCommands = namedtuple("ControlCommands", ("timestamp",) + CONTROL_AXES)
+RouteUpdate = namedtuple("RouteUpdate", ("timestamp", "waypoints"))
+PowerStatus = namedtuple("PowerStatus", ("timestamp", "battery_level", "power_consumption"))
+ThreatLevel = namedtuple("ThreatLevel", ("timestamp", "level"))
+BiteResult = namedtuple("BiteResult", ("timestamp", "status"))
+# Fused roll, pitch and heading in degrees
+Attitude = namedtuple("Attitude", ("timestamp", "roll", "pitch", "heading"))
+
+# Topic name -> message type
+TOPIC_TYPES = {
+    SENSOR_FRAMES: SensorFrame,
+    CONTROL_COMMANDS: ControlCommands,
+    ROUTE: RouteUpdate,
+    POWER_STATUS: PowerStatus,
+    THREAT_LEVEL: ThreatLevel,
+    BITE_RESULTS: BiteResult,
+    ATTITUDE: Attitude,
+}
+
+
+class Topic:
+    def __init__(self, name, message_type=object):
+        self.name = name
+        self.type = message_type
+        self.seq = 0
+        # (seq, message), swapped as one reference so readers need no lock
+        self._latest = None
+        # Callbacks that raised during publish()
+        self.listener_errors = 0
+        self._listeners = ()
+        self._subscriptions = ()
+        # Serialises changes to _listeners and _subscriptions
+        self._lock = threading.Lock()
+
+    def publish(self, message):
+        if not isinstance(message, self.type):
+            raise TypeError(f"topic {self.name} carries {self.type.__name__}, not {type(message).__name__}")
+        seq = self.seq + 1
+        self._latest = (seq, message)
+        self.seq = seq
+        for listener in self._listeners:
+            try:
+                listener(message)
+            except Exception as e:
+                self.listener_errors += 1
+                log_bus.error("Listener on {} failed: {}", self.name, e)
+        for subscription in self._subscriptions:
+            subscription.put(self.name, message)
+        return message
+
+    def subscribe(self, listener):
+        # Copy-on-write so publish() can iterate without a lock
+        with self._lock:
+            self._listeners = self._listeners + (listener,)
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            self._listeners = tuple(l for l in self._listeners if l is not listener)
+
+    def attach(self, subscription):
+        with self._lock:
+            self._subscriptions = self._subscriptions + (subscription,)
+
+    def detach(self, subscription):
+        with self._lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+
+    def read(self):
+        # Latest message, or None before the first publication
+        latest = self._latest
+        return None if latest is None else latest[1]
+
+    def read_newer(self, seq):
+        # Latest message if it was published after publication `seq`, otherwise None
+        latest = self._latest
+        if latest is None or latest[0] <= seq:
+            return None
+        return latest[1]
+
+    def read_since(self, seq):
+        # (seq, message) for read_newer() callers that track the topic's own count
+        latest = self._latest
+        if latest is None or latest[0] <= seq:
+            return None
+        return latest
+
+
+# Single-writer publication channel for sensor frames
+# The writer never mutates a published frame, it builds a new one and swaps the
+# reference. A reference store is atomic, so readers always get one complete
+# frame without taking a lock, and frame.seq tells them whether it is new.
+class FrameChannel(Topic):
+    def __init__(self, name=SENSOR_FRAMES):
+        super().__init__(name, SensorFrame)
+
+    def publish_sensor(self, sensor_data, timestamp):
+        return self.publish(capture_frame(sensor_data, self.seq + 1, timestamp))
+
+    def publish_values(self, timestamp, values):
+        return self.publish(frame_from_values(self.seq + 1, timestamp, values))
+
+
+# One consumer's bounded queue of (topic name, message)
+class Subscription:
+    def __init__(self, topics, capacity=64):
+        self.topics = topics
+        self.capacity = capacity
+        self.received = 0
+        self.dropped = 0
+        # Messages a consume() handler raised on
+        self.errors = 0
+        self.closed = False
+        # Consumers asleep in get(); publishers only notify when there are any
+        self._waiting = 0
+        self._queue = deque(maxlen=capacity)
+        self._cond = threading.Condition(threading.Lock())
+
+    def put(self, name, message):
+        # Publisher side; never blocks beyond the queue's own lock
+        with self._cond:
+            if len(self._queue) == self.capacity:
+                self.dropped += 1
+            self._queue.append((name, message))
+            self.received += 1
+            if self._waiting:
+                self._cond.notify()
+
+    def get(self, timeout=None):
+        # Next (topic name, message), sleeping until one arrives; None on
+        # timeout or once the subscription is closed and empty
+        with self._cond:
+            if not self._queue and not self.closed:
+                self._waiting += 1
+                try:
+                    self._cond.wait_for(self._ready, timeout)
+                finally:
+                    self._waiting -= 1
+            return self._queue.popleft() if self._queue else None
+
+    def _ready(self):
+        return self._queue or self.closed
+
+    def poll(self):
+        with self._cond:
+            return self._queue.popleft() if self._queue else None
+
+    def drain(self):
+        # Everything queued, oldest first
+        with self._cond:
+            items = list(self._queue)
+            self._queue.clear()
+        return items
+
+    def close(self):
+        for topic in self.topics:
+            topic.detach(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def __iter__(self):
+        # Messages until close()
+        while True:
+            item = self.get()
+            if item is None:
+                return
+            yield item
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DataBus:
+    def __init__(self, topics=None):
+        self.topics = {}
+        for name, message_type in (TOPIC_TYPES if topics is None else topics).items():
+            self.add(FrameChannel(name) if message_type is SensorFrame else Topic(name, message_type))
+        self._consumers = []
+
+    def add(self, topic):
+        if topic.name in self.topics:
+            raise ValueError(f"topic {topic.name} already exists")
+        self.topics[topic.name] = topic
+        return topic
+
+    def topic(self, name):
+        return self.topics[name]
+
+    def publish(self, name, message):
+        return self.topics[name].publish(message)
+
+    def latest(self, name):
+        return self.topics[name].read()
+
+    def listen(self, name, listener):
+        self.topics[name].subscribe(listener)
+
+    def unlisten(self, name, listener):
+        self.topics[name].unsubscribe(listener)
+
+    def subscribe(self, names, capacity=64, latest=True):
+        # Queued subscription to one topic name or several; with `latest`, the
+        # queue starts with each topic's cached message so a new consumer
+        # begins from current state
+        if isinstance(names, str):
+            names = (names,)
+        topics = [self.topics[name] for name in names]
+        subscription = Subscription(topics, capacity)
+        for topic in topics:
+            if latest and topic.read() is not None:
+                subscription.put(topic.name, topic.read())
+            topic.attach(subscription)
+        return subscription
+
+    def consume(self, names, handler, capacity=64, latest=True, name=None):
+        # Runs handler(topic name, message) on a daemon thread that sleeps
+        # until new data arrives; returns the subscription, close() ends it.
+        # A message the handler raises on is counted, logged and skipped.
+        subscription = self.subscribe(names, capacity, latest)
+        thread_name = name or f"av-bus-{len(self._consumers)}"
+
+        def run():
+            for topic_name, message in subscription:
+                try:
+                    handler(topic_name, message)
+                except Exception as e:
+                    subscription.errors += 1
+                    log_bus.error("Bus consumer {} failed on {}: {}", thread_name, topic_name, e)
+        thread = threading.Thread(target=run, name=thread_name, daemon=True)
+        self._consumers.append((subscription, thread))
+        thread.start()
+        return subscription
+
+    def close(self, timeout=1.0):
+        # Ends every consume() thread after the message it is handling
+        for subscription, thread in self._consumers:
+            subscription.close()
+        for subscription, thread in self._consumers:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self._consumers = []
+
+    def summary(self):
+        return {name: {"published": topic.seq, "listeners": len(topic._listeners),
+                       "listener_errors": topic.listener_errors,
+                       "subscriptions": [{"received": s.received, "dropped": s.dropped, "errors": s.errors,
+                                          "queued": len(s._queue)} for s in topic._subscriptions]}
+                for name, topic in self.topics.items()}
@@ -0,0 +1,129 @@
+import numpy as np
+
+# Vectorized PID controller bank.
+#
+# State for every loop of every aircraft lives in (aircraft, axis) arrays, so
+# one update advances all of them with a fixed number of numpy operations.
+# Each loop has:
+#   - derivative on measurement, low-pass filtered with time constant tau,
+#     so setpoint steps do not kick and sensor noise is not amplified
+#   - conditional integration anti-windup: the integrator freezes while the
+#     output is saturated and the error would push it further into the limit
+#   - gains selected per aircraft from a schedule keyed by flight mode
+
+CONTROL_AXES = ("pitch", "roll", "yaw", "throttle")
+
+# What each axis regulates: pitch holds altitude, roll and yaw damp the body
+# rates, throttle holds airspeed. Measurements are (altitude, gyro x, gyro z, speed).
+DEFAULT_SETPOINTS = (5500.0, 0.0, 0.0, 500.0)
+
+# Output offset and limits per axis
+TRIM = (0.0, 0.0, 0.0, 0.5)
+OUTPUT_LIMITS = ((-1.0, -1.0, -1.0, 0.0), (1.0, 1.0, 1.0, 1.0))
+
+# flight mode -> (kp, ki, kd) per axis; thinner air at altitude needs more authority
+GAIN_SCHEDULE = {
+    "NORMAL": (
+        (2e-3, 2e-2, 2e-2, 5e-3),
+        (1e-4, 2e-3, 2e-3, 5e-4),
+        (4e-3, 0.0, 0.0, 1e-3),
+    ),
+    "HIGH_ALTITUDE": (
+        (3e-3, 3e-2, 3e-2, 7e-3),
+        (1.5e-4, 3e-3, 3e-3, 8e-4),
+        (6e-3, 0.0, 0.0, 1.5e-3),
+    ),
+}
+
+
+def measurements(sensor_data):
+    # Controlled variables of one SensorData or SensorFrame, in CONTROL_AXES order
+    return (sensor_data.altitude, sensor_data.gyro[0], sensor_data.gyro[2], sensor_data.speed)
+
+
+class PIDBank:
+    def __init__(self, n=1, schedule=None, mode="NORMAL", derivative_tau=0.1, trim=TRIM,
+                 limits=OUTPUT_LIMITS):
+        shape = (n, len(CONTROL_AXES))
+        self.n = n
+        self.schedule = {name: np.asarray(gains, dtype=np.float64)
+                         for name, gains in (GAIN_SCHEDULE if schedule is None else schedule).items()}
+        self.derivative_tau = derivative_tau
+        # Full (aircraft, axis) arrays like the gains: a broadcast operand makes
+        # numpy allocate a buffer the size of the state on every ufunc call
+        self.trim = np.tile(np.asarray(trim, dtype=np.float64), (n, 1))
+        self.lo = np.tile(np.asarray(limits[0], dtype=np.float64), (n, 1))
+        self.hi = np.tile(np.asarray(limits[1], dtype=np.float64), (n, 1))
+        self.kp = np.empty(shape)
+        self.ki = np.empty(shape)
+        self.kd = np.empty(shape)
+        self.modes = [None] * n
+        self.integral = np.zeros(shape)
+        self.derivative = np.zeros(shape)
+        self.previous = np.zeros(shape)
+        # 1.0 once an aircraft has a previous measurement to differentiate against
+        self.started = np.zeros(shape)
+        self.output = np.zeros(shape)
+        # Scratch arrays reused by every update, which allocates no arrays of its own
+        self._error = np.empty(shape)
+        self._raw = np.empty(shape)
+        self._error_dt = np.empty(shape)
+        self._unsaturated = np.empty(shape)
+        self._term = np.empty(shape)
+        self._winding = np.empty(shape, dtype=bool)
+        self._dt = np.empty(shape)
+        self._rate = np.empty(shape)
+        self._alpha = np.empty(shape)
+        self.set_mode(mode)
+
+    def set_mode(self, mode, rows=None):
+        # Switch the gain set for all aircraft, or for the given row indices.
+        # The integrator is kept, so the output does not jump at a mode change.
+        kp, ki, kd = self.schedule[mode]
+        rows = range(self.n) if rows is None else rows
+        for row in rows:
+            if self.modes[row] != mode:
+                self.modes[row] = mode
+                self.kp[row] = kp
+                self.ki[row] = ki
+                self.kd[row] = kd
+
+    def reset(self, rows=None):
+        rows = slice(None) if rows is None else rows
+        self.integral[rows] = 0.0
+        self.derivative[rows] = 0.0
+        self.started[rows] = 0.0
+
+    def update_many(self, setpoints, measured, dt):
+        # setpoints, measured: (n, axes); dt: scalar or (n, 1) seconds.
+        # Returns the (n, axes) output array, which is overwritten by the next call.
+        error = np.subtract(setpoints, measured, out=self._error)
+        step = self._dt
+        step[...] = dt
+        error_dt = np.multiply(error, step, out=self._error_dt)
+
+        # Filtered derivative of the measurement; zero on an aircraft's first sample
+        raw = np.subtract(self.previous, measured, out=self._raw)
+        raw *= np.divide(self.started, step, out=self._rate)
+        raw -= self.derivative
+        alpha = np.add(step, self.derivative_tau, out=self._alpha)
+        raw *= np.divide(step, alpha, out=alpha)
+        self.derivative += raw
+        self.previous[...] = measured
+        self.started[...] = 1.0
+
+        unsaturated = np.add(self.integral, error_dt, out=self._unsaturated)
+        unsaturated *= self.ki
+        unsaturated += np.multiply(self.kp, error, out=self._term)
+        unsaturated += np.multiply(self.kd, self.derivative, out=self._term)
+        unsaturated += self.trim
+        output = np.minimum(unsaturated, self.hi, out=self.output)
+        np.maximum(output, self.lo, out=output)
+
+        # Integrate unless saturated with the error pushing further out: the
+        # clipped amount has the same sign as the error exactly in that case
+        unsaturated -= output
+        unsaturated *= error
+        np.copyto(error_dt, 0.0, where=np.greater(unsaturated, 0.0, out=self._winding))
+        self.integral += error_dt
+        return output
@@ -0,0 +1,168 @@
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Flat channel layout used for columnar sensor storage
+SENSOR_CHANNELS = (
+    "altitude",
+    "speed",
+    "position_x",
+    "position_y",
+    "position_z",
+    "temperature",
+    "pressure",
+    "gyro_x",
+    "gyro_y",
+    "gyro_z",
+    "accelerometer_x",
+    "accelerometer_y",
+    "accelerometer_z",
+    "magnetometer_x",
+    "magnetometer_y",
+    "magnetometer_z",
+    "wind_speed",
+    "wind_direction",
+    "humidity",
+    "fuel_level",
+    "engine_on",
+    "oil_pressure",
+    "hydraulic_pressure",
+    "battery_temperature",
+    "system_voltage",
+)
+
+
+def sensor_values(sensor_data):
+    # Flatten a SensorData-like object into SENSOR_CHANNELS order.
+    # engine_status is stored as engine_on, 1.0 for "ON" and 0.0 for anything
+    # else: lossless for the "ON"/"OFF" the sensor schema allows, while any
+    # other status reads back as "OFF"
+    position = sensor_data.position
+    gyro = sensor_data.gyro
+    accelerometer = sensor_data.accelerometer
+    magnetometer = sensor_data.magnetometer
+    weather = sensor_data.weather
+    return (
+        sensor_data.altitude,
+        sensor_data.speed,
+        position[0], position[1], position[2],
+        sensor_data.temperature,
+        sensor_data.pressure,
+        gyro[0], gyro[1], gyro[2],
+        accelerometer[0], accelerometer[1], accelerometer[2],
+        magnetometer[0], magnetometer[1], magnetometer[2],
+        weather["wind_speed"],
+        weather["wind_direction"],
+        weather["humidity"],
+        sensor_data.fuel_level,
+        1.0 if sensor_data.engine_status == "ON" else 0.0,
+        sensor_data.oil_pressure,
+        sensor_data.hydraulic_pressure,
+        sensor_data.battery_temperature,
+        sensor_data.system_voltage,
+    )
+
+
+def sensor_record(values):
+    # Rebuild the legacy nested sensor dict from one flat row; engine_status
+    # comes back as "ON" or "OFF" (see sensor_values)
+    v = [float(x) for x in values]
+    return {
+        "altitude": v[0],
+        "speed": v[1],
+        "position": (v[2], v[3], v[4]),
+        "temperature": v[5],
+        "pressure": v[6],
+        "gyro": (v[7], v[8], v[9]),
+        "accelerometer": (v[10], v[11], v[12]),
+        "magnetometer": (v[13], v[14], v[15]),
+        "weather": {"wind_speed": v[16], "wind_direction": v[17], "humidity": v[18]},
+        "fuel_level": v[19],
+        "engine_status": "ON" if v[20] >= 0.5 else "OFF",
+        "oil_pressure": v[21],
+        "hydraulic_pressure": v[22],
+        "battery_temperature": v[23],
+        "system_voltage": v[24],
+    }
+
+
+# Fixed-capacity columnar ring buffer
+# Every sample is written twice (at i and i + capacity) so that any window of
+# the most recent samples is one contiguous slice and can be returned as a view.
+class ColumnarRingBuffer:
+    def __init__(self, channels, capacity):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.channels = tuple(channels)
+        self.capacity = capacity
+        self.index = {name: i for i, name in enumerate(self.channels)}
+        self._data = np.zeros((len(self.channels), 2 * capacity), dtype=np.float64)
+        self._times = np.zeros(2 * capacity, dtype=np.float64)
+        self._head = 0
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp, values):
+        i = self._head
+        j = i + self.capacity
+        self._data[:, i] = values
+        self._data[:, j] = values
+        self._times[i] = timestamp
+        self._times[j] = timestamp
+        self._head = (i + 1) % self.capacity
+        self.count += 1
+
+    def _span(self, n):
+        size = len(self)
+        if n is None or n > size:
+            n = size
+        end = self._head + self.capacity
+        return end - n, end
+
+    def window(self, n=None):
+        # Zero-copy read-only views of the latest n samples (all retained by default)
+        start, end = self._span(n)
+        times = self._times[start:end]
+        data = self._data[:, start:end]
+        times.flags.writeable = False
+        data.flags.writeable = False
+        return times, data
+
+    def channel(self, name, n=None):
+        start, end = self._span(n)
+        view = self._data[self.index[name], start:end]
+        view.flags.writeable = False
+        return view
+
+    def between(self, t_start, t_end):
+        # Samples with t_start <= timestamp < t_end, located by binary search
+        times, data = self.window()
+        lo = int(np.searchsorted(times, t_start, side="left"))
+        hi = int(np.searchsorted(times, t_end, side="left"))
+        return times[lo:hi], data[:, lo:hi]
+
+    def since(self, count):
+        # Samples appended after the buffer held `count` samples in total
+        return self.window(max(self.count - count, 0))
+
+    def latest(self):
+        if self.count == 0:
+            return None
+        i = (self._head - 1) % self.capacity
+        return self._times[i], self._data[:, i]
+
+    def clear(self):
+        self._head = 0
+        self.count = 0
+
+
+# Monotonic-to-wall-clock conversion for human readable timestamps
+class WallClock:
+    def __init__(self, clock=time.monotonic):
+        self.offset = time.time() - clock()
+
+    def format(self, timestamp, fmt="%Y-%m-%d %H:%M:%S"):
+        return datetime.fromtimestamp(timestamp + self.offset).strftime(fmt)
@@ -0,0 +1,136 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import av_log
+from av_datalog import SENSOR_CHANNELS
+from av_sim import create_simulation
+
+# Headless fleet simulation.
+# Aircraft are simulated with the discrete-event engine (no per-task threads)
+# and sharded across a process pool sized to the machine, so each aircraft
+# runs on its own interpreter and throughput scales with cores, not the GIL.
+# Workers return aggregated telemetry only; raw samples never cross processes.
+
+SUMMARY_CHANNELS = ("altitude", "speed", "fuel_level", "oil_pressure", "hydraulic_pressure",
+                    "battery_temperature", "system_voltage")
+
+
+def aircraft_seed(fleet_seed, aircraft_id):
+    return int(np.random.SeedSequence([fleet_seed, aircraft_id]).generate_state(1)[0])
+
+
+# Running count/sum/min/max per channel over DataLogger samples
+class TelemetryAccumulator:
+    def __init__(self, channels=SUMMARY_CHANNELS):
+        self.channels = channels
+        self.rows = [SENSOR_CHANNELS.index(name) for name in channels]
+        self.count = 0
+        self.sum = np.zeros(len(channels))
+        self.min = np.full(len(channels), np.inf)
+        self.max = np.full(len(channels), -np.inf)
+
+    def add(self, data):
+        if data.shape[1] == 0:
+            return
+        data = data[self.rows]
+        self.count += data.shape[1]
+        self.sum += data.sum(axis=1)
+        np.minimum(self.min, data.min(axis=1), out=self.min)
+        np.maximum(self.max, data.max(axis=1), out=self.max)
+
+    def summary(self):
+        mean = self.sum / self.count if self.count else self.sum
+        return {name: {"mean": float(mean[i]), "min": float(self.min[i]), "max": float(self.max[i])}
+                for i, name in enumerate(self.channels)}
+
+
+def simulate_aircraft(aircraft_id, duration, fleet_seed=0, segment=60.0):
+    started = time.perf_counter()
+    sim = create_simulation(seed=aircraft_seed(fleet_seed, aircraft_id))
+    computer = sim.computer
+    buffer = computer.data_logger.buffer
+    telemetry = TelemetryAccumulator()
+    consumed = 0
+    # Run in segments shorter than the logger capacity so every sample is aggregated
+    end = sim.now + duration
+    try:
+        while sim.now < end:
+            sim.run_until(min(sim.now + segment, end))
+            telemetry.add(buffer.since(consumed)[1])
+            consumed = buffer.count
+    finally:
+        computer.stop()
+    # Lifetime counts: the journal's retention caps what count() would see on long flights
+    journal = computer.journal
+    return {
+        "aircraft_id": aircraft_id,
+        "simulated_seconds": duration,
+        "wall_seconds": time.perf_counter() - started,
+        "events": sim.events,
+        "samples": telemetry.count,
+        "telemetry": telemetry.summary(),
+        "commands": dict(computer.flight_control_system.get_commands()),
+        "flight_mode": computer.flight_mode,
+        "errors": journal.recorded("error_management"),
+        "bite_errors": journal.recorded("bite"),
+        "maintenance_events": journal.recorded("maintenance"),
+        "threats": journal.recorded("security"),
+    }
+
+
+def run_shard(aircraft_ids, duration, fleet_seed):
+    av_log.configure(level="OFF")
+    return [simulate_aircraft(aircraft_id, duration, fleet_seed) for aircraft_id in aircraft_ids]
+
+
+def shards(n_aircraft, workers, shard_size=None):
+    # Several small shards per worker keep the pool balanced and results streaming
+    if shard_size is None:
+        shard_size = max(1, n_aircraft // (workers * 4))
+    ids = list(range(n_aircraft))
+    return [ids[i:i + shard_size] for i in range(0, n_aircraft, shard_size)]
+
+
+def run_fleet(n_aircraft, duration, workers=None, fleet_seed=0, shard_size=None):
+    # Yields per-aircraft results as shards complete
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_shard, shard, duration, fleet_seed)
+                   for shard in shards(n_aircraft, workers, shard_size)]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless fleet simulation")
+    parser.add_argument("--aircraft", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--duration", type=float, default=600.0, help="simulated seconds per aircraft")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    totals = {"errors": 0, "bite_errors": 0, "threats": 0}
+    for result in run_fleet(args.aircraft, args.duration, args.workers, args.seed):
+        altitude = result["telemetry"]["altitude"]
+        fuel = result["telemetry"]["fuel_level"]
+        print(f"aircraft {result['aircraft_id']:4d}: altitude mean={altitude['mean']:.1f} "
+              f"[{altitude['min']:.1f}, {altitude['max']:.1f}] fuel min={fuel['min']:.2f} "
+              f"mode={result['flight_mode']} errors={result['errors']} bite_errors={result['bite_errors']} "
+              f"threats={result['threats']} ({result['wall_seconds']:.2f}s)")
+        for key in totals:
+            totals[key] += result[key]
+    elapsed = time.perf_counter() - started
+    simulated = args.aircraft * args.duration
+    print(f"fleet: {args.aircraft} aircraft x {args.duration:.0f}s in {elapsed:.2f}s wall "
+          f"({simulated / elapsed:.0f} simulated seconds per second), totals {totals}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
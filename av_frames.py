@@ -0,0 +1,72 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+# Immutable snapshot of one SensorData update.
+# namedtuple gives a __slots__-only tuple subclass with the same attribute
+# names as SensorData, so frames can be passed to any subsystem's update().
+SensorFrame = namedtuple("SensorFrame", (
+    "seq",
+    "timestamp",
+    "altitude",
+    "speed",
+    "position",
+    "temperature",
+    "pressure",
+    "gyro",
+    "accelerometer",
+    "magnetometer",
+    "weather",
+    "fuel_level",
+    "engine_status",
+    "oil_pressure",
+    "hydraulic_pressure",
+    "battery_temperature",
+    "system_voltage",
+))
+
+
+def capture_frame(sensor_data, seq, timestamp):
+    # Tuples are already immutable; the weather dict is copied behind a read-only proxy
+    return SensorFrame(
+        seq,
+        timestamp,
+        sensor_data.altitude,
+        sensor_data.speed,
+        sensor_data.position,
+        sensor_data.temperature,
+        sensor_data.pressure,
+        sensor_data.gyro,
+        sensor_data.accelerometer,
+        sensor_data.magnetometer,
+        MappingProxyType(dict(sensor_data.weather)),
+        sensor_data.fuel_level,
+        sensor_data.engine_status,
+        sensor_data.oil_pressure,
+        sensor_data.hydraulic_pressure,
+        sensor_data.battery_temperature,
+        sensor_data.system_voltage,
+    )
+
+
+def frame_from_values(seq, timestamp, v):
+    # Frame from one flat row in av_datalog.SENSOR_CHANNELS order (recorded or logged data)
+    return SensorFrame(
+        seq,
+        timestamp,
+        v[0],
+        v[1],
+        (v[2], v[3], v[4]),
+        v[5],
+        v[6],
+        (v[7], v[8], v[9]),
+        (v[10], v[11], v[12]),
+        (v[13], v[14], v[15]),
+        MappingProxyType({"wind_speed": v[16], "wind_direction": v[17], "humidity": v[18]}),
+        v[19],
+        "ON" if v[20] >= 0.5 else "OFF",
+        v[21],
+        v[22],
+        v[23],
+        v[24],
+    )
+
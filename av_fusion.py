@@ -0,0 +1,296 @@
+import math
+
+import numpy as np
+
+from av_datalog import SENSOR_CHANNELS
+from av_sensor_models import BiasDrift, GaussianNoise, Quantization, RandomWalk, default_channel_models
+
+# Primary/backup sensor fusion.
+#
+# Every continuous channel is estimated by a scalar Kalman filter whose truth
+# is a random walk. Process and measurement variances come straight from the
+# channel's sensor model, so the filter is matched to the noise it sees. The
+# filters for all channels run side by side in preallocated arrays: one step
+# is a fixed handful of in-place numpy operations, with the primary and, when
+# it has a new sample, the backup applied as sequential measurement updates.
+#
+# Attitude (roll, pitch, heading) comes from a complementary filter over the
+# fused gyro, accelerometer and magnetometer: gyro integration short term,
+# gravity and magnetic field references long term.
+#
+# Offline, fuse_batch() reproduces the step-wise filter over whole recordings.
+# The gains do not depend on the data and have a closed form, so each channel
+# is a first-order linear recurrence that a parallel prefix scan solves in
+# log2(n) vectorized passes.
+
+# Taken from the primary as is
+PASSTHROUGH = ("engine_on",)
+
+# Variance floor, so channels without a noise component still have a defined gain
+MIN_VARIANCE = 1e-12
+
+
+def noise_parameters(models, channels=SENSOR_CHANNELS):
+    # (process variance, measurement variance) per sample for each channel
+    q = np.full(len(channels), MIN_VARIANCE)
+    r = np.full(len(channels), MIN_VARIANCE)
+    for i, name in enumerate(channels):
+        for component in models[name].components:
+            if isinstance(component, RandomWalk):
+                q[i] += component.sigma ** 2
+            elif isinstance(component, BiasDrift):
+                # Deterministic drift looks like process noise to a random-walk filter
+                q[i] += component.rate ** 2
+            elif isinstance(component, GaussianNoise):
+                r[i] += component.sigma ** 2
+            elif isinstance(component, Quantization):
+                r[i] += component.step ** 2 / 12
+    return q, r
+
+
+def linear_scan(u, a):
+    # Solves x[k] = a[k] * x[k-1] + u[k] along axis 1 in place (x[-1] = 0) with
+    # a Hillis-Steele scan. a: (rows, n) or (rows, 1) coefficients, |a| <= 1.
+    coefficient = np.array(np.broadcast_to(a, u.shape), dtype=np.float64)
+    shift = 1
+    n = u.shape[1]
+    while shift < n:
+        # Right-hand sides are evaluated before the in-place update, so each pass sees the previous one
+        u[:, shift:] += coefficient[:, shift:] * u[:, :-shift]
+        coefficient[:, shift:] *= coefficient[:, :-shift]
+        shift *= 2
+    return u
+
+
+def _wrap(values, lo, period):
+    return (values - lo) % period + lo
+
+
+def _wrap_difference(values, period):
+    return (values + period / 2) % period - period / 2
+
+
+class SensorFusion:
+    def __init__(self, channels=SENSOR_CHANNELS, models=None, passthrough=PASSTHROUGH, attitude_tau=1.0,
+                 period=0.01):
+        models = default_channel_models() if models is None else models
+        self.channels = tuple(channels)
+        self.index = {name: i for i, name in enumerate(self.channels)}
+        self.q, self.r = noise_parameters(models, self.channels)
+        self.passthrough_rows = [self.index[name] for name in passthrough if name in self.index]
+        wrap_rows = [i for i, name in enumerate(self.channels) if models[name].wrap]
+        self.wrap_rows = np.array(wrap_rows, dtype=np.intp)
+        self.wrap_lo = np.array([models[self.channels[i]].lo for i in wrap_rows], dtype=np.float64)
+        self.wrap_period = np.array([models[self.channels[i]].hi - models[self.channels[i]].lo
+                                     for i in wrap_rows], dtype=np.float64)
+        # Per-step wrapping touches only a couple of rows, cheaper as Python scalars
+        self._wraps = list(zip(wrap_rows, self.wrap_lo.tolist(), self.wrap_period.tolist()))
+        self.attitude_tau = attitude_tau
+        self.period = period
+        m = len(self.channels)
+        self.state = np.zeros(m)
+        self.variance = np.zeros(m)
+        self.output = np.zeros(m)
+        # Scratch arrays reused by every step
+        self._z = np.empty(m)
+        self._innovation = np.empty(m)
+        self._gain = np.empty(m)
+        self._gyro = [self.index[name] for name in ("gyro_x", "gyro_y", "gyro_z")]
+        self._accel = [self.index[name] for name in ("accelerometer_x", "accelerometer_y", "accelerometer_z")]
+        self._mag = [self.index[name] for name in ("magnetometer_x", "magnetometer_y", "magnetometer_z")]
+        self.reset()
+
+    def reset(self):
+        self.started = False
+        self.timestamp = None
+        # roll, pitch, heading in degrees
+        self.attitude = (0.0, 0.0, 0.0)
+
+    def update(self, primary, backup=None, timestamp=None):
+        # primary, backup: channel values (backup None when it has no new sample).
+        # Returns the fused row, which is overwritten by the next call.
+        if not self.started:
+            self._initialize(primary if backup is None else backup)
+            if backup is not None:
+                self._correct(primary)
+            self.started = True
+        else:
+            self.variance += self.q
+            self._correct(primary)
+            if backup is not None:
+                self._correct(backup)
+        state = self.state
+        for row, lo, period in self._wraps:
+            value = state.item(row)
+            if not lo <= value < lo + period:
+                state[row] = (value - lo) % period + lo
+        output = self.output
+        output[...] = self.state
+        for row in self.passthrough_rows:
+            output[row] = primary[row]
+
+        if timestamp is None:
+            dt = self.period
+        else:
+            dt = self.period if self.timestamp is None else timestamp - self.timestamp
+            self.timestamp = timestamp
+        self._update_attitude(output, dt)
+        return output
+
+    def _initialize(self, values):
+        self.state[...] = values
+        self.variance[...] = self.r
+
+    def _correct(self, values):
+        z = self._z
+        z[...] = values
+        innovation = np.subtract(z, self.state, out=self._innovation)
+        for row, _, period in self._wraps:
+            value = innovation.item(row)
+            if not -period / 2 <= value < period / 2:
+                innovation[row] = (value + period / 2) % period - period / 2
+        gain = np.add(self.variance, self.r, out=self._gain)
+        np.divide(self.variance, gain, out=gain)
+        innovation *= gain
+        self.state += innovation
+        np.subtract(1.0, gain, out=gain)
+        self.variance *= gain
+
+    def _update_attitude(self, fused, dt):
+        if dt <= 0:
+            return
+        values = fused.tolist()
+        gx, gy, gz = (values[i] for i in self._gyro)
+        ax, ay, az = (values[i] for i in self._accel)
+        mx, my, mz = (values[i] for i in self._mag)
+        roll_ref, pitch_ref, heading_ref = _reference_attitude(ax, ay, az, mx, my, mz)
+        roll, pitch, heading = self.attitude
+        alpha = self.attitude_tau / (self.attitude_tau + dt)
+        roll = alpha * (roll + gx * dt) + (1 - alpha) * roll_ref
+        pitch = alpha * (pitch + gy * dt) + (1 - alpha) * pitch_ref
+        predicted = heading + gz * dt
+        heading = (predicted + (1 - alpha) * _angle_difference(heading_ref, predicted)) % 360.0
+        self.attitude = (roll, pitch, heading)
+
+    def fuse_batch(self, primary, backup=None, out=None, block=8192):
+        # primary, backup: (channels, n) arrays of time-aligned samples.
+        # Continues from the current state, matching n calls to update().
+        # Processed in cache-sized column blocks, each continuing from the last.
+        primary = np.asarray(primary, dtype=np.float64)
+        backup = None if backup is None else np.asarray(backup, dtype=np.float64)
+        out = np.empty_like(primary) if out is None else out
+        for i in range(0, primary.shape[1], block):
+            self._fuse_block(primary[:, i:i + block], None if backup is None else backup[:, i:i + block],
+                             out[:, i:i + block])
+        return out
+
+    def _fuse_block(self, primary, backup, out):
+        n = primary.shape[1]
+        head = 0
+        if not self.started and n:
+            out[:, 0] = self.update(primary[:, 0], None if backup is None else backup[:, 0])
+            head = 1
+        if head == n:
+            return
+
+        sensors = 1 if backup is None else 2
+        posterior = self.variance_sequence(n - head + 1, sensors)
+        predicted = posterior[:, :-1] + self.q[:, None]
+        gain1 = predicted / (predicted + self.r[:, None])
+        z1 = primary[:, head:]
+        u = out[:, head:]
+        if backup is None:
+            a = 1 - gain1
+            np.multiply(gain1, z1, out=u)
+        else:
+            z2 = backup[:, head:]
+            variance = (1 - gain1) * predicted
+            gain2 = variance / (variance + self.r[:, None])
+            a = (1 - gain1) * (1 - gain2)
+            gain1 *= 1 - gain2
+            np.multiply(gain1, z1, out=u)
+            u += gain2 * z2
+        for j, row in enumerate(self.wrap_rows.tolist()):
+            # Unwrapped around the current estimate, so the recurrence stays linear
+            period = self.wrap_period[j]
+            track = np.unwrap(z1[row], period=period)
+            track += period * np.round((self.state[row] - track[0]) / period)
+            u[row] = gain1[row] * track
+            if backup is not None:
+                u[row] += gain2[row] * (track + _wrap_difference(z2[row] - z1[row], period))
+        u[:, 0] += a[:, 0] * self.state
+        linear_scan(u, a)
+        for j, row in enumerate(self.wrap_rows.tolist()):
+            u[row] = _wrap(u[row], self.wrap_lo[j], self.wrap_period[j])
+        self.state[...] = u[:, -1]
+        self.variance[...] = posterior[:, -1]
+        for row in self.passthrough_rows:
+            u[row] = z1[row]
+
+        attitude = self.attitude_batch(u)
+        self.attitude = tuple(attitude[:, -1].tolist())
+        self.timestamp = None
+
+    def variance_sequence(self, n, sensors=1):
+        # (channels, n) posterior variances starting from the current one.
+        # The scalar Riccati recursion is a Moebius map, so its distance e from
+        # the steady state obeys 1/e[k] = beta * 1/e[k-1] + gamma in closed form.
+        q = self.q[:, None]
+        r = self.r[:, None] / sensors
+        steady = (np.sqrt(q * q + 4 * q * r) - q) / 2
+        d = steady + q + r
+        beta = (d / r) ** 2
+        offset = d / (r * r) / (beta - 1)
+        k = np.arange(n)
+        with np.errstate(divide="ignore", over="ignore"):
+            inverse = np.exp(k * np.log(beta)) * (1 / (self.variance[:, None] - steady) + offset) - offset
+            return steady + 1 / inverse
+
+    def attitude_batch(self, fused, dt=None):
+        # (3, n) roll, pitch, heading for fused rows sampled every dt seconds,
+        # continuing from the current attitude
+        dt = self.period if dt is None else dt
+        gx, gy, gz = fused[self._gyro]
+        ax, ay, az = fused[self._accel]
+        mx, my, mz = fused[self._mag]
+        roll = np.arctan2(ay, -az)
+        pitch = np.arctan2(-ax, np.hypot(ay, az))
+        cos_roll, sin_roll = np.cos(roll), np.sin(roll)
+        x = mx * np.cos(pitch) + (my * sin_roll + mz * cos_roll) * np.sin(pitch)
+        y = my * cos_roll - mz * sin_roll
+        roll_ref = np.degrees(roll)
+        pitch_ref = np.degrees(pitch)
+        heading_ref = np.degrees(np.arctan2(-y, x))
+        alpha = self.attitude_tau / (self.attitude_tau + dt)
+        result = np.empty((3, fused.shape[1]))
+        roll, pitch, heading = self.attitude
+        result[0] = alpha * gx * dt + (1 - alpha) * roll_ref
+        result[1] = alpha * gy * dt + (1 - alpha) * pitch_ref
+        # The heading reference is unwrapped, starting within half a turn of the estimate
+        reference = np.unwrap(heading_ref, period=360.0)
+        reference += heading + _angle_difference(reference[0], heading) - reference[0]
+        result[2] = alpha * gz * dt + (1 - alpha) * reference
+        result[:, 0] += alpha * np.array((roll, pitch, heading))
+        linear_scan(result, np.full((3, 1), alpha))
+        result[2] %= 360.0
+        return result
+
+
+def _angle_difference(a, b):
+    # a - b in degrees, mapped to [-180, 180)
+    return (a - b + 180.0) % 360.0 - 180.0
+
+
+def _heading(roll, pitch, mx, my, mz):
+    # Tilt-compensated magnetic heading in degrees
+    cos_roll, sin_roll = math.cos(roll), math.sin(roll)
+    x = mx * math.cos(pitch) + (my * sin_roll + mz * cos_roll) * math.sin(pitch)
+    y = my * cos_roll - mz * sin_roll
+    return math.degrees(math.atan2(-y, x)) % 360.0
+
+
+def _reference_attitude(ax, ay, az, mx, my, mz):
+    # Roll and pitch from gravity, heading from the magnetic field, in degrees
+    roll = math.atan2(ay, -az)
+    pitch = math.atan2(-ax, math.hypot(ay, az))
+    return math.degrees(roll), math.degrees(pitch), _heading(roll, pitch, mx, my, mz)
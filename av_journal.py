@@ -0,0 +1,180 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from collections import deque, namedtuple
+from operator import attrgetter
+
+from av_datalog import WallClock
+from av_log import get_logger
+
+# Unified, bounded event journal for the mission computer subsystems.
+#
+# Events are kept in one stream per (subsystem, severity). Every stream is
+# appended in timestamp order, so a sorted list of its timestamps doubles as
+# the time index: a range query is two bisects per stream, and a severity
+# filter only visits the streams at or above the requested level. A
+# subsystem's streams share its retention cap: once it is exceeded, the
+# subsystem's oldest event goes, whatever its severity, so memory stays
+# bounded no matter how long the aircraft flies.
+
+log_journal = get_logger("journal")
+
+DEBUG, INFO, WARNING, ERROR, CRITICAL = range(5)
+SEVERITY_NAMES = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+# Events retained per subsystem, over all severities together
+DEFAULT_RETENTION = {
+    "bite": 1000,
+    "communication": 2000,
+    "error_management": 10000,
+    "maintenance": 5000,
+    "security": 2000,
+    "flight_scenario": 1000,
+    "sensor_redundancy": 1000,
+}
+
+Event = namedtuple("Event", ("timestamp", "subsystem", "severity", "message", "data"))
+
+_event_time = attrgetter("timestamp")
+
+
+def severity_value(severity):
+    if isinstance(severity, str):
+        return SEVERITY_NAMES.index(severity.upper())
+    return severity
+
+
+class _Stream:
+    __slots__ = ("times", "events", "start")
+
+    def __init__(self):
+        self.times = []
+        self.events = []
+        self.start = 0
+
+    def append(self, event):
+        self.times.append(event.timestamp)
+        self.events.append(event)
+
+    def expire(self):
+        # Expired entries are skipped via `start` and compacted in bulk once
+        # they make up half the list, keeping appends amortised O(1)
+        self.start += 1
+        if self.start * 2 >= len(self.times):
+            del self.times[:self.start]
+            del self.events[:self.start]
+            self.start = 0
+
+    def __len__(self):
+        return len(self.times) - self.start
+
+    def between(self, t_start, t_end):
+        lo = self.start if t_start is None else bisect_left(self.times, t_start, self.start)
+        hi = len(self.times) if t_end is None else bisect_left(self.times, t_end, lo)
+        return self.events[lo:hi]
+
+
+# Retention cap shared by one subsystem's streams
+class _Retention:
+    __slots__ = ("cap", "order")
+
+    def __init__(self, cap):
+        self.cap = cap
+        # The stream of every retained event, in recording order, so the
+        # oldest one is found without comparing streams
+        self.order = deque()
+
+    def add(self, stream):
+        order = self.order
+        order.append(stream)
+        if len(order) > self.cap:
+            order.popleft().expire()
+
+
+class EventJournal:
+    def __init__(self, clock=time.monotonic, retention=None, default_retention=5000):
+        self.clock = clock
+        self.wall_clock = WallClock(clock)
+        self.retention = dict(DEFAULT_RETENTION if retention is None else retention)
+        self.default_retention = default_retention
+        self._streams = {}
+        self._retention = {}
+        # (subsystem, severity) -> events ever recorded, retained or not
+        self._recorded = {}
+        self._lock = threading.Lock()
+        self._listeners = ()
+        self.listener_errors = 0
+
+    def record(self, subsystem, severity, message, data=None, timestamp=None):
+        severity = severity_value(severity)
+        with self._lock:
+            # Stamped under the lock so every stream stays in time order
+            if timestamp is None:
+                timestamp = self.clock()
+            event = Event(timestamp, subsystem, severity, message, data)
+            stream = self._streams.get((subsystem, severity))
+            if stream is None:
+                stream = self._streams[(subsystem, severity)] = _Stream()
+            retention = self._retention.get(subsystem)
+            if retention is None:
+                retention = _Retention(self.retention.get(subsystem, self.default_retention))
+                self._retention[subsystem] = retention
+            stream.append(event)
+            retention.add(stream)
+            key = (subsystem, severity)
+            self._recorded[key] = self._recorded.get(key, 0) + 1
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                # A broken listener must not fail the subsystem recording the event
+                self.listener_errors += 1
+                log_journal.error("Journal listener {} failed on {} event: {}",
+                                  getattr(listener, "__name__", listener), subsystem, e)
+        return event
+
+    def subscribe(self, listener):
+        # Called with every new event on the recording thread, outside the
+        # lock; copy-on-write so record() iterates without taking it
+        self._listeners = self._listeners + (listener,)
+
+    def unsubscribe(self, listener):
+        self._listeners = tuple(l for l in self._listeners if l is not listener)
+
+    def query(self, subsystem=None, start=None, end=None, min_severity=DEBUG):
+        # Events with start <= timestamp < end, oldest first
+        min_severity = severity_value(min_severity)
+        with self._lock:
+            parts = [stream.between(start, end) for (name, severity), stream in self._streams.items()
+                     if severity >= min_severity and (subsystem is None or name == subsystem)]
+        parts = [part for part in parts if part]
+        if len(parts) <= 1:
+            return parts[0] if parts else []
+        return list(heapq.merge(*parts, key=_event_time))
+
+    def recent(self, seconds, subsystem=None, min_severity=DEBUG):
+        return self.query(subsystem, self.clock() - seconds, None, min_severity)
+
+    def count(self, subsystem=None, min_severity=DEBUG):
+        min_severity = severity_value(min_severity)
+        with self._lock:
+            return sum(len(stream) for (name, severity), stream in self._streams.items()
+                       if severity >= min_severity and (subsystem is None or name == subsystem))
+
+    def recorded(self, subsystem=None, min_severity=DEBUG):
+        # Lifetime event count: unlike count(), not capped by retention or reset by clear()
+        min_severity = severity_value(min_severity)
+        with self._lock:
+            return sum(n for (name, severity), n in self._recorded.items()
+                       if severity >= min_severity and (subsystem is None or name == subsystem))
+
+    def format_time(self, event, fmt="%Y-%m-%d %H:%M:%S"):
+        return self.wall_clock.format(event.timestamp, fmt)
+
+    def clear(self, subsystem=None):
+        with self._lock:
+            for key in [key for key in self._streams if subsystem is None or key[0] == subsystem]:
+                del self._streams[key]
+            for name in [name for name in self._retention if subsystem is None or name == subsystem]:
+                del self._retention[name]
@@ -0,0 +1,179 @@
+import atexit
+import sys
+import threading
+import time
+from collections import deque
+
+# Buffered, level-filtered logging for the avionics tasks.
+# Loggers check a cached threshold before doing anything else, so a suppressed
+# call costs one comparison. Accepted records are queued unformatted (message
+# template + arguments) on a deque, whose append/popleft are atomic, and a
+# background writer formats and writes them in batches.
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR, "OFF": OFF}
+
+
+def _level(level):
+    return LEVELS[level.upper()] if isinstance(level, str) else level
+
+
+class Logger:
+    __slots__ = ("pipeline", "subsystem", "threshold")
+
+    def __init__(self, pipeline, subsystem):
+        self.pipeline = pipeline
+        self.subsystem = subsystem
+        self.threshold = pipeline.threshold_for(subsystem)
+
+    def enabled(self, level):
+        return level >= self.threshold
+
+    # Messages are str.format templates; formatting happens on the writer thread
+    # later, so arguments must not change afterwards: pass copies of mutable state
+    def debug(self, msg, *args):
+        if DEBUG >= self.threshold:
+            self.pipeline.emit(DEBUG, self.subsystem, msg, args)
+
+    def info(self, msg, *args):
+        if INFO >= self.threshold:
+            self.pipeline.emit(INFO, self.subsystem, msg, args)
+
+    def warning(self, msg, *args):
+        if WARNING >= self.threshold:
+            self.pipeline.emit(WARNING, self.subsystem, msg, args)
+
+    def error(self, msg, *args):
+        if ERROR >= self.threshold:
+            self.pipeline.emit(ERROR, self.subsystem, msg, args)
+
+
+class LogPipeline:
+    def __init__(self, stream=None, level=INFO, subsystem_levels=None, flush_interval=0.05, max_queue=100000):
+        self.stream = stream
+        self.level = _level(level)
+        self.subsystem_levels = {name: _level(lvl) for name, lvl in (subsystem_levels or {}).items()}
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = deque(maxlen=max_queue)
+        self._loggers = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._running = False
+        # Set by stop(): later records are written synchronously, the writer stays down
+        self._closed = False
+
+    def threshold_for(self, subsystem):
+        return self.subsystem_levels.get(subsystem, self.level)
+
+    def get_logger(self, subsystem):
+        with self._lock:
+            logger = self._loggers.get(subsystem)
+            if logger is None:
+                logger = self._loggers[subsystem] = Logger(self, subsystem)
+            return logger
+
+    def set_level(self, level, subsystem_levels=None):
+        self.level = _level(level)
+        if subsystem_levels is not None:
+            self.subsystem_levels = {name: _level(lvl) for name, lvl in subsystem_levels.items()}
+        with self._lock:
+            for logger in self._loggers.values():
+                logger.threshold = self.threshold_for(logger.subsystem)
+
+    def emit(self, level, subsystem, msg, args):
+        queue = self._queue
+        if len(queue) == queue.maxlen:
+            # The deque discards the oldest record on append
+            self.dropped += 1
+        queue.append((time.time(), level, subsystem, msg, args))
+        if not self._running:
+            if self._closed:
+                self.flush()
+            else:
+                self._start_writer()
+
+    def start(self):
+        # Explicit (re)start, also after stop(); emit() only starts a pipeline that was never stopped
+        with self._lock:
+            self._closed = False
+        self._start_writer()
+
+    def _start_writer(self):
+        with self._lock:
+            if self._running or self._closed:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="av-log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while self._running:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    @staticmethod
+    def format(record):
+        timestamp, level, subsystem, msg, args = record
+        try:
+            message = msg.format(*args) if args else msg
+        except Exception as e:
+            message = f"{msg!r} {args!r} (format error: {e})"
+        clock = time.strftime("%H:%M:%S", time.localtime(timestamp))
+        return f"{clock}.{int(timestamp * 1000) % 1000:03d} {LEVEL_NAMES.get(level, level)} [{subsystem}] {message}"
+
+    def flush(self):
+        queue = self._queue
+        lines = []
+        while queue:
+            try:
+                lines.append(self.format(queue.popleft()))
+            except IndexError:
+                break
+        if lines:
+            stream = self.stream or sys.stdout
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+
+    def stop(self):
+        # Stops the writer thread after it has written everything queued so far
+        with self._lock:
+            self._closed = True
+        if not self._running:
+            self.flush()
+            return
+        self._running = False
+        self._wake.set()
+        self._thread.join()
+
+
+_pipeline = LogPipeline()
+
+
+def get_logger(subsystem):
+    return _pipeline.get_logger(subsystem)
+
+
+def configure(level=None, stream=None, subsystem_levels=None, flush_interval=None):
+    if stream is not None:
+        _pipeline.stream = stream
+    if flush_interval is not None:
+        _pipeline.flush_interval = flush_interval
+    _pipeline.set_level(_pipeline.level if level is None else level, subsystem_levels)
+    return _pipeline
+
+
+def shutdown():
+    _pipeline.stop()
+
+
+atexit.register(shutdown)
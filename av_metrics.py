@@ -0,0 +1,367 @@
+import math
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from av_log import get_logger
+
+# In-process metrics registry served in the Prometheus text format.
+#
+# Metrics are counters, gauges, histograms and summaries, optionally split
+# by labels. Most values are pulled rather than pushed: a value function or a
+# collector reads state the subsystems keep anyway (latest bus messages, task
+# histograms, journal counts), so the hot loops do no extra work. A snapshot
+# thread runs the collectors and renders the whole exposition once per
+# interval; HTTP requests are answered from that pre-rendered snapshot and
+# never touch subsystem state, however often they come.
+
+log_metrics = get_logger("metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds
+DEFAULT_BUCKETS = (1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _format_value(value):
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Value:
+    __slots__ = ("value", "function", "lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self.lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        # Value read from function() at every snapshot instead of being pushed
+        self.function = function
+
+    def get(self):
+        return self.value if self.function is None else self.function()
+
+
+class _CounterValue(_Value):
+    __slots__ = ()
+
+    def inc(self, amount=1.0):
+        if amount < 0:
+            raise ValueError("counters only go up")
+        with self.lock:
+            self.value += amount
+
+
+class _GaugeValue(_Value):
+    __slots__ = ()
+
+    def dec(self, amount=1.0):
+        with self.lock:
+            self.value -= amount
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count", "lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # Per bucket, not cumulative; the last one is +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _SummaryValue:
+    __slots__ = ("quantiles", "sum", "count")
+
+    def __init__(self):
+        self.quantiles = {}
+        self.sum = 0.0
+        self.count = 0
+
+    def set(self, quantiles, total, count):
+        # Pre-aggregated elsewhere, e.g. from an av_timing.LatencyHistogram
+        self.quantiles = quantiles
+        self.sum = total
+        self.count = count
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} takes labels {self.label_names}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} {self.type}")
+        for values, child in list(self._children.items()):
+            self._render_child(lines, values, child)
+
+    def _render_child(self, lines, values, child):
+        lines.append(f"{self.name}{_label_text(self.label_names, values)} {_format_value(child.get())}")
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1.0):
+        self.labels().dec(amount)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+    def set_state(self, state, states):
+        # Enum-style gauge over a single label: 1 for `state`, 0 for the others
+        for name in states:
+            self.labels(name).set(1.0 if name == state else 0.0)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def _render_child(self, lines, values, child):
+        with child.lock:
+            counts = list(child.counts)
+            total, count = child.sum, child.count
+        cumulative = 0
+        for bound, n in zip(self.buckets + (math.inf,), counts):
+            cumulative += n
+            labels = _label_text(self.label_names, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _label_text(self.label_names, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+
+
+class Summary(Metric):
+    type = "summary"
+
+    def _new_child(self):
+        return _SummaryValue()
+
+    def set(self, quantiles, total, count):
+        self.labels().set(quantiles, total, count)
+
+    def _render_child(self, lines, values, child):
+        quantiles, total, count = child.quantiles, child.sum, child.count
+        for q, value in quantiles.items():
+            labels = _label_text(self.label_names, values, f'quantile="{q}"')
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        labels = _label_text(self.label_names, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+
+
+class MetricsRegistry:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.metrics = {}
+        self.collectors = []
+        self.collect_errors = 0
+        self.snapshot_time = None
+        self._snapshot = b""
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, help_text, labels, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help_text, labels, **kwargs)
+            elif type(metric) is not cls or metric.label_names != tuple(labels):
+                raise ValueError(f"metric {name} is already registered as a different {metric.type}")
+            if not metric.label_names:
+                # Unlabelled metrics are exposed from the start, at zero
+                metric.labels()
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=()):
+        return self._register(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, labels, buckets=buckets)
+
+    def summary(self, name, help_text, labels=()):
+        return self._register(Summary, name, help_text, labels)
+
+    def add_collector(self, collector):
+        # collector() updates metrics from subsystem state; it runs on the
+        # snapshot thread right before every render
+        self.collectors.append(collector)
+
+    def collect(self):
+        # Runs the collectors and renders a new snapshot; returns it
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                # A broken collector must not take the endpoint down
+                self.collect_errors += 1
+                log_metrics.warning("Metrics collector {} failed: {}", getattr(collector, "__name__", collector), e)
+        lines = []
+        for metric in list(self.metrics.values()):
+            try:
+                metric.render(lines)
+            except Exception as e:
+                self.collect_errors += 1
+                log_metrics.warning("Metric {} failed to render: {}", metric.name, e)
+        lines.append("# HELP av_metrics_collect_errors_total Collector and render failures")
+        lines.append("# TYPE av_metrics_collect_errors_total counter")
+        lines.append(f"av_metrics_collect_errors_total {self.collect_errors}")
+        snapshot = ("\n".join(lines) + "\n").encode("utf-8")
+        self._snapshot = snapshot
+        self.snapshot_time = self.clock()
+        return snapshot
+
+    def snapshot(self):
+        # Latest rendered exposition; never runs collectors
+        return self._snapshot
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = None
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.snapshot()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        log_metrics.debug("{} {}", self.address_string(), fmt % args)
+
+
+# Local HTTP endpoint serving MetricsRegistry snapshots from background threads
+class MetricsServer:
+    def __init__(self, address=("127.0.0.1", 9464), registry=None, interval=1.0):
+        self.registry = MetricsRegistry() if registry is None else registry
+        self.address = address
+        self.interval = interval
+        self._server = None
+        self._threads = []
+        self._stopping = threading.Event()
+
+    def start(self):
+        if self._server is not None:
+            return
+        self._stopping.clear()
+        self.registry.collect()
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": self.registry})
+        self._server = ThreadingHTTPServer(self.address, handler)
+        self._server.daemon_threads = True
+        # Port 0 binds a free port
+        self.address = self._server.server_address[:2]
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.5},
+                             name="av-metrics-http", daemon=True),
+            threading.Thread(target=self._snapshots, name="av-metrics-snapshot", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        log_metrics.info("Metrics served on http://{}:{}/metrics", *self.address)
+
+    def _snapshots(self):
+        while not self._stopping.wait(self.interval):
+            self.registry.collect()
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._stopping.set()
+        self._server.shutdown()
+        self._server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._server = None
+        self._threads = []
@@ -0,0 +1,242 @@
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+from av_datalog import SENSOR_CHANNELS, sensor_values
+
+# Flight recorder file layout (little endian, float64 columns)
+#
+#   file header   FILE_HEADER + newline separated channel names, padded to PAGE
+#   chunk         CHUNK_HEADER padded to CHUNK_HEADER_SIZE, then one column of
+#                 `capacity` float64 values per channel (timestamp first),
+#                 padded to a PAGE multiple
+#   index         INDEX_HEADER + offsets/counts/t_first/t_last arrays
+#   trailer       TRAILER pointing at the index (written by close())
+#
+# Chunks are only ever appended. A file without trailer (crash before close)
+# is still readable: the reader rebuilds the index by walking chunk headers.
+PAGE = 4096
+FILE_MAGIC = b"AVSMREC1"
+CHUNK_MAGIC = b"AVSMCHNK"
+INDEX_MAGIC = b"AVSMIDX1"
+TRAILER_MAGIC = b"AVSMEND1"
+VERSION = 1
+
+FILE_HEADER = struct.Struct("<8sHHII")  # magic, version, reserved, n_columns, names_size
+CHUNK_HEADER = struct.Struct("<8sIIdd")  # magic, capacity, count, t_first, t_last
+CHUNK_HEADER_SIZE = 64
+INDEX_HEADER = struct.Struct("<8sQ")  # magic, n_chunks
+TRAILER = struct.Struct("<8sQ")  # magic, index offset
+
+COMMAND_CHANNELS = ("pitch", "roll", "yaw", "throttle")
+
+
+def _page_align(size):
+    return (size + PAGE - 1) // PAGE * PAGE
+
+
+def _chunk_size(n_columns, capacity):
+    return _page_align(CHUNK_HEADER_SIZE + n_columns * capacity * 8)
+
+
+class RecorderFormatError(Exception):
+    pass
+
+
+# Append-only binary flight recorder for sensor frames and control commands
+class FlightRecorder:
+    def __init__(self, path, chunk_frames=4096, clock=time.monotonic, command_channels=COMMAND_CHANNELS):
+        self.path = path
+        self.chunk_frames = chunk_frames
+        self.clock = clock
+        self.command_channels = tuple(command_channels)
+        self.channels = SENSOR_CHANNELS + self.command_channels
+        # Row 0 holds timestamps, rows 1.. the channels
+        self._chunk = np.zeros((len(self.channels) + 1, chunk_frames), dtype=np.float64)
+        self._count = 0
+        self._index = []
+        self.frames_written = 0
+        self._file = open(path, "wb")
+        self._write_header()
+
+    def _write_header(self):
+        names = "\n".join(self.channels).encode("utf-8")
+        header = FILE_HEADER.pack(FILE_MAGIC, VERSION, 0, len(self.channels), len(names)) + names
+        self._file.write(header.ljust(_page_align(len(header)), b"\0"))
+        self._offset = self._file.tell()
+
+    def record(self, sensor_data, commands, timestamp=None):
+        if timestamp is None:
+            timestamp = self.clock()
+        column = self._chunk[:, self._count]
+        column[0] = timestamp
+        column[1:len(SENSOR_CHANNELS) + 1] = sensor_values(sensor_data)
+        column[len(SENSOR_CHANNELS) + 1:] = [commands.get(name, 0.0) for name in self.command_channels]
+        self._count += 1
+        if self._count == self.chunk_frames:
+            self._write_chunk()
+
+    def _write_chunk(self):
+        count = self._count
+        if count == 0:
+            return
+        # Full chunks are written as-is, the final partial chunk is shrunk to fit
+        data = self._chunk if count == self.chunk_frames else np.ascontiguousarray(self._chunk[:, :count])
+        t_first = float(data[0, 0])
+        t_last = float(data[0, count - 1])
+        header = CHUNK_HEADER.pack(CHUNK_MAGIC, count, count, t_first, t_last).ljust(CHUNK_HEADER_SIZE, b"\0")
+        size = _chunk_size(data.shape[0], count)
+        self._file.write(header)
+        self._file.write(data.data)
+        self._file.write(b"\0" * (size - CHUNK_HEADER_SIZE - data.nbytes))
+        self._index.append((self._offset, count, t_first, t_last))
+        self._offset += size
+        self.frames_written += count
+        self._count = 0
+
+    def flush(self):
+        # Persists the pending partial chunk; later frames start a new chunk
+        self._write_chunk()
+        self._file.flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._write_chunk()
+        index = np.array(self._index, dtype=[("offset", "<i8"), ("count", "<i8"), ("t_first", "<f8"), ("t_last", "<f8")])
+        self._file.write(INDEX_HEADER.pack(INDEX_MAGIC, len(index)))
+        self._file.write(index["offset"].tobytes())
+        self._file.write(index["count"].tobytes())
+        self._file.write(index["t_first"].tobytes())
+        self._file.write(index["t_last"].tobytes())
+        self._file.write(TRAILER.pack(TRAILER_MAGIC, self._offset))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# Memory-mapped reader; channel data is exposed as NumPy views into the file
+class FlightRecording:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < FILE_HEADER.size:
+            self._file.close()
+            raise RecorderFormatError(f"{path}: file too short")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, n_columns, names_size = FILE_HEADER.unpack_from(self._mmap, 0)
+        if magic != FILE_MAGIC or version != VERSION:
+            self.close()
+            raise RecorderFormatError(f"{path}: not a flight recording")
+        names = bytes(self._mmap[FILE_HEADER.size:FILE_HEADER.size + names_size]).decode("utf-8")
+        self.channels = tuple(names.split("\n"))
+        self.index = {name: i + 1 for i, name in enumerate(self.channels)}
+        self.index["timestamp"] = 0
+        self._data_start = _page_align(FILE_HEADER.size + names_size)
+        self._load_index(size)
+
+    def _load_index(self, size):
+        if size >= self._data_start + TRAILER.size:
+            magic, index_offset = TRAILER.unpack_from(self._mmap, size - TRAILER.size)
+            if magic == TRAILER_MAGIC:
+                magic, n_chunks = INDEX_HEADER.unpack_from(self._mmap, index_offset)
+                if magic == INDEX_MAGIC:
+                    start = index_offset + INDEX_HEADER.size
+                    step = 8 * n_chunks
+                    self.offsets = np.frombuffer(self._mmap, dtype="<i8", count=n_chunks, offset=start)
+                    self.counts = np.frombuffer(self._mmap, dtype="<i8", count=n_chunks, offset=start + step)
+                    self.t_first = np.frombuffer(self._mmap, dtype="<f8", count=n_chunks, offset=start + 2 * step)
+                    self.t_last = np.frombuffer(self._mmap, dtype="<f8", count=n_chunks, offset=start + 3 * step)
+                    return
+        self._scan_chunks(size)
+
+    def _scan_chunks(self, size):
+        # Recover the index of an unclosed recording from the chunk headers
+        n_columns = len(self.channels) + 1
+        entries = []
+        offset = self._data_start
+        while offset + CHUNK_HEADER_SIZE <= size:
+            magic, capacity, count, t_first, t_last = CHUNK_HEADER.unpack_from(self._mmap, offset)
+            chunk_size = _chunk_size(n_columns, capacity)
+            if magic != CHUNK_MAGIC or offset + CHUNK_HEADER_SIZE + n_columns * capacity * 8 > size:
+                break
+            entries.append((offset, count, t_first, t_last))
+            offset += chunk_size
+        self.offsets = np.array([e[0] for e in entries], dtype=np.int64)
+        self.counts = np.array([e[1] for e in entries], dtype=np.int64)
+        self.t_first = np.array([e[2] for e in entries], dtype=np.float64)
+        self.t_last = np.array([e[3] for e in entries], dtype=np.float64)
+
+    def __len__(self):
+        return int(self.counts.sum())
+
+    @property
+    def n_chunks(self):
+        return len(self.offsets)
+
+    def chunk(self, i):
+        # (columns x frames) view of one chunk; row 0 is the timestamp column
+        offset = int(self.offsets[i]) + CHUNK_HEADER_SIZE
+        count = int(self.counts[i])
+        n_columns = len(self.channels) + 1
+        view = np.frombuffer(self._mmap, dtype="<f8", count=n_columns * count, offset=offset)
+        return view.reshape(n_columns, count)
+
+    def _chunk_range(self, t_start, t_end):
+        first = 0 if t_start is None else int(np.searchsorted(self.t_last, t_start, side="left"))
+        last = self.n_chunks if t_end is None else int(np.searchsorted(self.t_first, t_end, side="left"))
+        return first, last
+
+    def channel(self, name, t_start=None, t_end=None):
+        # Values with t_start <= timestamp < t_end. Only chunks overlapping the
+        # range are touched; a range inside one chunk is returned as a view.
+        return self.read([name], t_start, t_end)[1][0]
+
+    def times(self, t_start=None, t_end=None):
+        return self.read([], t_start, t_end)[0]
+
+    def read(self, names=None, t_start=None, t_end=None):
+        # Returns (timestamps, channels x frames) for the requested channels
+        rows = [self.index[name] for name in (self.channels if names is None else names)]
+        # Adjacent channels are sliced (zero-copy), anything else is gathered
+        if rows and rows == list(range(rows[0], rows[0] + len(rows))):
+            selector = slice(rows[0], rows[0] + len(rows))
+        else:
+            selector = rows
+        first, last = self._chunk_range(t_start, t_end)
+        times_parts = []
+        data_parts = []
+        for i in range(first, last):
+            chunk = self.chunk(i)
+            times = chunk[0]
+            lo = 0 if t_start is None else int(np.searchsorted(times, t_start, side="left"))
+            hi = len(times) if t_end is None else int(np.searchsorted(times, t_end, side="left"))
+            times_parts.append(times[lo:hi])
+            data_parts.append(chunk[selector, lo:hi])
+        if not times_parts:
+            return np.empty(0), np.empty((len(rows), 0))
+        if len(times_parts) == 1:
+            return times_parts[0], data_parts[0]
+        return np.concatenate(times_parts), np.concatenate(data_parts, axis=1)
+
+    def close(self):
+        # Views handed out keep the mapping alive; release it once they are gone
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
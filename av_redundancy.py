@@ -0,0 +1,300 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+from av_journal import ERROR, INFO, WARNING
+from av_log import get_logger
+
+# Primary/backup sensor redundancy.
+#
+# One unit is active and is sampled by the sensor task; the other is on
+# standby, in one of three modes:
+#   hot   sampled every tick, ready to take over immediately
+#   warm  sampled at a low heartbeat rate, so its health is known
+#   cold  powered down until a failover starts it
+# A fault on the active unit hands over to the standby within the same step,
+# and only the new active unit is sampled from then on; the failed unit stays
+# down until an explicit failback. Every switchover records how long the
+# fault took to detect (flight clock) and how long the handover took (CPU
+# time), so standby cost can be weighed against recovery time.
+
+log_redundancy = get_logger("sensor_redundancy")
+
+HOT, WARM, COLD = "hot", "warm", "cold"
+STANDBY_MODES = (HOT, WARM, COLD)
+
+Switchover = namedtuple("Switchover", ("kind", "timestamp", "mode", "source", "target", "reason",
+                                       "detection_latency", "switchover_latency"))
+
+
+class SensorFault(Exception):
+    pass
+
+
+# One redundant sensor: its SensorData and, in process mode, the producer feeding it
+class SensorUnit:
+    def __init__(self, name, sensor, producer=None):
+        self.name = name
+        self.sensor = sensor
+        self.producer = producer
+        self.powered = False
+        self.failed = False
+        # Result of the latest standby check
+        self.healthy = True
+        # Flight sample index of the sensor's current values
+        self.samples = 0
+        self.fault = None
+        self.fault_time = None
+        self._frame_seq = None
+
+    def power_on(self, epoch=None):
+        if self.producer is not None and not self.producer.alive():
+            self.producer.start(epoch)
+            self.producer.wait_ready()
+        self.powered = True
+
+    def power_off(self):
+        if self.producer is not None:
+            self.producer.halt()
+        self.powered = False
+
+    def close(self):
+        if self.producer is not None:
+            self.producer.stop()
+        self.powered = False
+
+    def sample(self, index):
+        # Brings the sensor to flight sample `index`, skipping what it missed while idle
+        if self.fault is not None:
+            raise SensorFault(self.fault)
+        if index > self.samples:
+            self.sensor.model.skip(index - self.samples - 1)
+            self.samples = index
+            self.sensor.update()
+
+    def fresh(self):
+        # False while a process-fed sensor keeps repeating its last frame
+        seq = getattr(self.sensor.model, "seq", None)
+        if seq is None:
+            return True
+        changed = seq != self._frame_seq
+        self._frame_seq = seq
+        return changed
+
+
+class SensorRedundancy:
+    def __init__(self, primary, backup, mode=HOT, heartbeat=1.0, clock=time.monotonic, journal=None,
+                 on_fault=None, history=256):
+        if mode not in STANDBY_MODES:
+            raise ValueError(f"unknown standby mode {mode!r}")
+        self.units = (primary, backup)
+        self.active = 0
+        self.mode = mode
+        self.heartbeat = heartbeat
+        self.clock = clock
+        self.journal = journal
+        # Called with a message for every sensor fault, e.g. to feed error management
+        self.on_fault = on_fault
+        self.history = deque(maxlen=history)
+        self.index = 0
+        self.last_good = None
+        self.next_heartbeat = None
+        self.epoch = None
+        self.standby_samples = 0
+        self.standby_ns = 0
+        # Lifetime totals; history only keeps the latest switchovers
+        self.failovers = 0
+        self.failbacks = 0
+        self._lock = threading.Lock()
+        primary.powered = True
+        backup.powered = mode != COLD
+
+    @property
+    def sensor(self):
+        return self.units[self.active].sensor
+
+    @property
+    def standby(self):
+        return self.units[1 - self.active]
+
+    @property
+    def standby_sensor(self):
+        return self.standby.sensor
+
+    def start(self):
+        # Starts the producers of powered units on a common time grid
+        self.epoch = time.monotonic()
+        for unit in self.units:
+            if unit.powered:
+                unit.power_on(self.epoch)
+
+    def close(self):
+        for unit in self.units:
+            unit.close()
+
+    def sample(self):
+        # Samples the active unit and returns its SensorData. A fault hands
+        # over to the standby in the same step; raises only if both fail.
+        with self._lock:
+            self.index += 1
+            unit = self.units[self.active]
+            try:
+                unit.sample(self.index)
+            except Exception as e:
+                self._failover(unit, e)
+                unit = self.units[self.active]
+            if unit.fresh():
+                self.last_good = self.clock()
+            return unit.sensor
+
+    def _failover(self, unit, error):
+        detected = self.clock()
+        started = time.perf_counter()
+        fault_time = self.last_good if unit.fault_time is None else unit.fault_time
+        detection = 0.0 if fault_time is None else max(detected - fault_time, 0.0)
+        reason = f"{unit.name} sensor fault: {error}"
+        self._report(ERROR, reason)
+        unit.failed = True
+        standby = self.units[1 - self.active]
+        if standby.failed:
+            raise SensorFault(f"{unit.name} failed and {standby.name} is unavailable")
+        try:
+            if not standby.powered:
+                # Cold start
+                standby.power_on(self.epoch)
+            standby.sample(self.index)
+        except Exception as e:
+            standby.failed = True
+            self._report(ERROR, f"{standby.name} sensor fault during failover: {e}")
+            raise SensorFault(f"{unit.name} and {standby.name} sensors failed") from e
+        self.active = 1 - self.active
+        try:
+            unit.power_off()
+        except Exception as e:
+            self._report(WARNING, f"{unit.name} sensor did not power down: {e}")
+        self._switched("failover", detected, unit, standby, reason, detection, time.perf_counter() - started)
+
+    def sample_standby(self):
+        # Standby sampling for the backup task; returns the standby SensorData
+        # when it took a sample this step, else None
+        with self._lock:
+            unit = self.standby
+            if self.mode == COLD or not unit.powered or unit.failed:
+                return None
+            if self.mode == WARM:
+                now = self.clock()
+                if self.next_heartbeat is not None and now < self.next_heartbeat:
+                    return None
+                self.next_heartbeat = now + self.heartbeat
+            started = time.perf_counter_ns()
+            try:
+                # One sample ahead of the active unit: the standby runs first within a tick
+                unit.sample(max(self.index, unit.samples + 1))
+            except Exception as e:
+                # Reported once per outage; failover will still try the unit
+                if unit.healthy:
+                    unit.healthy = False
+                    self._report(WARNING, f"{unit.name} standby sensor check failed: {e}")
+                return None
+            finally:
+                self.standby_ns += time.perf_counter_ns() - started
+            unit.healthy = True
+            self.standby_samples += 1
+            return unit.sensor
+
+    def failback(self):
+        # Explicit return to the primary unit, once it samples cleanly again.
+        # Returns False (and stays on the backup) if it does not.
+        with self._lock:
+            if self.active == 0:
+                return False
+            primary, backup = self.units
+            started = time.perf_counter()
+            try:
+                if not primary.powered:
+                    primary.power_on(self.epoch)
+                primary.sample(self.index)
+            except Exception as e:
+                self._report(WARNING, f"Failback to {primary.name} refused: {e}")
+                return False
+            primary.failed = False
+            self.active = 0
+            if self.mode == COLD:
+                backup.power_off()
+            self._switched("failback", self.clock(), backup, primary, "failback requested", 0.0,
+                           time.perf_counter() - started)
+            return True
+
+    def set_mode(self, mode):
+        if mode not in STANDBY_MODES:
+            raise ValueError(f"unknown standby mode {mode!r}")
+        with self._lock:
+            self.mode = mode
+            self.next_heartbeat = None
+            unit = self.standby
+            if unit.failed:
+                return
+            if mode == COLD and unit.powered:
+                unit.power_off()
+            elif mode != COLD and not unit.powered:
+                unit.power_on(self.epoch)
+
+    def inject_fault(self, name, message="injected fault"):
+        # Test hook: the named unit raises SensorFault until clear_fault()
+        unit = self._unit(name)
+        unit.fault_time = self.clock()
+        unit.fault = message
+
+    def clear_fault(self, name):
+        unit = self._unit(name)
+        unit.fault = None
+        unit.fault_time = None
+
+    def _unit(self, name):
+        for unit in self.units:
+            if unit.name == name:
+                return unit
+        raise KeyError(name)
+
+    def _switched(self, kind, timestamp, source, target, reason, detection, switchover):
+        if kind == "failover":
+            self.failovers += 1
+        else:
+            self.failbacks += 1
+        self.history.append(Switchover(kind, timestamp, self.mode, source.name, target.name, reason,
+                                       detection, switchover))
+        self._report(WARNING if kind == "failover" else INFO,
+                     f"{kind.capitalize()} from {source.name} to {target.name} ({self.mode} standby): "
+                     f"detection {detection * 1e3:.1f} ms, switchover {switchover * 1e3:.3f} ms")
+
+    def _report(self, severity, message):
+        if severity >= ERROR:
+            log_redundancy.error("{}", message)
+        elif severity >= WARNING:
+            log_redundancy.warning("{}", message)
+        else:
+            log_redundancy.info("{}", message)
+        if self.journal is not None:
+            self.journal.record("sensor_redundancy", severity, message)
+        if severity >= ERROR and self.on_fault is not None:
+            self.on_fault(message)
+
+    def summary(self):
+        # Counts are lifetime totals; latencies cover the switchovers still in history
+        failovers = [s for s in self.history if s.kind == "failover"]
+        return {
+            "mode": self.mode,
+            "active": self.units[self.active].name,
+            "standby_samples": self.standby_samples,
+            "standby_cpu_ms": self.standby_ns / 1e6,
+            "failovers": self.failovers,
+            "failbacks": self.failbacks,
+            "detection_ms": _latency_summary([s.detection_latency for s in failovers]),
+            "switchover_ms": _latency_summary([s.switchover_latency for s in failovers]),
+        }
+
+
+def _latency_summary(values):
+    if not values:
+        return None
+    return {"mean": sum(values) / len(values) * 1e3, "max": max(values) * 1e3}
@@ -0,0 +1,190 @@
+import argparse
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import av_log
+from av_datalog import SENSOR_CHANNELS
+from av_recorder import FlightRecording
+from av_sched import crash_report, restart_delay
+from av_sim import VirtualClock
+
+# Replay of recorded flights through the control stack.
+#
+#   python av_replay.py flight.avr              as fast as possible
+#   python av_replay.py flight.avr --speed 10   ten times real time
+#
+# Recorded samples are read in batches (one recorder chunk, or a slice of the
+# DataLogger history) and published frame by frame into a mission computer's
+# FrameChannel. The flight control, navigation and flight mode steps then run
+# exactly as they do live, each at its TASK_PERIODS rate in recorded time, so
+# a controller change can be evaluated against the same data it saw in flight.
+
+REPLAY_TASKS = ("flight_control", "navigation", "flight_mode")
+
+# Fraction of a period a frame may fall short of a task's due time and still run it
+DUE_TOLERANCE = 1e-6
+
+ReplayResult = namedtuple("ReplayResult", ("times", "commands", "mode_changes", "frames", "wall_seconds"))
+
+
+def logger_batches(data_logger, batch=4096, t_start=None, t_end=None):
+    # Copied up front: a live logger keeps overwriting its ring buffer
+    if t_start is None and t_end is None:
+        times, data = data_logger.window()
+    else:
+        times, data = data_logger.buffer.between(-np.inf if t_start is None else t_start,
+                                                 np.inf if t_end is None else t_end)
+    times = times.copy()
+    data = data.copy()
+    for i in range(0, len(times), batch):
+        yield times[i:i + batch], data[:, i:i + batch]
+
+
+def recording_batches(recording, t_start=None, t_end=None):
+    # One batch per recorder chunk, read from the memory map
+    rows = [recording.index[name] for name in SENSOR_CHANNELS]
+    for i in range(recording.n_chunks):
+        if t_end is not None and recording.t_first[i] >= t_end:
+            break
+        if t_start is not None and recording.t_last[i] < t_start:
+            continue
+        chunk = recording.chunk(i)
+        times = chunk[0]
+        lo = 0 if t_start is None else int(np.searchsorted(times, t_start, side="left"))
+        hi = len(times) if t_end is None else int(np.searchsorted(times, t_end, side="left"))
+        yield times[lo:hi], chunk[rows, lo:hi]
+
+
+class FlightReplay:
+    def __init__(self, computer=None, speed=None, tasks=REPLAY_TASKS):
+        if computer is None:
+            from av_sm1 import AvionicsMissionComputer
+            computer = AvionicsMissionComputer(clock=VirtualClock())
+        self.computer = computer
+        # None or 0 replays as fast as possible, otherwise a multiple of real time
+        self.speed = speed
+        self.tasks = tuple(tasks)
+        self.steps = [(computer.TASK_PERIODS[name], computer.timed_step(name)) for name in tasks]
+
+    def run(self, batches):
+        computer = self.computer
+        channel = computer.sensor_frames
+        clock = computer.clock
+        virtual = isinstance(clock, VirtualClock)
+        control = computer.flight_control_system
+        names = tuple(control.get_commands())
+        steps = self.steps
+        task_names = self.tasks
+        crashes = [0] * len(steps)
+        consecutive = [0] * len(steps)
+        speed = self.speed
+        mode = computer.flight_mode
+        mode_changes = []
+        times_parts = []
+        command_parts = []
+        # Per task: (schedule origin, ticks run since it); due times are
+        # origin + tick * period so periods never accumulate rounding drift
+        origins = None
+        ticks = None
+        t_first = None
+        started = time.perf_counter()
+        for times, data in batches:
+            n = len(times)
+            if n == 0:
+                continue
+            commands = np.empty((n, len(names)))
+            for k, (t, values) in enumerate(zip(times.tolist(), data.T.tolist())):
+                if t_first is None:
+                    t_first = t
+                    origins = [t] * len(steps)
+                    ticks = [0] * len(steps)
+                if speed:
+                    delay = started + (t - t_first) / speed - time.perf_counter()
+                    if delay > 0.001:
+                        time.sleep(delay)
+                if virtual:
+                    clock.time = t
+                channel.publish_values(t, values)
+                for i, (period, step) in enumerate(steps):
+                    due = origins[i] + ticks[i] * period
+                    # Frame and task times come from different multiples of their
+                    # periods; allow for the last bits of rounding between them
+                    if t >= due - DUE_TOLERANCE * period:
+                        try:
+                            step()
+                        except Exception as e:
+                            # Backed off and restarted as the scheduler would do live
+                            crashes[i] += 1
+                            consecutive[i] += 1
+                            backoff = restart_delay(period, consecutive[i])
+                            report = getattr(computer, "task_crashed", None)
+                            if report is not None:
+                                report(task_names[i], crash_report(task_names[i], e, crashes[i], backoff))
+                            origins[i] = t + backoff
+                            ticks[i] = 0
+                            continue
+                        consecutive[i] = 0
+                        if t - due >= period:
+                            # Gaps in the recording restart the schedule instead of bursting
+                            origins[i] = t
+                            ticks[i] = 1
+                        else:
+                            ticks[i] += 1
+                if computer.flight_mode != mode:
+                    mode = computer.flight_mode
+                    mode_changes.append((t, mode))
+                current = control.get_commands()
+                commands[k] = [current[name] for name in names]
+            times_parts.append(np.array(times, dtype=np.float64))
+            command_parts.append(commands)
+        if times_parts:
+            times = np.concatenate(times_parts)
+            commands = np.concatenate(command_parts)
+        else:
+            times = np.empty(0)
+            commands = np.empty((0, len(names)))
+        return ReplayResult(
+            times=times,
+            commands={name: commands[:, i] for i, name in enumerate(names)},
+            mode_changes=mode_changes,
+            frames=len(times),
+            wall_seconds=time.perf_counter() - started,
+        )
+
+    def replay_logger(self, data_logger, batch=4096, t_start=None, t_end=None):
+        return self.run(logger_batches(data_logger, batch, t_start, t_end))
+
+    def replay_recording(self, path, t_start=None, t_end=None):
+        with FlightRecording(path) as recording:
+            return self.run(recording_batches(recording, t_start, t_end))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a flight recording through the control stack")
+    parser.add_argument("recording", help="file written by FlightRecorder")
+    parser.add_argument("--speed", type=float, default=0.0, help="multiple of real time (default: as fast as possible)")
+    parser.add_argument("--start", type=float, default=None, help="first timestamp to replay")
+    parser.add_argument("--end", type=float, default=None, help="replay up to this timestamp")
+    args = parser.parse_args(argv)
+
+    av_log.configure(level="WARNING")
+    result = FlightReplay(speed=args.speed).replay_recording(args.recording, args.start, args.end)
+    av_log.shutdown()
+    if result.frames == 0:
+        print("no frames in range")
+        return 1
+    span = float(result.times[-1] - result.times[0])
+    print(f"replayed {result.frames} frames ({span:.1f}s recorded) in {result.wall_seconds:.2f}s wall "
+          f"({span / result.wall_seconds:.0f}x real time)")
+    for t, mode in result.mode_changes:
+        print(f"  t={t:.3f} flight mode -> {mode}")
+    for name, values in result.commands.items():
+        print(f"  {name:6s} mean={values.mean():+.4f} min={values.min():+.4f} max={values.max():+.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
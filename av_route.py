@@ -0,0 +1,344 @@
+import heapq
+import math
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from av_spatial import EARTH_RADIUS, SpatialIndex
+
+# Waypoint graph route planning for NavigationSystem.
+#
+# Positions follow SensorData: (longitude, latitude, altitude) in degrees and
+# metres. Airways are an undirected graph stored in CSR form with great-circle
+# edge lengths. Routes are found with A* using the great-circle distance to the
+# destination as heuristic, which never overestimates an airway path and so
+# keeps A* optimal.
+#
+# RoutePlanner keeps the current route between ticks. A tick only advances
+# the active leg and checks the cross-track error; a search happens when the
+# aircraft leaves the corridor around its leg or when an edge on the remaining
+# route changes, and then only if the route cannot be rejoined or taken from
+# the cache.
+
+def haversine(lon1, lat1, lon2, lat2):
+    # Great-circle distance in metres; arguments broadcast like numpy arrays
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def bearing(lon1, lat1, lon2, lat2):
+    # Initial great-circle bearing in degrees clockwise from north, in [0, 360)
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    dlon = lon2 - lon1
+    y = np.sin(dlon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+
+# Scalar versions for the per-tick path, where numpy call overhead dominates
+def _distance(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = math.radians(lon1), math.radians(lat1), math.radians(lon2), math.radians(lat2)
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def _bearing(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = math.radians(lon1), math.radians(lat1), math.radians(lon2), math.radians(lat2)
+    dlon = lon2 - lon1
+    y = math.sin(dlon) * math.cos(lat2)
+    x = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(dlon)
+    return math.degrees(math.atan2(y, x)) % 360.0
+
+
+def _track_errors(lon, lat, start, end):
+    # (cross-track, along-track) distance of a point relative to the leg start -> end
+    d13 = _distance(start[0], start[1], lon, lat) / EARTH_RADIUS
+    if d13 == 0.0:
+        return 0.0, 0.0
+    delta = math.radians(_bearing(start[0], start[1], lon, lat) - _bearing(start[0], start[1], end[0], end[1]))
+    xt = math.asin(math.sin(d13) * math.sin(delta))
+    at = math.acos(max(-1.0, min(1.0, math.cos(d13) / math.cos(xt))))
+    return xt * EARTH_RADIUS, math.copysign(at, math.cos(delta)) * EARTH_RADIUS
+
+
+class WaypointGraph:
+    def __init__(self, lon, lat, edges, names=None, history=1024):
+        self.lon = np.ascontiguousarray(lon, dtype=np.float64)
+        self.lat = np.ascontiguousarray(lat, dtype=np.float64)
+        self.names = names
+        self.version = 0
+        # (version, u, v, old cost, new cost) for the latest `history` edge changes
+        self._changes = deque(maxlen=history)
+        # Changes after this version are all still in _changes
+        self._complete_after = 0
+        self._spatial_index = None
+        self._edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        self._build()
+
+    def __len__(self):
+        return len(self.lon)
+
+    def _build(self):
+        n = len(self.lon)
+        src = np.concatenate((self._edges[:, 0], self._edges[:, 1]))
+        dst = np.concatenate((self._edges[:, 1], self._edges[:, 0]))
+        order = np.lexsort((dst, src))
+        src = src[order]
+        dst = dst[order]
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(src, minlength=n))))
+        self.indices = dst
+        self.weights = haversine(self.lon[src], self.lat[src], self.lon[dst], self.lat[dst])
+        # Plain lists for the search loop; indexing numpy scalars is much slower
+        self._adjacency = (self.indptr.tolist(), self.indices.tolist(), self.weights.tolist())
+        self._heuristics = OrderedDict()
+
+    @property
+    def spatial_index(self):
+        # Built on first use; node positions never change after construction
+        if self._spatial_index is None:
+            self._spatial_index = SpatialIndex(self.lon, self.lat)
+        return self._spatial_index
+
+    def position(self, node, altitude=0.0):
+        return (float(self.lon[node]), float(self.lat[node]), altitude)
+
+    def nearest(self, lon, lat):
+        return self.spatial_index.nearest(lon, lat)[0][1]
+
+    def nearest_nodes(self, lon, lat, k):
+        # [(great-circle metres, node)] for the k closest waypoints
+        return self.spatial_index.nearest(lon, lat, k)
+
+    def heuristic(self, goal):
+        # Great-circle distance from every node to goal, kept for recent goals
+        h = self._heuristics.get(goal)
+        if h is None:
+            h = haversine(self.lon, self.lat, self.lon[goal], self.lat[goal]).tolist()
+            self._heuristics[goal] = h
+            if len(self._heuristics) > 8:
+                self._heuristics.popitem(last=False)
+        return h
+
+    def _edge_slots(self, u, v):
+        lo, hi = self.indptr[u], self.indptr[u + 1]
+        return lo + np.flatnonzero(self.indices[lo:hi] == v)
+
+    def set_edge_cost(self, u, v, cost):
+        # Reweights (or with cost=inf closes) the airway between u and v
+        old = None
+        weights = self._adjacency[2]
+        for a, b in ((u, v), (v, u)):
+            for j in self._edge_slots(a, b):
+                old = weights[j]
+                weights[j] = cost
+                self.weights[j] = cost
+        if old is None:
+            raise KeyError(f"no edge between {u} and {v}")
+        self.version += 1
+        self._record(u, v, old, cost)
+
+    def add_edges(self, edges):
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        self._edges = np.concatenate((self._edges, edges))
+        self._build()
+        self.version += 1
+        for u, v in edges.tolist():
+            self._record(u, v, math.inf, 0.0)
+
+    def _record(self, u, v, old, new):
+        changes = self._changes
+        if len(changes) == changes.maxlen:
+            self._complete_after = changes[0][0]
+        changes.append((self.version, u, v, old, new))
+
+    def changes_since(self, version):
+        # (u, v, old cost, new cost) for every edge change after `version`, or
+        # None if some of them have already been dropped from the history
+        if version < self._complete_after:
+            return None
+        changes = []
+        # Newest first, stopping at the first change the caller has seen
+        for change in reversed(self._changes):
+            if change[0] <= version:
+                break
+            changes.append(change[1:])
+        changes.reverse()
+        return changes
+
+
+def synthetic_grid(nx=200, ny=200, lon_range=(-10.0, 60.0), lat_range=(-10.0, 60.0), jitter=0.2, seed=0):
+    # Jittered lat/lon grid joined by orthogonal and diagonal airways
+    rng = np.random.default_rng(seed)
+    lon, lat = np.meshgrid(np.linspace(*lon_range, nx), np.linspace(*lat_range, ny))
+    step = min((lon_range[1] - lon_range[0]) / max(nx - 1, 1), (lat_range[1] - lat_range[0]) / max(ny - 1, 1))
+    lon = lon.ravel() + rng.uniform(-jitter, jitter, nx * ny) * step
+    lat = np.clip(lat.ravel() + rng.uniform(-jitter, jitter, nx * ny) * step, -90.0, 90.0)
+    ids = np.arange(nx * ny).reshape(ny, nx)
+    edges = np.concatenate([
+        np.stack((ids[:, :-1].ravel(), ids[:, 1:].ravel()), axis=1),
+        np.stack((ids[:-1, :].ravel(), ids[1:, :].ravel()), axis=1),
+        np.stack((ids[:-1, :-1].ravel(), ids[1:, 1:].ravel()), axis=1),
+        np.stack((ids[:-1, 1:].ravel(), ids[1:, :-1].ravel()), axis=1),
+    ])
+    return WaypointGraph(lon, lat, edges)
+
+
+def astar(graph, start, goal):
+    # Node list from start to goal, or None when goal is unreachable
+    indptr, indices, weights = graph._adjacency
+    h = graph.heuristic(goal)
+    g = {start: 0.0}
+    parent = {start: -1}
+    closed = set()
+    heap = [(h[start], start)]
+    while heap:
+        _, u = heapq.heappop(heap)
+        if u == goal:
+            path = []
+            while u != -1:
+                path.append(u)
+                u = parent[u]
+            path.reverse()
+            return path
+        if u in closed:
+            continue
+        closed.add(u)
+        g_u = g[u]
+        for j in range(indptr[u], indptr[u + 1]):
+            v = indices[j]
+            cost = g_u + weights[j]
+            if cost < g.get(v, math.inf):
+                g[v] = cost
+                parent[v] = u
+                heapq.heappush(heap, (cost + h[v], v))
+    return None
+
+
+class RoutePlanner:
+    def __init__(self, graph, corridor=5000.0, capture_radius=2000.0, cache_size=256):
+        self.graph = graph
+        self.corridor = corridor
+        self.capture_radius = capture_radius
+        # (start node, goal node) -> node path; the start node is the graph
+        # node whose region the aircraft was in when the route was planned
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.stats = {"searches": 0, "cache_hits": 0, "rejoins": 0, "unreachable": 0}
+        self.destination = None
+        self.graph_version = graph.version
+        self.path = []
+        self.targets = []
+        self.leg = 0
+        self.leg_start = None
+        self.leg_length = 0.0
+        self.route = ()
+        self.cross_track_error = 0.0
+        self.desired_track = 0.0
+
+    def _search(self, start, goal):
+        key = (start, goal)
+        path = self.cache.get(key)
+        if path is not None:
+            self.cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return path
+        self.stats["searches"] += 1
+        path = astar(self.graph, start, goal)
+        if path is None:
+            self.stats["unreachable"] += 1
+            return None
+        self.cache[key] = path
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return path
+
+    def _set_path(self, path, leg, position):
+        graph = self.graph
+        self.path = path
+        self.targets = [(float(graph.lon[node]), float(graph.lat[node])) for node in path]
+        self.targets.append((self.destination[0], self.destination[1]))
+        self.leg = leg
+        self._start_leg((position[0], position[1]))
+        self._update_route()
+
+    def _start_leg(self, start):
+        target = self.targets[self.leg]
+        self.leg_start = start
+        self.leg_length = _distance(start[0], start[1], target[0], target[1])
+
+    def _update_route(self):
+        altitude = self.destination[2]
+        self.route = tuple((lon, lat, altitude) for lon, lat in self.targets[self.leg:-1]) + (self.destination,)
+
+    def plan(self, position):
+        graph = self.graph
+        start = graph.nearest(position[0], position[1])
+        goal = graph.nearest(self.destination[0], self.destination[1])
+        path = self._search(start, goal)
+        if path is None:
+            # No airway connects start and goal; fly direct
+            path = []
+        self._set_path(path, 0, position)
+
+    def rejoin(self, position):
+        # Off corridor: continue from the nearest node if it lies ahead on the
+        # current path, otherwise plan from there
+        node = self.graph.nearest(position[0], position[1])
+        remaining = self.path[self.leg:]
+        if node in remaining:
+            self.stats["rejoins"] += 1
+            self.leg += remaining.index(node)
+            self._start_leg((position[0], position[1]))
+            self._update_route()
+        else:
+            self.plan(position)
+
+    def _route_affected(self, changes):
+        on_route = set(zip(self.path[self.leg:], self.path[self.leg + 1:]))
+        for u, v, old, new in changes:
+            # A cheaper or new airway anywhere may shorten the route; a
+            # dearer one only matters if the route uses it
+            if new < old or (u, v) in on_route or (v, u) in on_route:
+                return True
+        return False
+
+    def update(self, position, destination):
+        # Called every navigation tick; returns the waypoints still ahead
+        graph = self.graph
+        if destination != self.destination:
+            self.destination = tuple(destination)
+            self.graph_version = graph.version
+            self.plan(position)
+        elif graph.version != self.graph_version:
+            changes = graph.changes_since(self.graph_version)
+            self.graph_version = graph.version
+            self.cache.clear()
+            # Too far behind for the bounded change history: plan from scratch
+            if changes is None or self._route_affected(changes):
+                self.plan(position)
+
+        lon, lat = position[0], position[1]
+        targets = self.targets
+        advanced = False
+        while True:
+            target = targets[self.leg]
+            cross_track, along_track = _track_errors(lon, lat, self.leg_start, target)
+            # Waypoint captured or passed abeam: move on to the next leg
+            if self.leg + 1 < len(targets) and (
+                    along_track > self.leg_length
+                    or _distance(lon, lat, target[0], target[1]) < self.capture_radius):
+                self.leg += 1
+                self._start_leg(target)
+                advanced = True
+                continue
+            break
+        if advanced:
+            self._update_route()
+        if abs(cross_track) > self.corridor:
+            self.rejoin(position)
+            target = self.targets[self.leg]
+            cross_track = 0.0
+        self.cross_track_error = cross_track
+        self.desired_track = _bearing(lon, lat, target[0], target[1])
+        return self.route
@@ -0,0 +1,301 @@
+import heapq
+import threading
+import time
+
+# Rate-monotonic periodic task scheduler on a small worker pool.
+#
+# Each task declares a period, an optional priority, a work budget and an
+# overrun policy. Releases are computed on an absolute grid (start + k *
+# period), so late wakeups never accumulate drift. Released jobs wait in a
+# ready queue ordered by priority, then absolute deadline; without an explicit
+# priority a task ranks by its period (rate-monotonic: the shorter the period,
+# the more urgent). Idle workers sleep until the next release, and whichever
+# wakes first releases the due jobs for the pool.
+#
+# A task overruns when it exceeds its budget, misses its deadline (the end of
+# its period) or is still pending at its next release. The policy decides:
+#   skip     drop the task's next release, handing the time to others
+#   degrade  double the task's period (up to max_degrade times the nominal
+#            one), restoring it step by step after clean runs
+#   alert    run every release anyway (one catch-up run at most) and report
+# Every overrun is reported through on_alert, at most once per alert_interval
+# per task, with a count of the reports folded into it. on_alert and on_crash
+# are called from a worker after it has released the scheduler's lock.
+#
+# The pool also supervises its tasks. A step that raises has crashed: the
+# task is suspended and restarted at its first release after a backoff that
+# doubles with every consecutive crash, and on_crash is told. A worker thread
+# that dies is replaced. Idle workers wait on a condition, so stop() takes
+# effect at once rather than after the longest period.
+
+SKIP, DEGRADE, ALERT = "skip", "degrade", "alert"
+OVERRUN_POLICIES = (SKIP, DEGRADE, ALERT)
+
+RESTART_DELAY = 0.05
+MAX_RESTART_DELAY = 5.0
+
+
+def restart_delay(period, consecutive_crashes, delay=RESTART_DELAY, max_delay=MAX_RESTART_DELAY):
+    # Backoff before restarting a task after its n-th crash in a row; shared
+    # with the single-threaded simulator and replay so they back off alike
+    return min(max(period, delay) * 2 ** (consecutive_crashes - 1), max_delay)
+
+
+def crash_report(name, error, restarts, delay):
+    return (f"Task {name} crashed ({type(error).__name__}: {error}); "
+            f"restart {restarts} in {delay * 1e3:.0f} ms")
+
+
+class ScheduledTask:
+    def __init__(self, name, step, period, priority=None, budget=None, policy=SKIP, order=0):
+        if policy not in OVERRUN_POLICIES:
+            raise ValueError(f"unknown overrun policy {policy!r}")
+        self.name = name
+        self.step = step
+        self.nominal_period = period
+        self.period = period
+        self.declared_priority = priority
+        self.priority = priority
+        self.budget = budget
+        self.policy = policy
+        self.order = order
+        # Queued or running
+        self.pending = False
+        self.skip_next = False
+        self.catch_up = False
+        self.clean_runs = 0
+        self.releases = 0
+        self.runs = 0
+        self.skipped = 0
+        self.overruns = 0
+        self.deadline_misses = 0
+        self.last_alert = None
+        self.unreported = 0
+        self.crashes = 0
+        self.consecutive_crashes = 0
+        self.resume_at = None
+
+    def summary(self):
+        return {
+            "priority": self.priority,
+            "period_ms": self.period * 1e3,
+            "nominal_period_ms": self.nominal_period * 1e3,
+            "budget_ms": None if self.budget is None else self.budget * 1e3,
+            "policy": self.policy,
+            "releases": self.releases,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "overruns": self.overruns,
+            "deadline_misses": self.deadline_misses,
+            "restarts": self.crashes,
+            "suspended": self.resume_at is not None,
+        }
+
+
+class RateMonotonicScheduler:
+    def __init__(self, workers=2, clock=time.monotonic, on_alert=None, max_degrade=8, recover_after=10,
+                 alert_interval=1.0, on_crash=None, restart_delay=RESTART_DELAY, max_restart_delay=MAX_RESTART_DELAY,
+                 supervise_interval=0.5):
+        # clock must advance in real seconds: idle workers wait on it
+        self.workers = workers
+        self.clock = clock
+        self.on_alert = on_alert
+        self.on_crash = on_crash
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.supervise_interval = supervise_interval
+        self.worker_restarts = 0
+        self._next_supervision = None
+        self.max_degrade = max_degrade
+        self.recover_after = recover_after
+        self.alert_interval = alert_interval
+        self.tasks = {}
+        self._releases = []  # (release time, order, task)
+        self._ready = []  # (priority, deadline, order, release, task)
+        self._cond = threading.Condition()
+        # (callback, task name, message) raised under the lock, delivered after it
+        self._notices = []
+        self._threads = []
+        self._running = False
+
+    def add(self, name, step, period, priority=None, budget=None, policy=SKIP):
+        if self._running:
+            raise RuntimeError("tasks must be added before the scheduler starts")
+        task = ScheduledTask(name, step, period, priority, budget, policy, len(self.tasks))
+        self.tasks[name] = task
+        return task
+
+    def start(self):
+        # Rate-monotonic ranks: one level per distinct period, shortest first
+        ranks = {period: rank for rank, period in enumerate(sorted({t.nominal_period for t in self.tasks.values()}))}
+        now = self.clock()
+        for task in self.tasks.values():
+            task.priority = ranks[task.nominal_period] if task.declared_priority is None else task.declared_priority
+            self._releases.append((now, task.order, task))
+        heapq.heapify(self._releases)
+        self._running = True
+        self._next_supervision = now + self.supervise_interval
+        self._threads = [self._spawn(i) for i in range(self.workers)]
+
+    def _spawn(self, i):
+        thread = threading.Thread(target=self._work, name=f"av-scheduler-{i}", daemon=True)
+        thread.start()
+        return thread
+
+    def _supervise(self, now):
+        # Replaces worker threads that died, e.g. from a BaseException in a step
+        self._next_supervision = now + self.supervise_interval
+        for i, thread in enumerate(self._threads):
+            if not thread.is_alive() and thread is not threading.current_thread():
+                self.worker_restarts += 1
+                self._threads[i] = self._spawn(i)
+
+    def stop(self, timeout=None):
+        # Wakes idle workers at once; busy ones exit after their current step
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _work(self):
+        cond = self._cond
+        clock = self.clock
+        while True:
+            with cond:
+                task = None
+                while self._running:
+                    now = clock()
+                    if now >= self._next_supervision:
+                        self._supervise(now)
+                    self._release_due(now)
+                    if self._ready:
+                        priority, deadline, order, release, task = heapq.heappop(self._ready)
+                        if self._ready:
+                            # More work is waiting: hand it to another idle worker
+                            cond.notify()
+                        break
+                    if self._notices:
+                        # Delivered before sleeping, outside the lock
+                        break
+                    cond.wait(self._releases[0][0] - now if self._releases else None)
+                running = self._running
+                notices = self._take_notices()
+            self._deliver(notices)
+            if not running:
+                return
+            if task is None:
+                continue
+            t0 = time.perf_counter_ns()
+            crash = None
+            try:
+                task.step()
+            except Exception as e:
+                crash = e
+            finally:
+                work = (time.perf_counter_ns() - t0) * 1e-9
+                with cond:
+                    self._complete(task, release, deadline, work, clock(), crash)
+                    notices = self._take_notices()
+                self._deliver(notices)
+
+    def _take_notices(self):
+        # Called with the lock held
+        notices = self._notices
+        if notices:
+            self._notices = []
+        return notices
+
+    @staticmethod
+    def _deliver(notices):
+        # on_alert / on_crash run without the lock, so they may take their
+        # time or call back into the scheduler without stalling the pool
+        for callback, name, message in notices:
+            callback(name, message)
+
+    def _release_due(self, now):
+        releases = self._releases
+        while releases and releases[0][0] <= now:
+            release, order, task = heapq.heappop(releases)
+            task.releases += 1
+            if task.resume_at is not None and release < task.resume_at:
+                # Crashed and backing off
+                pass
+            elif task.pending:
+                self._overrun(task, now, "still running at its next release")
+                if task.policy == ALERT:
+                    task.catch_up = True
+                else:
+                    task.skipped += 1
+            elif task.skip_next:
+                task.skip_next = False
+                task.skipped += 1
+            else:
+                task.resume_at = None
+                self._queue(task, release)
+            following = release + task.period
+            if following <= now:
+                # Releases the pool could not even start are dropped, keeping the grid
+                missed = int((now - following) / task.period) + 1
+                task.skipped += missed
+                following += missed * task.period
+            heapq.heappush(releases, (following, order, task))
+
+    def _queue(self, task, release):
+        task.pending = True
+        heapq.heappush(self._ready, (task.priority, release + task.period, task.order, release, task))
+
+    def _complete(self, task, release, deadline, work, now, crash=None):
+        task.runs += 1
+        task.pending = False
+        if crash is not None:
+            self._crashed(task, now, crash)
+            return
+        task.consecutive_crashes = 0
+        late = now > deadline
+        over = task.budget is not None and work > task.budget
+        if late:
+            task.deadline_misses += 1
+        if over or late:
+            task.overruns += 1
+            task.clean_runs = 0
+            if over:
+                self._overrun(task, now, f"work {work * 1e3:.3f} ms over its {task.budget * 1e3:.3f} ms budget")
+            else:
+                self._overrun(task, now, f"finished {(now - deadline) * 1e3:.3f} ms after its deadline")
+        else:
+            task.clean_runs += 1
+            if task.period > task.nominal_period and task.clean_runs >= self.recover_after:
+                task.period = max(task.period / 2, task.nominal_period)
+                task.clean_runs = 0
+        if task.catch_up and self._running:
+            task.catch_up = False
+            self._queue(task, max(release + task.period, now - task.period))
+            self._cond.notify()
+
+    def _crashed(self, task, now, error):
+        task.crashes += 1
+        task.consecutive_crashes += 1
+        task.catch_up = False
+        delay = restart_delay(task.nominal_period, task.consecutive_crashes, self.restart_delay,
+                              self.max_restart_delay)
+        task.resume_at = now + delay
+        if self.on_crash is not None:
+            self._notices.append((self.on_crash, task.name, crash_report(task.name, error, task.crashes, delay)))
+
+    def _overrun(self, task, now, reason):
+        if task.policy == SKIP:
+            task.skip_next = True
+        elif task.policy == DEGRADE:
+            task.period = min(task.period * 2, task.nominal_period * self.max_degrade)
+        task.unreported += 1
+        if self.on_alert is not None and (task.last_alert is None or now - task.last_alert >= self.alert_interval):
+            count, task.unreported = task.unreported, 0
+            task.last_alert = now
+            self._notices.append((self.on_alert, task.name, f"Task {task.name} overran ({task.policy}): {reason}"
+                                  + (f" [{count} overruns since last report]" if count > 1 else "")))
+
+    def summary(self):
+        with self._cond:
+            return {name: task.summary() for name, task in self.tasks.items()}
@@ -0,0 +1,228 @@
+import numpy as np
+
+from av_datalog import SENSOR_CHANNELS
+
+# Per-channel sensor noise models.
+# Every component adds its contribution to a whole block of samples at once.
+# Block k draws from a Generator seeded by (sensor seed, k), so any block can
+# be produced without generating the ones before it; state (walk position,
+# bias) carries over between blocks so the stream is continuous, and skip()
+# advances that state across whole blocks without drawing their samples.
+# Components marked `shared` describe the measured quantity itself rather than
+# the sensor. They draw from the truth seed's streams, so redundant sensors
+# built with the same truth seed observe the same flight with independent
+# errors, also when one of them skipped ahead while idle.
+
+# Stream tags under a seed: per-block sample generators, per-walk block endpoints
+BLOCK_STREAM = 0
+WALK_STREAM = 1
+
+
+def seed_sequence(seed):
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+
+def stream(seed, *key):
+    # Independent Generator for `key` under a SeedSequence
+    return np.random.default_rng(np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + key))
+
+
+class GaussianNoise:
+    # White measurement noise
+    shared = False
+
+    def __init__(self, sigma):
+        self.sigma = sigma
+
+    def apply(self, rng, out):
+        out += rng.normal(0.0, self.sigma, out.shape[0])
+
+    def skip(self, blocks, size):
+        pass
+
+
+class BiasDrift:
+    # Bias that drifts linearly by `rate` units per sample
+    shared = False
+
+    def __init__(self, rate, initial=0.0):
+        self.rate = rate
+        self.bias = initial
+
+    def apply(self, rng, out):
+        n = out.shape[0]
+        out += self.bias + self.rate * np.arange(1, n + 1)
+        self.bias += self.rate * n
+
+    def skip(self, blocks, size):
+        # Block by block, rounding like apply()
+        for _ in range(blocks):
+            self.bias += self.rate * size
+
+
+class RandomWalk:
+    # Integrated white noise, kept within +/- limit of the nominal value.
+    # Each block first draws where the walk ends from `rng`, its own stream of
+    # one value per block, then fills the path in between as a Brownian bridge
+    # from the block's generator; the marginals are those of a plain cumulative
+    # sum, but skipping a block only costs its endpoint.
+    shared = True
+
+    def __init__(self, sigma, limit=np.inf):
+        self.sigma = sigma
+        self.limit = limit
+        self.state = 0.0
+        # Endpoint stream; SensorModel seeds it per sensor (or per truth seed)
+        self.rng = np.random.default_rng()
+
+    def apply(self, rng, out):
+        n = out.shape[0]
+        end = self.rng.normal(0.0, self.sigma * np.sqrt(n))
+        walk = np.cumsum(rng.normal(0.0, self.sigma, n))
+        walk -= (walk[-1] - end) / n * np.arange(1, n + 1)
+        # Exactly the drawn endpoint, so skip() lands on the same state bit for bit
+        walk[-1] = end
+        walk += self.state
+        np.clip(walk, -self.limit, self.limit, out=walk)
+        self.state = float(walk[-1])
+        out += walk
+
+    def skip(self, blocks, size):
+        # Same endpoint draws and clipping as `blocks` calls to apply()
+        for step in self.rng.normal(0.0, self.sigma * np.sqrt(size), blocks):
+            self.state = min(max(self.state + step, -self.limit), self.limit)
+
+
+class Quantization:
+    # ADC resolution; applied after all other components
+    shared = False
+
+    def __init__(self, step):
+        self.step = step
+
+    def apply(self, rng, out):
+        np.round(out / self.step, out=out)
+        out *= self.step
+
+    def skip(self, blocks, size):
+        pass
+
+
+class ChannelModel:
+    def __init__(self, nominal, components=(), lo=-np.inf, hi=np.inf, wrap=False):
+        self.nominal = nominal
+        self.components = list(components)
+        self.lo = lo
+        self.hi = hi
+        self.wrap = wrap
+
+    def generate(self, rng, out, truth_rng=None):
+        out.fill(self.nominal)
+        quantization = None
+        for component in self.components:
+            if isinstance(component, Quantization):
+                quantization = component
+            elif component.shared and truth_rng is not None:
+                component.apply(truth_rng, out)
+            else:
+                component.apply(rng, out)
+        if self.wrap:
+            np.mod(out - self.lo, self.hi - self.lo, out=out)
+            out += self.lo
+        else:
+            np.clip(out, self.lo, self.hi, out=out)
+        if quantization is not None:
+            quantization.apply(rng, out)
+
+    def skip(self, blocks, size):
+        for component in self.components:
+            component.skip(blocks, size)
+
+
+def default_channel_models():
+    # Nominal values and limits follow the ranges SensorData used to draw uniformly from
+    return {
+        "altitude": ChannelModel(5500.0, [RandomWalk(2.0, 4500), GaussianNoise(1.5), Quantization(0.5)], 1000, 10000),
+        "speed": ChannelModel(500.0, [RandomWalk(0.5, 300), GaussianNoise(0.8), Quantization(0.1)], 200, 800),
+        "position_x": ChannelModel(0.0, [RandomWalk(2e-5), GaussianNoise(1e-5)], -180, 180, wrap=True),
+        "position_y": ChannelModel(0.0, [RandomWalk(2e-5, 90), GaussianNoise(1e-5)], -90, 90),
+        "position_z": ChannelModel(5500.0, [RandomWalk(2.0, 4500), GaussianNoise(3.0)], 0, 10000),
+        "temperature": ChannelModel(0.0, [RandomWalk(0.01, 50), GaussianNoise(0.1), Quantization(0.1)], -50, 50),
+        "pressure": ChannelModel(1000.0, [RandomWalk(0.01, 50), GaussianNoise(0.05), Quantization(0.01)], 950, 1050),
+        "gyro_x": ChannelModel(0.0, [GaussianNoise(0.5), BiasDrift(1e-5), Quantization(0.01)], -180, 180),
+        "gyro_y": ChannelModel(0.0, [GaussianNoise(0.5), BiasDrift(1e-5), Quantization(0.01)], -180, 180),
+        "gyro_z": ChannelModel(0.0, [GaussianNoise(0.5), BiasDrift(1e-5), Quantization(0.01)], -180, 180),
+        "accelerometer_x": ChannelModel(0.0, [GaussianNoise(0.05), BiasDrift(1e-6), Quantization(0.001)], -10, 10),
+        "accelerometer_y": ChannelModel(0.0, [GaussianNoise(0.05), BiasDrift(1e-6), Quantization(0.001)], -10, 10),
+        "accelerometer_z": ChannelModel(-9.81, [GaussianNoise(0.05), BiasDrift(1e-6), Quantization(0.001)], -10, 10),
+        "magnetometer_x": ChannelModel(20.0, [GaussianNoise(0.3), Quantization(0.1)], -100, 100),
+        "magnetometer_y": ChannelModel(0.0, [GaussianNoise(0.3), Quantization(0.1)], -100, 100),
+        "magnetometer_z": ChannelModel(-45.0, [GaussianNoise(0.3), Quantization(0.1)], -100, 100),
+        "wind_speed": ChannelModel(30.0, [RandomWalk(0.05, 30), GaussianNoise(0.5)], 0, 100),
+        "wind_direction": ChannelModel(180.0, [RandomWalk(0.05), GaussianNoise(1.0)], 0, 360, wrap=True),
+        "humidity": ChannelModel(50.0, [RandomWalk(0.01, 50), GaussianNoise(0.2)], 0, 100),
+        "fuel_level": ChannelModel(100.0, [BiasDrift(-0.055), Quantization(0.01)], 0, 100),
+        "engine_on": ChannelModel(1.0),
+        "oil_pressure": ChannelModel(60.0, [RandomWalk(0.02, 40), GaussianNoise(0.5)], 20, 100),
+        "hydraulic_pressure": ChannelModel(2000.0, [RandomWalk(0.5, 1000), GaussianNoise(5.0)], 1000, 3000),
+        "battery_temperature": ChannelModel(35.0, [RandomWalk(0.005, 15), GaussianNoise(0.1)], 20, 50),
+        "system_voltage": ChannelModel(26.0, [RandomWalk(0.001, 2), GaussianNoise(0.05), Quantization(0.01)], 24, 28),
+    }
+
+
+# Block generator for one sensor instance
+# Samples for every channel are produced `block_size` at a time; next_values()
+# only advances a cursor into the precomputed rows.
+class SensorModel:
+    def __init__(self, seed=None, block_size=4096, channel_models=None, truth_seed=None):
+        models = default_channel_models() if channel_models is None else channel_models
+        self.channels = SENSOR_CHANNELS
+        self.models = [models[name] for name in self.channels]
+        self.seed = seed_sequence(seed)
+        # Without a truth seed the sensor's own streams drive the flight as well
+        self.truth_seed = None if truth_seed is None else seed_sequence(truth_seed)
+        for i, model in enumerate(self.models):
+            for j, component in enumerate(model.components):
+                if isinstance(component, RandomWalk):
+                    source = self.truth_seed if component.shared and self.truth_seed is not None else self.seed
+                    component.rng = stream(source, WALK_STREAM, i, j)
+        self.block_size = block_size
+        # Index of the next block to generate
+        self.blocks = 0
+        self._block = np.empty((len(self.channels), block_size), dtype=np.float64)
+        self._rows = []
+        self._cursor = 0
+
+    def _generate(self):
+        rng = stream(self.seed, BLOCK_STREAM, self.blocks)
+        truth_rng = None if self.truth_seed is None else stream(self.truth_seed, BLOCK_STREAM, self.blocks)
+        for model, out in zip(self.models, self._block):
+            model.generate(rng, out, truth_rng)
+        self.blocks += 1
+
+    def _refill(self):
+        self._generate()
+        self._rows = self._block.T.tolist()
+        self._cursor = 0
+
+    def skip(self, n):
+        # Advances n samples without returning them, so a sensor that was not
+        # read for a while resumes at the current point of the flight
+        remaining = len(self._rows) - self._cursor
+        if n <= remaining:
+            self._cursor += max(n, 0)
+            return
+        full, n = divmod(n - remaining, self.block_size)
+        # Skipped blocks only advance component state; none of their samples are drawn
+        for model in self.models:
+            model.skip(full, self.block_size)
+        self.blocks += full
+        self._refill()
+        self._cursor = n
+
+    def next_values(self):
+        if self._cursor == len(self._rows):
+            self._refill()
+        row = self._rows[self._cursor]
+        self._cursor += 1
+        return row
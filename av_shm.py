@@ -0,0 +1,196 @@
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from av_datalog import SENSOR_CHANNELS
+from av_sensor_models import SensorModel
+
+# Out-of-process sensor generation over a shared-memory ring buffer.
+#
+# Layout of the shared block:
+#   header  int64[4]                 frames written, capacity, channels, stop request
+#   seqs    int64[capacity]          per-slot sequence (negative while being written)
+#   data    float64[capacity, 1 + n] timestamp followed by SENSOR_CHANNELS
+#
+# The single producer marks a slot as in progress, writes it, publishes the
+# slot's sequence and then the global count. Readers copy the newest slot into
+# a preallocated array and re-check its sequence, retrying if the producer
+# lapped them, so no locks, pickling or per-frame allocation are involved.
+
+HEADER_FIELDS = 4
+
+
+class SensorProcessError(Exception):
+    pass
+
+
+class SharedFrameRing:
+    def __init__(self, name=None, capacity=1024, channels=SENSOR_CHANNELS, create=False):
+        n_channels = len(channels)
+        if create:
+            size = 8 * (HEADER_FIELDS + capacity + capacity * (1 + n_channels))
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            # Producers are children of the creating process and share its
+            # resource tracker, so attaching does not take over ownership
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.owner = create
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+        if create:
+            self.header[:] = (0, capacity, n_channels, 0)
+        self.capacity = int(self.header[1])
+        self.n_channels = int(self.header[2])
+        offset = 8 * HEADER_FIELDS
+        self.seqs = np.ndarray((self.capacity,), dtype=np.int64, buffer=self.shm.buf, offset=offset)
+        offset += 8 * self.capacity
+        self.data = np.ndarray((self.capacity, 1 + self.n_channels), dtype=np.float64, buffer=self.shm.buf,
+                               offset=offset)
+        if create:
+            self.seqs[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def count(self):
+        return int(self.header[0])
+
+    def write(self, timestamp, values):
+        seq = int(self.header[0]) + 1
+        slot = (seq - 1) % self.capacity
+        self.seqs[slot] = -seq
+        row = self.data[slot]
+        row[0] = timestamp
+        row[1:] = values
+        self.seqs[slot] = seq
+        self.header[0] = seq
+
+    def read_latest(self, out, retries=16):
+        # Copies the newest complete frame into out; returns its sequence (0 if none)
+        for _ in range(retries):
+            seq = int(self.header[0])
+            if seq == 0:
+                return 0
+            slot = (seq - 1) % self.capacity
+            if self.seqs[slot] != seq:
+                continue
+            np.copyto(out, self.data[slot])
+            if self.seqs[slot] == seq:
+                return seq
+        raise SensorProcessError("sensor ring buffer read kept racing the producer")
+
+    def close(self):
+        self.header = self.seqs = self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _produce(name, seed, period, truth_seed, epoch):
+    ring = SharedFrameRing(name)
+    header = ring.header
+    model = SensorModel(seed, truth_seed=truth_seed)
+    next_release = time.monotonic()
+    if epoch is not None:
+        # Producers sharing an epoch sample the same flight on the same time grid,
+        # also when one is started or restarted later
+        elapsed = max(int((next_release - epoch) / period), 0)
+        model.skip(elapsed)
+        next_release = epoch + elapsed * period
+    try:
+        # The stop request lives in shared memory rather than a multiprocessing
+        # lock, so a killed producer can never leave the consumer blocked
+        while header[3] == 0:
+            ring.write(time.monotonic(), model.next_values())
+            # Absolute release times: sampling rate does not drift with work time
+            next_release += period
+            delay = next_release - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_release = time.monotonic()
+    finally:
+        header = None
+        ring.close()
+
+
+# Sensor generator running in its own process
+class SensorProducer:
+    def __init__(self, seed=None, truth_seed=None, period=0.01, capacity=1024, stale_after=0.5):
+        self.seed = seed
+        self.truth_seed = truth_seed
+        self.period = period
+        self.stale_after = stale_after
+        self.ring = SharedFrameRing(capacity=capacity, create=True)
+        self.process = None
+        self._first_frame = 1
+
+    def start(self, epoch=None):
+        self.ring.header[3] = 0
+        self._first_frame = self.ring.count + 1
+        self.process = multiprocessing.Process(target=_produce,
+                                               args=(self.ring.name, self.seed, self.period, self.truth_seed, epoch),
+                                               name="av-sensor-producer", daemon=True)
+        self.process.start()
+
+    def halt(self):
+        # Stops the process but keeps the ring, so the producer can be started again
+        if self.ring.header is None or self.process is None:
+            return
+        self.ring.header[3] = 1
+        self.process.join()
+        self.process = None
+
+    def stop(self):
+        if self.ring.header is None:
+            return
+        self.ring.header[3] = 1
+        if self.process is not None:
+            self.process.join()
+        self.ring.close()
+
+    def wait_ready(self, timeout=2.0):
+        # Blocks until this run's first frame is available so consumers never start empty
+        deadline = time.monotonic() + timeout
+        while self.ring.count < self._first_frame:
+            if time.monotonic() > deadline or not self.alive():
+                raise SensorProcessError("sensor process did not start producing frames")
+            time.sleep(0.001)
+
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def reader(self):
+        return SharedSensorModel(self.ring, self.stale_after)
+
+
+# Drop-in replacement for SensorModel that reads the producer's latest frame
+class SharedSensorModel:
+    def __init__(self, ring, stale_after=0.5):
+        self.ring = ring
+        self.stale_after = stale_after
+        self.channels = SENSOR_CHANNELS
+        self.seq = 0
+        self.timestamp = 0.0
+        self._frame = np.zeros(1 + ring.n_channels)
+        self._values = None
+
+    def next_values(self):
+        seq = self.ring.read_latest(self._frame)
+        if seq == 0:
+            raise SensorProcessError("sensor process has not produced a frame yet")
+        if seq != self.seq:
+            self.seq = seq
+            self.timestamp = float(self._frame[0])
+            self._values = self._frame[1:].tolist()
+        elif time.monotonic() - self.timestamp > self.stale_after:
+            # Surfaces as a sensor error, which triggers failover in the mission computer
+            raise SensorProcessError(f"sensor process stalled, last frame {seq}")
+        return self._values
+
+    def skip(self, n):
+        # The producer runs on the shared time grid on its own; nothing to catch up
+        pass
@@ -0,0 +1,87 @@
+import heapq
+import math
+
+from av_sched import MAX_RESTART_DELAY, RESTART_DELAY, crash_report, restart_delay
+
+# Discrete-event simulation of AvionicsMissionComputer.
+# Instead of one sleeping thread per task, every task wakeup is an event in a
+# priority queue ordered by virtual time. Events run single-threaded back to
+# back, so an hour of flight takes as long as the subsystem updates themselves.
+# A step that raises is supervised like RateMonotonicScheduler does it: the
+# computer's task_crashed() is told and the task resumes at its first release
+# after the same doubling backoff.
+
+
+# Virtual clock; callable so it can be passed wherever time.monotonic is used
+class VirtualClock:
+    def __init__(self, start=0.0):
+        self.start = start
+        self.time = start
+
+    def __call__(self):
+        return self.time
+
+
+class DiscreteEventSimulator:
+    def __init__(self, computer, clock, periods=None):
+        self.computer = computer
+        self.clock = clock
+        self.periods = dict(computer.TASK_PERIODS if periods is None else periods)
+        self.events = 0
+        self._steps = {name: computer.timed_step(name) for name in self.periods}
+        self.restart_delay = RESTART_DELAY
+        self.max_restart_delay = MAX_RESTART_DELAY
+        self.crashes = dict.fromkeys(self.periods, 0)
+        self._consecutive_crashes = dict.fromkeys(self.periods, 0)
+        # (wakeup time, task order, tick, name); task order breaks ties so that
+        # tasks due at the same instant always run in TASK_PERIODS order
+        self._queue = [(clock.time, order, 0, name) for order, name in enumerate(self.periods)]
+        heapq.heapify(self._queue)
+
+    def run_until(self, end_time):
+        queue = self._queue
+        steps = self._steps
+        periods = self.periods
+        clock = self.clock
+        start = clock.start
+        while queue and queue[0][0] <= end_time:
+            wakeup, order, tick, name = heapq.heappop(queue)
+            clock.time = wakeup
+            try:
+                steps[name]()
+            except Exception as e:
+                tick = self._crashed(name, tick, e)
+            else:
+                self._consecutive_crashes[name] = 0
+                tick += 1
+            self.events += 1
+            # Wakeups are computed from the tick count so periods never accumulate rounding drift
+            heapq.heappush(queue, (start + tick * periods[name], order, tick, name))
+        clock.time = max(clock.time, end_time)
+
+    def _crashed(self, name, tick, error):
+        # Tick of the task's first release after its restart backoff
+        self.crashes[name] += 1
+        self._consecutive_crashes[name] += 1
+        period = self.periods[name]
+        delay = restart_delay(period, self._consecutive_crashes[name], self.restart_delay, self.max_restart_delay)
+        report = getattr(self.computer, "task_crashed", None)
+        if report is not None:
+            report(name, crash_report(name, error, self.crashes[name], delay))
+        return max(tick + 1, math.ceil(tick + delay / period - 1e-9))
+
+    def run(self, duration):
+        self.run_until(self.clock.time + duration)
+
+    @property
+    def now(self):
+        return self.clock.time
+
+
+def create_simulation(seed=None, computer_class=None, start_time=0.0, **kwargs):
+    if computer_class is None:
+        from av_sm1 import AvionicsMissionComputer as computer_class
+    # The computer derives every subsystem's generator from `seed`, so a whole run is reproducible
+    clock = VirtualClock(start_time)
+    computer = computer_class(seed=seed, clock=clock, **kwargs)
+    return DiscreteEventSimulator(computer, clock)
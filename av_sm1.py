@@ -1,8 +1,44 @@
+import os
+import signal
 import time
 import random
 import threading
 from collections import deque
-from datetime import datetime
+import numpy as np
+from av_bus import (ATTITUDE, BITE_RESULTS, CONTROL_COMMANDS, POWER_STATUS, ROUTE, SENSOR_FRAMES, THREAT_LEVEL,
+                    Attitude, BiteResult, ControlCommands, DataBus, FrameChannel, PowerStatus, RouteUpdate,
+                    ThreatLevel)
+from av_control import CONTROL_AXES, DEFAULT_SETPOINTS, PIDBank, measurements
+from av_datalog import SENSOR_CHANNELS, ColumnarRingBuffer, WallClock, sensor_record, sensor_values
+from av_fusion import SensorFusion
+from av_journal import CRITICAL, ERROR, INFO, SEVERITY_NAMES, WARNING, EventJournal
+from av_log import configure as configure_logging, get_logger, shutdown as shutdown_logging
+from av_metrics import DEFAULT_QUANTILES, MetricsServer
+from av_recorder import FlightRecorder
+from av_redundancy import HOT, SensorRedundancy, SensorUnit
+from av_sched import ALERT, DEGRADE, SKIP, RateMonotonicScheduler
+from av_route import RoutePlanner, synthetic_grid
+from av_sensor_models import SensorModel
+from av_shm import SensorProducer
+from av_spatial import SpatialIndex, synthetic_points
+from av_telemetry import DROP_OLDEST, TelemetryDownlink, parse_address
+from av_timing import TaskMetrics, timed
+from av_validation import (BITE_VALIDATOR, CONTROL_VALIDATOR, NAVIGATION_VALIDATOR, POWER_VALIDATOR,
+                           SECURITY_VALIDATOR, SENSOR_BATCH_VALIDATOR, SENSOR_VALIDATOR)
+
+# Subsystem loggers; per-tick messages go out at DEBUG and are dropped before formatting
+log_sensor = get_logger("sensor")
+log_control = get_logger("flight_control")
+log_navigation = get_logger("navigation")
+log_bite = get_logger("bite")
+log_communication = get_logger("communication")
+log_power = get_logger("power")
+log_data_logger = get_logger("data_logger")
+log_security = get_logger("security")
+log_errors = get_logger("error_management")
+log_maintenance = get_logger("maintenance")
+log_scenario = get_logger("flight_scenario")
+log_mission = get_logger("mission_computer")
 
 # Yapay zeka denetleyici fonksiyonu
 def ai_check(data):
@@ -19,7 +55,8 @@ def ai_check(data):
 
 # Sensor data class
 class SensorData:
-    def __init__(self):
+    def __init__(self, seed=None, model=None, truth_seed=None):
+        self.model = SensorModel(seed, truth_seed=truth_seed) if model is None else model
         self.altitude = 0.0
         self.speed = 0.0
         self.position = (0.0, 0.0, 0.0)
@@ -38,86 +75,81 @@ class SensorData:
 
     def update(self):
         # Simulate sensor data update
-        self.altitude = random.uniform(1000, 10000)
-        self.speed = random.uniform(200, 800)
-        self.position = (
-            random.uniform(-180, 180),
-            random.uniform(-90, 90),
-            random.uniform(0, 10000)
-        )
-        self.temperature = random.uniform(-50, 50)
-        self.pressure = random.uniform(950, 1050)
-        self.gyro = (
-            random.uniform(-180, 180),
-            random.uniform(-180, 180),
-            random.uniform(-180, 180)
-        )
-        self.accelerometer = (
-            random.uniform(-10, 10),
-            random.uniform(-10, 10),
-            random.uniform(-10, 10)
-        )
-        self.magnetometer = (
-            random.uniform(-100, 100),
-            random.uniform(-100, 100),
-            random.uniform(-100, 100)
-        )
-        self.weather["wind_speed"] = random.uniform(0, 100)
-        self.weather["wind_direction"] = random.uniform(0, 360)
-        self.weather["humidity"] = random.uniform(0, 100)
-        self.fuel_level -= random.uniform(0.01, 0.1)
-        self.fuel_level = max(self.fuel_level, 0)
-        self.oil_pressure = random.uniform(20, 100)
-        self.hydraulic_pressure = random.uniform(1000, 3000)
-        self.battery_temperature = random.uniform(20, 50)
-        self.system_voltage = random.uniform(24, 28)
+        # Next precomputed sample from the per-instance noise models
+        (self.altitude, self.speed, px, py, pz, self.temperature, self.pressure,
+         gx, gy, gz, ax, ay, az, mx, my, mz, wind_speed, wind_direction, humidity,
+         self.fuel_level, _, self.oil_pressure, self.hydraulic_pressure,
+         self.battery_temperature, self.system_voltage) = self.model.next_values()
+        self.position = (px, py, pz)
+        self.gyro = (gx, gy, gz)
+        self.accelerometer = (ax, ay, az)
+        self.magnetometer = (mx, my, mz)
+        self.weather["wind_speed"] = wind_speed
+        self.weather["wind_direction"] = wind_direction
+        self.weather["humidity"] = humidity
 
         # Yapay zeka denetleyici
-        if ai_check(self.__dict__):
-            print("Sensor data AI check passed")
+        if SENSOR_VALIDATOR(self.__dict__):
+            log_sensor.debug("Sensor data AI check passed")
         else:
-            print("Sensor data AI check failed")
+            log_sensor.warning("Sensor data AI check failed")
 
 # Flight control system
 class FlightControlSystem:
-    def __init__(self):
-        self.control_commands = {"pitch": 0.0, "roll": 0.0, "yaw": 0.0}
+    def __init__(self, period=0.01):
+        self.control_commands = {axis: 0.0 for axis in CONTROL_AXES}
         self.error_history = deque(maxlen=10)
+        # Pitch/roll/yaw/throttle PID loops; a bank of one aircraft
+        self.controller = PIDBank(1)
+        self.flight_mode = "NORMAL"
+        self.period = period
+        self.setpoints = np.array([DEFAULT_SETPOINTS])
+        self._measured = np.zeros((1, len(CONTROL_AXES)))
+        self._last_timestamp = None
 
-    def update(self, sensor_data):
+    def set_flight_mode(self, flight_mode):
+        # Gain scheduling; called by the mission computer on mode changes
+        self.flight_mode = flight_mode
+        self.controller.set_mode(flight_mode)
+
+    def update(self, sensor_data, dt=None):
         # Advanced flight control logic
-        self.control_commands["pitch"] = self.calculate_pitch(sensor_data)
-        self.control_commands["roll"] = self.calculate_roll(sensor_data)
-        self.control_commands["yaw"] = self.calculate_yaw(sensor_data)
+        # Frames carry their sample time; plain SensorData falls back to the nominal period
+        timestamp = getattr(sensor_data, "timestamp", None)
+        if dt is None:
+            dt = self.period
+            if timestamp is not None and self._last_timestamp is not None and timestamp > self._last_timestamp:
+                dt = timestamp - self._last_timestamp
+        self._last_timestamp = timestamp
+        self._measured[0] = measurements(sensor_data)
+        output = self.controller.update_many(self.setpoints, self._measured, dt)[0].tolist()
+        commands = self.control_commands
+        commands["pitch"], commands["roll"], commands["yaw"], commands["throttle"] = output
 
         # Yapay zeka denetleyici
-        if ai_check(self.control_commands):
-            print("Flight control AI check passed")
+        if CONTROL_VALIDATOR(commands):
+            log_control.debug("Flight control AI check passed")
         else:
-            print("Flight control AI check failed")
-
-    def calculate_pitch(self, sensor_data):
-        # Placeholder for advanced pitch control algorithm
-        return sensor_data.altitude / 10000
-
-    def calculate_roll(self, sensor_data):
-        # Placeholder for advanced roll control algorithm
-        return sensor_data.speed / 800
-
-    def calculate_yaw(self, sensor_data):
-        # Placeholder for advanced yaw control algorithm
-        return sensor_data.position[0] / 180
+            log_control.warning("Flight control AI check failed")
 
     def get_commands(self):
         return self.control_commands
 
 # Navigation system
 class NavigationSystem:
-    def __init__(self):
+    def __init__(self, graph=None, airports=None, obstacles=None):
         self.destination = (50.0, 50.0, 10000.0)
         self.current_position = (0.0, 0.0, 0.0)
         self.route = []
         self.error_history = deque(maxlen=10)
+        # Without a waypoint graph the route stays the direct leg to the destination
+        self.planner = None if graph is None else RoutePlanner(graph)
+        # Optional av_spatial.SpatialIndex instances for proximity queries
+        self.airports = airports
+        self.obstacles = obstacles
+        self.desired_track = 0.0
+        self.cross_track_error = 0.0
+        self._checked_route = None
 
     def update(self, sensor_data):
         self.current_position = sensor_data.position
@@ -126,94 +158,138 @@ class NavigationSystem:
         self.follow_route()
 
         # Yapay zeka denetleyici
-        if ai_check({"current_position": self.current_position, "route": self.route}):
-            print("Navigation AI check passed")
+        # A planned route only changes on waypoint capture or replanning, so it is checked once per change
+        route = () if self.route is self._checked_route else self.route
+        self._checked_route = self.route
+        if NAVIGATION_VALIDATOR({"current_position": self.current_position, "route": route}):
+            log_navigation.debug("Navigation AI check passed")
         else:
-            print("Navigation AI check failed")
+            log_navigation.warning("Navigation AI check failed")
 
     def plan_route(self):
-        # Placeholder for advanced route planning algorithm
-        self.route = [self.current_position, self.destination]
+        if self.planner is None:
+            self.route = [self.current_position, self.destination]
+        else:
+            # Reuses the current route unless the aircraft left its corridor or the graph changed
+            self.route = self.planner.update(self.current_position, self.destination)
 
     def follow_route(self):
-        # Placeholder for route following logic
-        pass
+        if self.planner is not None:
+            self.desired_track = self.planner.desired_track
+            self.cross_track_error = self.planner.cross_track_error
 
     def get_route(self):
         return self.route
 
+    def nearest_airports(self, k=3):
+        # [(great-circle metres, airport id)] closest to the current position
+        if self.airports is None:
+            return []
+        return self.airports.nearest(self.current_position[0], self.current_position[1], k)
+
+    def obstacles_within(self, radius):
+        # [(great-circle metres, obstacle id)] within radius metres of the current position
+        if self.obstacles is None:
+            return []
+        return self.obstacles.within(self.current_position[0], self.current_position[1], radius)
+
 # Built-In Test Equipment (BITE)
 class BITE:
-    def __init__(self):
+    def __init__(self, journal=None, rng=None):
         self.status = "OK"
-        self.error_log = []
+        self.journal = EventJournal() if journal is None else journal
+        self.rng = random.Random() if rng is None else rng
 
     def perform_test(self):
         # Advanced self-test with error injection
-        if random.choice([True, False]):
+        if self.rng.choice([True, False]):
             self.status = "OK"
         else:
             self.status = "ERROR"
-            self.error_log.append("Error detected at " + time.strftime("%Y-%m-%d %H:%M:%S"))
+            self.journal.record("bite", ERROR, "Error detected")
 
         # Yapay zeka denetleyici
-        if ai_check({"status": self.status, "error_log": self.error_log}):
-            print("BITE AI check passed")
+        if BITE_VALIDATOR({"status": self.status}):
+            log_bite.debug("BITE AI check passed")
         else:
-            print("BITE AI check failed")
+            log_bite.warning("BITE AI check failed")
 
     def get_status(self):
         return self.status
 
     def get_error_log(self):
-        return self.error_log
+        # Compatibility shim over the event journal
+        journal = self.journal
+        return [f"{event.message} at {journal.format_time(event)}" for event in journal.query("bite")]
 
 # Communication system
 class CommunicationSystem:
-    def __init__(self):
-        self.message_log = []
+    def __init__(self, journal=None, downlink=None, rng=None):
+        self.journal = EventJournal() if journal is None else journal
+        self.rng = random.Random() if rng is None else rng
+        # Optional TelemetryDownlink; every journal event goes out on it
+        self.downlink = downlink
+        if downlink is not None:
+            self.journal.subscribe(downlink.send_event)
 
     def send_message(self, message):
         # Simulate sending a message
-        self.message_log.append(f"Sent: {message}")
-        print(f"Communication: Sent message - {message}")
+        self.journal.record("communication", INFO, f"Sent: {message}")
+        log_communication.debug("Communication: Sent message - {}", message)
 
     def receive_message(self):
         # Simulate receiving a message
-        if random.choice([True, False]):
+        if self.rng.choice([True, False]):
             message = "Received: Acknowledgment"
-            self.message_log.append(message)
-            print(f"Communication: {message}")
+            self.journal.record("communication", INFO, message)
+            log_communication.debug("Communication: {}", message)
             return message
         return None
 
+    def attach(self, bus):
+        # Downlinks sensor frames and control commands as they are published
+        if self.downlink is not None:
+            bus.listen(SENSOR_FRAMES, self.send_frame)
+            bus.listen(CONTROL_COMMANDS, self.send_commands)
+
+    def send_frame(self, frame):
+        # Queued for the downlink; never blocks the calling task
+        if self.downlink is not None:
+            self.downlink.send_frame(frame)
+
+    def send_commands(self, commands):
+        # One ControlCommands message
+        if self.downlink is not None:
+            self.downlink.send_commands(commands.timestamp, commands._asdict())
+
     def get_message_log(self):
-        return self.message_log
+        return [event.message for event in self.journal.query("communication")]
 
     def ai_check_messages(self):
         # Yapay zeka denetleyici
-        if ai_check({"message_log": self.message_log}):
-            print("Communication AI check passed")
+        if ai_check({"message_log": self.journal.query("communication")}):
+            log_communication.debug("Communication AI check passed")
         else:
-            print("Communication AI check failed")
+            log_communication.warning("Communication AI check failed")
 
 # Power management system
 class PowerManagementSystem:
-    def __init__(self):
+    def __init__(self, rng=None):
         self.battery_level = 100.0
         self.power_consumption = 0.0
+        self.rng = random.Random() if rng is None else rng
 
     def update(self):
         # Simulate power consumption
-        self.power_consumption = random.uniform(0.1, 5.0)
+        self.power_consumption = self.rng.uniform(0.1, 5.0)
         self.battery_level -= self.power_consumption * 0.01
         self.battery_level = max(self.battery_level, 0)
 
         # Yapay zeka denetleyici
-        if ai_check({"battery_level": self.battery_level, "power_consumption": self.power_consumption}):
-            print("Power management AI check passed")
+        if POWER_VALIDATOR({"battery_level": self.battery_level, "power_consumption": self.power_consumption}):
+            log_power.debug("Power management AI check passed")
         else:
-            print("Power management AI check failed")
+            log_power.warning("Power management AI check failed")
 
     def get_power_status(self):
         return {
@@ -222,103 +298,124 @@ class PowerManagementSystem:
         }
 
 # Data logger for recording sensor data
+# Samples are stored in a preallocated columnar ring buffer (one float64 row per
+# channel, monotonic timestamps), so memory stays flat on long runs.
 class DataLogger:
-    def __init__(self):
-        self.log = []
-
-    def log_data(self, sensor_data):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        entry = {
-            "timestamp": timestamp,
-            "sensor_data": {
-                "altitude": sensor_data.altitude,
-                "speed": sensor_data.speed,
-                "position": sensor_data.position,
-                "temperature": sensor_data.temperature,
-                "pressure": sensor_data.pressure,
-                "gyro": sensor_data.gyro,
-                "accelerometer": sensor_data.accelerometer,
-                "magnetometer": sensor_data.magnetometer,
-                "weather": sensor_data.weather,
-                "fuel_level": sensor_data.fuel_level,
-                "engine_status": sensor_data.engine_status,
-                "oil_pressure": sensor_data.oil_pressure,
-                "hydraulic_pressure": sensor_data.hydraulic_pressure,
-                "battery_temperature": sensor_data.battery_temperature,
-                "system_voltage": sensor_data.system_voltage
-            }
-        }
-        self.log.append(entry)
-        print(f"DataLogger: Logged data at {timestamp}")
+    def __init__(self, capacity=60000, clock=time.monotonic):
+        self.clock = clock
+        self.buffer = ColumnarRingBuffer(SENSOR_CHANNELS, capacity)
+        self.wall_clock = WallClock(clock)
+
+    def log_data(self, sensor_data, timestamp=None):
+        if timestamp is None:
+            timestamp = self.clock()
+        self.buffer.append(timestamp, sensor_values(sensor_data))
+        log_data_logger.debug("DataLogger: Logged data at t={:.3f}", timestamp)
+
+    def window(self, n=None):
+        # Zero-copy views (timestamps, channels x samples) of the latest n samples
+        return self.buffer.window(n)
+
+    def channel(self, name, n=None):
+        return self.buffer.channel(name, n)
+
+    def validate_window(self, n=None):
+        # One vectorized range check over the latest n samples; one flag per sample
+        return SENSOR_BATCH_VALIDATOR.check(self.buffer.window(n)[1])
+
+    def records(self, n=None):
+        # Legacy dict entries for the latest n samples (all retained by
+        # default), built on every call: prefer window() and channel() for
+        # anything but small n. engine_status reads back as "ON"/"OFF".
+        times, data = self.buffer.window(n)
+        return [
+            {"timestamp": self.wall_clock.format(t), "sensor_data": sensor_record(row)}
+            for t, row in zip(times.tolist(), data.T)
+        ]
 
     def get_log(self):
-        return self.log
+        # Compatibility shim over records()
+        return self.records()
 
     def ai_check_log(self):
         # Yapay zeka denetleyici
-        if ai_check({"log": self.log}):
-            print("Data logger AI check passed")
+        if self.validate_window().all():
+            log_data_logger.debug("Data logger AI check passed")
         else:
-            print("Data logger AI check failed")
+            log_data_logger.warning("Data logger AI check failed")
 
 # Security system for monitoring and responding to threats
 class SecuritySystem:
-    def __init__(self):
+    # Threat level -> journal severity, so "HIGH threats" is a severity query
+    THREAT_SEVERITY = {"LOW": INFO, "MEDIUM": WARNING, "HIGH": CRITICAL}
+
+    def __init__(self, journal=None, rng=None):
         self.threat_level = "LOW"
-        self.threat_log = []
+        self.journal = EventJournal() if journal is None else journal
+        self.rng = random.Random() if rng is None else rng
 
     def update(self):
         # Simulate threat detection
-        if random.choice([True, False]):
-            self.threat_level = random.choice(["LOW", "MEDIUM", "HIGH"])
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.threat_log.append(f"Threat detected at {timestamp}: Level {self.threat_level}")
-            print(f"SecuritySystem: Threat level {self.threat_level} detected at {timestamp}")
+        if self.rng.choice([True, False]):
+            self.threat_level = self.rng.choice(["LOW", "MEDIUM", "HIGH"])
+            event = self.journal.record("security", self.THREAT_SEVERITY[self.threat_level],
+                                        f"Level {self.threat_level}", self.threat_level)
+            log_security.warning("SecuritySystem: Threat level {} detected at t={:.3f}", self.threat_level,
+                                 event.timestamp)
 
         # Yapay zeka denetleyici
-        if ai_check({"threat_level": self.threat_level, "threat_log": self.threat_log}):
-            print("Security system AI check passed")
+        if SECURITY_VALIDATOR({"threat_level": self.threat_level}):
+            log_security.debug("Security system AI check passed")
         else:
-            print("Security system AI check failed")
+            log_security.warning("Security system AI check failed")
 
     def get_threat_level(self):
         return self.threat_level
 
+    def get_threats(self, seconds=None, level="LOW"):
+        # Threat events at or above `level`, optionally only the last `seconds`
+        severity = self.THREAT_SEVERITY[level]
+        if seconds is None:
+            return self.journal.query("security", min_severity=severity)
+        return self.journal.recent(seconds, "security", min_severity=severity)
+
     def get_threat_log(self):
-        return self.threat_log
+        journal = self.journal
+        return [f"Threat detected at {journal.format_time(event)}: {event.message}"
+                for event in journal.query("security")]
 
 # Error management system for handling errors and alerts
 class ErrorManagementSystem:
-    def __init__(self):
-        self.error_log = []
+    def __init__(self, journal=None):
+        self.journal = EventJournal() if journal is None else journal
 
     def log_error(self, error_message):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.error_log.append(f"{timestamp}: {error_message}")
-        print(f"ErrorManagement: {error_message} logged at {timestamp}")
+        event = self.journal.record("error_management", ERROR, error_message)
+        log_errors.error("ErrorManagement: {} logged at t={:.3f}", error_message, event.timestamp)
 
     def get_error_log(self):
-        return self.error_log
+        journal = self.journal
+        return [f"{journal.format_time(event)}: {event.message}" for event in journal.query("error_management")]
 
     def ai_check_errors(self):
         # Yapay zeka denetleyici
-        if ai_check({"error_log": self.error_log}):
-            print("Error management AI check passed")
+        if ai_check({"error_log": self.journal.query("error_management")}):
+            log_errors.debug("Error management AI check passed")
         else:
-            print("Error management AI check failed")
+            log_errors.warning("Error management AI check failed")
 
 # Maintenance and fault reporting system
 class MaintenanceSystem:
-    def __init__(self):
-        self.maintenance_log = []
+    def __init__(self, journal=None):
+        self.journal = EventJournal() if journal is None else journal
 
     def log_maintenance(self, maintenance_message):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.maintenance_log.append(f"{timestamp}: {maintenance_message}")
-        print(f"MaintenanceSystem: {maintenance_message} logged at {timestamp}")
+        event = self.journal.record("maintenance", WARNING, maintenance_message)
+        log_maintenance.info("MaintenanceSystem: {} logged at t={:.3f}", maintenance_message, event.timestamp)
 
     def get_maintenance_log(self):
-        return self.maintenance_log
+        journal = self.journal
+        return [f"{journal.format_time(event)}: {event.message}" for event in journal.query("maintenance")]
 
     def schedule_maintenance(self, component, date):
         maintenance_message = f"Scheduled maintenance for {component} on {date}"
@@ -326,15 +423,16 @@ class MaintenanceSystem:
 
     def ai_check_maintenance(self):
         # Yapay zeka denetleyici
-        if ai_check({"maintenance_log": self.maintenance_log}):
-            print("Maintenance AI check passed")
+        if ai_check({"maintenance_log": self.journal.query("maintenance")}):
+            log_maintenance.debug("Maintenance AI check passed")
         else:
-            print("Maintenance AI check failed")
+            log_maintenance.warning("Maintenance AI check failed")
 
 # Flight scenario management system
 class FlightScenario:
-    def __init__(self):
-        self.scenario_log = []
+    def __init__(self, journal=None, rng=None):
+        self.journal = EventJournal() if journal is None else journal
+        self.rng = random.Random() if rng is None else rng
 
     def simulate_scenario(self):
         scenarios = [
@@ -345,228 +443,440 @@ class FlightScenario:
             "Navigation system error",
             "Low fuel"
         ]
-        scenario = random.choice(scenarios)
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.scenario_log.append(f"{timestamp}: {scenario}")
-        print(f"FlightScenario: {scenario} at {timestamp}")
+        scenario = self.rng.choice(scenarios)
+        severity = INFO if scenario == "Normal flight" else WARNING
+        event = self.journal.record("flight_scenario", severity, scenario)
+        log_scenario.info("FlightScenario: {} at t={:.3f}", scenario, event.timestamp)
 
     def get_scenario_log(self):
-        return self.scenario_log
+        journal = self.journal
+        return [f"{journal.format_time(event)}: {event.message}" for event in journal.query("flight_scenario")]
 
     def ai_check_scenarios(self):
         # Yapay zeka denetleyici
-        if ai_check({"scenario_log": self.scenario_log}):
-            print("Flight scenario AI check passed")
+        if ai_check({"scenario_log": self.journal.query("flight_scenario")}):
+            log_scenario.debug("Flight scenario AI check passed")
         else:
-            print("Flight scenario AI check failed")
+            log_scenario.warning("Flight scenario AI check failed")
 
 # Avionics Mission Computer
 class AvionicsMissionComputer:
-    def __init__(self):
-        self.sensor_data = SensorData()
+    # Task name -> period in seconds; each task runs <name>_step() once per period.
+    # Steps do not catch their own errors: a step that raises is journaled by
+    # task_crashed() and restarted after a backoff by the scheduler (or the
+    # simulator), so a persistent fault slows the task down instead of
+    # repeating at its full rate.
+    TASK_PERIODS = {
+        "backup_sensor_data": 0.01,
+        "sensor_data": 0.01,  # Simulate sensor update rate
+        "flight_control": 0.01,  # Simulate control update rate
+        "navigation": 0.01,  # Simulate navigation update rate
+        "bite": 10,  # Perform self-test periodically
+        "communication": 2,  # Simulate communication interval
+        "power_management": 3,  # Simulate power update interval
+        "security": 5,  # Simulate security check interval
+        "flight_mode": 1,  # Simulate flight mode monitoring interval
+        "maintenance": 5,  # Simulate maintenance check interval
+        "flight_scenario": 15,  # Simulate scenario interval
+        "task_metrics": 10,
+    }
+
+    # Task name -> (work budget in seconds, overrun policy) for the scheduler.
+    # The sensor and control path never drops a release; housekeeping tasks
+    # shed load first.
+    TASK_BUDGETS = {
+        "backup_sensor_data": (0.002, SKIP),
+        "sensor_data": (0.002, ALERT),
+        "flight_control": (0.002, ALERT),
+        "navigation": (0.005, SKIP),
+        "bite": (0.05, DEGRADE),
+        "communication": (0.05, DEGRADE),
+        "power_management": (0.05, DEGRADE),
+        "security": (0.05, DEGRADE),
+        "flight_mode": (0.01, SKIP),
+        "maintenance": (0.05, DEGRADE),
+        "flight_scenario": (0.05, DEGRADE),
+        "task_metrics": (0.05, SKIP),
+    }
+
+    def __init__(self, recorder_path=None, seed=None, clock=time.monotonic, sensor_process=False, route_graph=None,
+                 airports=None, obstacles=None, fusion=True, standby=HOT, heartbeat=1.0,
+                 workers=2, downlink=None, metrics=None):
+        # Primary and backup sensors observe the same flight (shared truth seed)
+        # with independent, reproducible measurement errors
+        seeds = np.random.SeedSequence(seed)
+        truth_seed, primary_seed, backup_seed = seeds.spawn(3)
+        # Every randomised subsystem gets a private generator from the same seed,
+        # so tasks never share one and a run leaves the global `random` alone
+        bite_rng, communication_rng, power_rng, security_rng, scenario_rng = (
+            random.Random(int(child.generate_state(1)[0])) for child in seeds.spawn(5))
+        if sensor_process:
+            # Generate sensor data in separate processes that feed shared-memory rings
+            primary_producer = SensorProducer(primary_seed, truth_seed)
+            backup_producer = SensorProducer(backup_seed, truth_seed)
+            primary = SensorUnit("primary", SensorData(model=primary_producer.reader()), primary_producer)
+            backup = SensorUnit("backup", SensorData(model=backup_producer.reader()), backup_producer)
+        else:
+            primary = SensorUnit("primary", SensorData(primary_seed, truth_seed=truth_seed))
+            backup = SensorUnit("backup", SensorData(backup_seed, truth_seed=truth_seed))
         self.flight_control_system = FlightControlSystem()
-        self.navigation_system = NavigationSystem()
-        self.bite = BITE()
-        self.communication_system = CommunicationSystem()
-        self.power_management_system = PowerManagementSystem()
-        self.data_logger = DataLogger()
-        self.security_system = SecuritySystem()
-        self.error_management_system = ErrorManagementSystem()
-        self.maintenance_system = MaintenanceSystem()
-        self.flight_scenario = FlightScenario()
-        self.backup_sensor_data = SensorData()
+        self.navigation_system = NavigationSystem(route_graph, airports, obstacles)
+        # One bounded, time-indexed journal shared by every event-producing subsystem
+        self.journal = EventJournal(clock=clock)
+        self.bite = BITE(self.journal, bite_rng)
+        self.communication_system = CommunicationSystem(self.journal, downlink, communication_rng)
+        self.power_management_system = PowerManagementSystem(power_rng)
+        self.data_logger = DataLogger(clock=clock)
+        self.security_system = SecuritySystem(self.journal, security_rng)
+        self.error_management_system = ErrorManagementSystem(self.journal)
+        self.maintenance_system = MaintenanceSystem(self.journal)
+        self.flight_scenario = FlightScenario(self.journal, scenario_rng)
+        # Active/standby roles, standby mode, failover and failback
+        self.sensor_redundancy = SensorRedundancy(primary, backup, standby, heartbeat, clock, self.journal,
+                                                  self.error_management_system.log_error)
+        self.flight_recorder = FlightRecorder(recorder_path, clock=clock) if recorder_path else None
+        self.clock = clock
+        # Subsystems exchange immutable messages over the bus; further consumers
+        # attach to its topics without changes here
+        self.bus = DataBus()
+        # Consumers read immutable frames from here instead of the mutable SensorData
+        self.sensor_frames = self.bus.topic(SENSOR_FRAMES)
+        # Raw backup samples, fused with the primary into sensor_frames
+        self.backup_frames = FrameChannel("backup_frames")
+        self.communication_system.attach(self.bus)
+        self.published_route = None
+        self.sensor_fusion = SensorFusion() if fusion else None
+        self.fusion_backup_seq = 0
+        self.control_frame_seq = 0
+        self.task_metrics = {name: TaskMetrics(name, period) for name, period in self.TASK_PERIODS.items()}
+        self.navigation_frame_seq = 0
         self.running = True
-        self.failover = False
+        # Set once to stop every task; waits on it return immediately
+        self.stopping = threading.Event()
+        self.workers = workers
+        self.scheduler = None
         self.flight_mode = "NORMAL"
-
-    def sensor_data_task(self):
-        while self.running:
-            try:
-                self.sensor_data.update()
-                print(f"Sensor Data Updated: Altitude={self.sensor_data.altitude}, Speed={self.sensor_data.speed}, Position={self.sensor_data.position}, Temperature={self.sensor_data.temperature}, Pressure={self.sensor_data.pressure}, Gyro={self.sensor_data.gyro}, Accelerometer={self.sensor_data.accelerometer}, Magnetometer={self.sensor_data.magnetometer}, Weather={self.sensor_data.weather}, Fuel Level={self.sensor_data.fuel_level}, Engine Status={self.sensor_data.engine_status}, Oil Pressure={self.sensor_data.oil_pressure}, Hydraulic Pressure={self.sensor_data.hydraulic_pressure}, Battery Temperature={self.sensor_data.battery_temperature}, System Voltage={self.sensor_data.system_voltage}")
-                self.data_logger.log_data(self.sensor_data)
-                time.sleep(0.01)  # Simulate sensor update rate
-            except Exception as e:
-                error_message = f"Sensor Data Error: {e}"
-                print(error_message)
-                self.error_management_system.log_error(error_message)
-                self.failover = True
-
-    def backup_sensor_data_task(self):
-        while self.running:
-            try:
-                self.backup_sensor_data.update()
-                if self.failover:
-                    self.sensor_data = self.backup_sensor_data
-                    self.failover = False
-                    print("Failover to backup sensor data")
-                time.sleep(0.01)
-            except Exception as e:
-                error_message = f"Backup Sensor Data Error: {e}"
-                print(error_message)
-                self.error_management_system.log_error(error_message)
-
-    def flight_control_task(self):
-        while self.running:
-            try:
-                self.flight_control_system.update(self.sensor_data)
-                print(f"Flight Control Commands: {self.flight_control_system.get_commands()}")
-                time.sleep(0.01)  # Simulate control update rate
-            except Exception as e:
-                error_message = f"Flight Control Error: {e}"
-                print(error_message)
-                self.error_management_system.log_error(error_message)
-
-    def navigation_task(self):
-        while self.running:
-            try:
-                self.navigation_system.update(self.sensor_data)
-                print(f"Navigation Route: {self.navigation_system.get_route()}")
-                time.sleep(0.01)  # Simulate navigation update rate
-            except Exception as e:
-                error_message = f"Navigation Error: {e}"
-                print(error_message)
-                self.error_management_system.log_error(error_message)
-
-    def bite_task(self):
-        while self.running:
-            try:
-                self.bite.perform_test()
-                print(f"BITE Status: {self.bite.get_status()}")
-                if self.bite.get_status() == "ERROR":
-                    print(f"BITE Error Log: {self.bite.get_error_log()}")
-                    self.error_management_system.log_error("BITE Test Failed")
-                time.sleep(10)  # Perform self-test periodically
-            except Exception as e:
-                error_message = f"BITE Error: {e}"
-                print(error_message)
-                self.error_management_system.log_error(error_message)
-
-    def communication_task(self):
-        while self.running:
-            try:
-                self.communication_system.send_message("Flight data update")
-                received_message = self.communication_system.receive_message()
-                if received_message:
-                    print(f"Communication received message: {received_message}")
-                time.sleep(2)  # Simulate communication interval
-            except Exception as e:
-                error_message = f"Communication Error: {e}"
-                print(error_message)
-                self.error_management_system.log_error(error_message)
-
-    def power_management_task(self):
-        while self.running:
-            try:
-                self.power_management_system.update()
-                power_status = self.power_management_system.get_power_status()
-                print(f"Power Status: Battery Level={power_status['battery_level']}%, Power Consumption={power_status['power_consumption']}W")
-                time.sleep(3)  # Simulate power update interval
-            except Exception as e:
-                error_message = f"Power Management Error: {e}"
-                print(error_message)
-                self.error_management_system.log_error(error_message)
-
-    def security_task(self):
-        while self.running:
-            try:
-                self.security_system.update()
-                time.sleep(5)  # Simulate security check interval
-            except Exception as e:
-                error_message = f"Security System Error: {e}"
-                print(error_message)
-                self.error_management_system.log_error(error_message)
-
-    def monitor_flight_mode(self):
-        while self.running:
-            try:
-                if self.sensor_data.altitude > 9000 and self.flight_mode != "HIGH_ALTITUDE":
-                    self.flight_mode = "HIGH_ALTITUDE"
-                    print(f"Flight mode changed to {self.flight_mode}")
-                elif self.sensor_data.altitude <= 9000 and self.flight_mode != "NORMAL":
-                    self.flight_mode = "NORMAL"
-                    print(f"Flight mode changed to {self.flight_mode}")
-                time.sleep(1)  # Simulate flight mode monitoring interval
-            except Exception as e:
-                error_message = f"Flight Mode Monitoring Error: {e}"
-                print(error_message)
-                self.error_management_system.log_error(error_message)
-
-    def maintenance_task(self):
-        while self.running:
-            try:
-                # Example maintenance scheduling logic
-                if self.sensor_data.fuel_level < 10:
-                    self.maintenance_system.log_maintenance("Fuel level low, schedule refueling.")
-                if self.sensor_data.oil_pressure < 30:
-                    self.maintenance_system.log_maintenance("Oil pressure low, schedule maintenance.")
-                if self.sensor_data.battery_temperature > 45:
-                    self.maintenance_system.log_maintenance("Battery temperature high, schedule cooling.")
-                if self.sensor_data.system_voltage < 24:
-                    self.maintenance_system.log_maintenance("System voltage low, schedule check.")
-                time.sleep(5)  # Simulate maintenance check interval
-            except Exception as e:
-                error_message = f"Maintenance System Error: {e}"
-                print(error_message)
-                self.error_management_system.log_error(error_message)
-
-    def flight_scenario_task(self):
-        while self.running:
-            try:
-                self.flight_scenario.simulate_scenario()
-                time.sleep(15)  # Simulate scenario interval
-            except Exception as e:
-                error_message = f"Flight Scenario Error: {e}"
-                print(error_message)
-                self.error_management_system.log_error(error_message)
+        # Optional av_metrics.MetricsServer publishing this computer's state
+        self.metrics = metrics
+        if metrics is not None:
+            self.register_metrics(metrics.registry)
+
+    @property
+    def sensor_data(self):
+        # The active sensor: the backup's after a failover
+        return self.sensor_redundancy.sensor
+
+    @property
+    def backup_sensor_data(self):
+        return self.sensor_redundancy.standby_sensor
+
+    def timed_step(self, name):
+        # <name>_step() wrapped with work/period/jitter instrumentation
+        step = getattr(self, name + "_step")
+        metrics = self.task_metrics[name]
+        clock = self.clock
+        return lambda: timed(metrics, step, clock)
+
+    def get_task_metrics(self):
+        return {name: metrics.summary() for name, metrics in self.task_metrics.items()}
+
+    def sensor_data_step(self):
+        sensor_data = self.sensor_redundancy.sample()
+        if self.sensor_fusion is None:
+            frame = self.sensor_frames.publish_sensor(sensor_data, self.clock())
+        else:
+            timestamp = self.clock()
+            frame = self.sensor_frames.publish_values(timestamp, self.fuse_sensors(sensor_data, timestamp))
+        log_sensor.debug("Sensor Data Updated: Altitude={0.altitude}, Speed={0.speed}, Position={0.position}, Temperature={0.temperature}, Pressure={0.pressure}, Gyro={0.gyro}, Accelerometer={0.accelerometer}, Magnetometer={0.magnetometer}, Weather={{'wind_speed': {0.weather[wind_speed]}, 'wind_direction': {0.weather[wind_direction]}, 'humidity': {0.weather[humidity]}}}, Fuel Level={0.fuel_level}, Engine Status={0.engine_status}, Oil Pressure={0.oil_pressure}, Hydraulic Pressure={0.hydraulic_pressure}, Battery Temperature={0.battery_temperature}, System Voltage={0.system_voltage}", frame)
+        self.data_logger.log_data(frame, frame.timestamp)
+        if self.flight_recorder is not None:
+            self.flight_recorder.record(frame, self.flight_control_system.get_commands(), frame.timestamp)
+
+    def fuse_sensors(self, sensor_data, timestamp):
+        # Active sample plus the standby's, if it produced one since the last fusion step
+        backup = self.backup_frames.read_newer(self.fusion_backup_seq)
+        backup_values = None
+        if backup is not None:
+            self.fusion_backup_seq = backup.seq
+            backup_values = sensor_values(backup)
+        fusion = self.sensor_fusion
+        fused = fusion.update(sensor_values(sensor_data), backup_values, timestamp)
+        self.bus.publish(ATTITUDE, Attitude(timestamp, *fusion.attitude))
+        return fused.tolist()
+
+    def backup_sensor_data_step(self):
+        # Hot standby samples every tick, warm on its heartbeat, cold never
+        standby = self.sensor_redundancy.sample_standby()
+        if standby is not None:
+            self.backup_frames.publish_sensor(standby, self.clock())
+
+    def flight_control_step(self):
+        frame = self.sensor_frames.read_newer(self.control_frame_seq)
+        if frame is None:
+            return
+        self.control_frame_seq = frame.seq
+        self.flight_control_system.update(frame)
+        # The command dict is ordered like CONTROL_AXES
+        self.bus.publish(CONTROL_COMMANDS,
+                         ControlCommands(frame.timestamp, *self.flight_control_system.get_commands().values()))
+        # Copied: the writer thread formats it after the next control step has updated the dict in place
+        log_control.debug("Flight Control Commands: {}", dict(self.flight_control_system.get_commands()))
+
+    def navigation_step(self):
+        frame = self.sensor_frames.read_newer(self.navigation_frame_seq)
+        if frame is None:
+            return
+        self.navigation_frame_seq = frame.seq
+        self.navigation_system.update(frame)
+        route = self.navigation_system.get_route()
+        if route is not self.published_route:
+            # Planned routes are only replaced when they change
+            self.published_route = route
+            self.bus.publish(ROUTE, RouteUpdate(frame.timestamp, tuple(route)))
+        log_navigation.debug("Navigation Route: {}", list(route))
+
+    def bite_step(self):
+        self.bite.perform_test()
+        self.bus.publish(BITE_RESULTS, BiteResult(self.clock(), self.bite.get_status()))
+        log_bite.info("BITE Status: {}", self.bite.get_status())
+        if self.bite.get_status() == "ERROR":
+            log_bite.warning("BITE Error Log: {}", self.bite.get_error_log())
+            self.error_management_system.log_error("BITE Test Failed")
+
+    def communication_step(self):
+        self.communication_system.send_message("Flight data update")
+        received_message = self.communication_system.receive_message()
+        if received_message:
+            log_communication.info("Communication received message: {}", received_message)
+
+    def power_management_step(self):
+        self.power_management_system.update()
+        power_status = self.power_management_system.get_power_status()
+        self.bus.publish(POWER_STATUS, PowerStatus(self.clock(), power_status["battery_level"],
+                                                   power_status["power_consumption"]))
+        log_power.info("Power Status: Battery Level={}%, Power Consumption={}W", power_status['battery_level'], power_status['power_consumption'])
+
+    def security_step(self):
+        self.security_system.update()
+        self.bus.publish(THREAT_LEVEL, ThreatLevel(self.clock(), self.security_system.get_threat_level()))
+
+    def flight_mode_step(self):
+        frame = self.sensor_frames.read()
+        if frame is None:
+            return
+        if frame.altitude > 9000 and self.flight_mode != "HIGH_ALTITUDE":
+            self.flight_mode = "HIGH_ALTITUDE"
+            self.flight_control_system.set_flight_mode(self.flight_mode)
+            log_mission.info("Flight mode changed to {}", self.flight_mode)
+        elif frame.altitude <= 9000 and self.flight_mode != "NORMAL":
+            self.flight_mode = "NORMAL"
+            self.flight_control_system.set_flight_mode(self.flight_mode)
+            log_mission.info("Flight mode changed to {}", self.flight_mode)
+
+    def maintenance_step(self):
+        frame = self.sensor_frames.read()
+        if frame is None:
+            return
+        # Example maintenance scheduling logic
+        if frame.fuel_level < 10:
+            self.maintenance_system.log_maintenance("Fuel level low, schedule refueling.")
+        if frame.oil_pressure < 30:
+            self.maintenance_system.log_maintenance("Oil pressure low, schedule maintenance.")
+        if frame.battery_temperature > 45:
+            self.maintenance_system.log_maintenance("Battery temperature high, schedule cooling.")
+        if frame.system_voltage < 24:
+            self.maintenance_system.log_maintenance("System voltage low, schedule check.")
+
+    def flight_scenario_step(self):
+        self.flight_scenario.simulate_scenario()
+
+    def task_metrics_step(self):
+        # Periodic timing summary for every task
+        for metrics in self.task_metrics.values():
+            log_mission.info("Task timing {}", metrics.describe())
+
+    def register_metrics(self, registry):
+        # Exposes subsystem state on an av_metrics registry. Nearly everything
+        # is read by a collector on the metrics snapshot thread from state the
+        # subsystems keep anyway; only journal events are counted as they
+        # happen, and those are rare.
+        sensor_value = registry.gauge("av_sensor_value", "Latest fused sensor reading by channel", ("channel",))
+        attitude_angle = registry.gauge("av_attitude_degrees", "Fused attitude angle", ("axis",))
+        registry.counter("av_sensor_frames_total", "Sensor frames published").set_function(
+            lambda: self.sensor_frames.seq)
+        battery = registry.gauge("av_battery_level_percent", "Battery charge")
+        consumption = registry.gauge("av_power_consumption_watts", "Electrical power draw")
+        threat = registry.gauge("av_threat_level", "Current threat level (1 for the active level)", ("level",))
+        bite = registry.gauge("av_bite_status", "Latest BITE result (1 for the active status)", ("status",))
+        flight_mode = registry.gauge("av_flight_mode", "Current flight mode (1 for the active mode)", ("mode",))
+        events = registry.counter("av_journal_events_total", "Journal events by subsystem and severity",
+                                  ("subsystem", "severity"))
+        active = registry.gauge("av_sensor_active", "Sensor unit feeding the sensor task (1 for the active unit)",
+                                ("unit",))
+        failovers = registry.counter("av_sensor_failovers_total", "Sensor failovers to the standby unit")
+        failbacks = registry.counter("av_sensor_failbacks_total", "Sensor failbacks to the primary unit")
+        detection = registry.histogram("av_sensor_failover_detection_seconds", "Time from sensor fault to failover")
+        switchover = registry.histogram("av_sensor_switchover_seconds", "Handover time of failovers and failbacks")
+        runs = registry.counter("av_task_runs_total", "Task steps run", ("task",))
+        overruns = registry.counter("av_task_overruns_total", "Task steps longer than their period", ("task",))
+        late = registry.counter("av_task_late_starts_total",
+                                "Task steps started over half a period later than one period after the last",
+                                ("task",))
+        misses = registry.counter("av_task_deadline_misses_total", "Scheduled task steps finished after their deadline",
+                                  ("task",))
+        restarts = registry.counter("av_task_restarts_total",
+                                    "Task steps that raised and were restarted after a backoff", ("task",))
+        work = registry.summary("av_task_work_seconds", "Task step duration", ("task",))
+        downlink = self.communication_system.downlink
+        if downlink is not None:
+            registry.counter("av_downlink_records_total", "Telemetry records sent").set_function(
+                lambda: downlink.records)
+            registry.counter("av_downlink_send_errors_total", "Telemetry datagrams the socket refused").set_function(
+                lambda: downlink.send_errors)
+            dropped = registry.counter("av_downlink_dropped_total", "Telemetry records shed by backpressure",
+                                       ("record",))
+
+        self.journal.subscribe(lambda event: events.labels(event.subsystem, SEVERITY_NAMES[event.severity]).inc())
+        redundancy = self.sensor_redundancy
+        unit_names = [unit.name for unit in redundancy.units]
+        observed = 0
+
+        def collect():
+            nonlocal observed
+            frame = self.sensor_frames.read()
+            if frame is not None:
+                for channel, value in zip(SENSOR_CHANNELS, sensor_values(frame)):
+                    sensor_value.labels(channel).set(value)
+            attitude = self.bus.latest(ATTITUDE)
+            if attitude is not None:
+                for axis in Attitude._fields[1:]:
+                    attitude_angle.labels(axis).set(getattr(attitude, axis))
+            power = self.bus.latest(POWER_STATUS)
+            if power is not None:
+                battery.set(power.battery_level)
+                consumption.set(power.power_consumption)
+            level = self.bus.latest(THREAT_LEVEL)
+            if level is not None:
+                threat.set_state(level.level, SecuritySystem.THREAT_SEVERITY)
+            result = self.bus.latest(BITE_RESULTS)
+            if result is not None:
+                bite.set_state(result.status, ("OK", "ERROR"))
+            flight_mode.set_state(self.flight_mode, self.flight_control_system.controller.schedule)
+            active.set_state(redundancy.units[redundancy.active].name, unit_names)
+            failovers.labels().set(redundancy.failovers)
+            failbacks.labels().set(redundancy.failbacks)
+            # Switchovers since the last snapshot, as far as the bounded history still holds them
+            history = list(redundancy.history)
+            total = redundancy.failovers + redundancy.failbacks
+            for record in history[len(history) - min(total - observed, len(history)):]:
+                switchover.observe(record.switchover_latency)
+                if record.kind == "failover":
+                    detection.observe(record.detection_latency)
+            observed = total
+            scheduler = self.scheduler
+            for name, metrics in self.task_metrics.items():
+                runs.labels(name).set(metrics.runs)
+                overruns.labels(name).set(metrics.overruns)
+                late.labels(name).set(metrics.late_starts)
+                restarts.labels(name).set(metrics.crashes)
+                if scheduler is not None and name in scheduler.tasks:
+                    misses.labels(name).set(scheduler.tasks[name].deadline_misses)
+                histogram = metrics.work
+                summary = work.labels(name)
+                if histogram.count != summary.count:
+                    # Slow tasks mostly have not run since the last snapshot
+                    values = histogram.percentiles([q * 100 for q in DEFAULT_QUANTILES])
+                    summary.set({q: value * 1e-9 for q, value in zip(DEFAULT_QUANTILES, values)},
+                                histogram.total * 1e-9, histogram.count)
+            if downlink is not None:
+                for record, count in downlink.summary()["dropped"].items():
+                    dropped.labels(record).set(count)
+        registry.add_collector(collect)
 
     def start(self):
-        # Start all tasks in separate threads
-        self.sensor_thread = threading.Thread(target=self.sensor_data_task)
-        self.backup_sensor_thread = threading.Thread(target=self.backup_sensor_data_task)
-        self.flight_control_thread = threading.Thread(target=self.flight_control_task)
-        self.navigation_thread = threading.Thread(target=self.navigation_task)
-        self.bite_thread = threading.Thread(target=self.bite_task)
-        self.communication_thread = threading.Thread(target=self.communication_task)
-        self.power_management_thread = threading.Thread(target=self.power_management_task)
-        self.security_thread = threading.Thread(target=self.security_task)
-        self.flight_mode_thread = threading.Thread(target=self.monitor_flight_mode)
-        self.maintenance_thread = threading.Thread(target=self.maintenance_task)
-        self.flight_scenario_thread = threading.Thread(target=self.flight_scenario_task)
-
-        self.sensor_thread.start()
-        self.backup_sensor_thread.start()
-        self.flight_control_thread.start()
-        self.navigation_thread.start()
-        self.bite_thread.start()
-        self.communication_thread.start()
-        self.power_management_thread.start()
-        self.security_thread.start()
-        self.flight_mode_thread.start()
-        self.maintenance_thread.start()
-        self.flight_scenario_thread.start()
+        self.sensor_redundancy.start()
+        if self.communication_system.downlink is not None:
+            self.communication_system.downlink.start()
+        if self.metrics is not None:
+            self.metrics.start()
+        # All tasks share a small worker pool, most urgent (shortest period) first
+        self.scheduler = RateMonotonicScheduler(self.workers, on_alert=self.scheduler_alert,
+                                                on_crash=self.task_crashed)
+        for name, period in self.TASK_PERIODS.items():
+            budget, policy = self.TASK_BUDGETS[name]
+            self.scheduler.add(name, self.timed_step(name), period, budget=budget, policy=policy)
+        self.scheduler.start()
+
+    def scheduler_alert(self, name, message):
+        self.journal.record("scheduler", WARNING, message, name)
+        log_mission.warning("{}", message)
+
+    def task_crashed(self, name, message):
+        # The scheduler restarts the task after a backoff
+        self.journal.record("scheduler", ERROR, message, name)
+        log_mission.error("{}", message)
+        self.error_management_system.log_error(message)
+
+    def request_stop(self):
+        # Safe from signal handlers and other threads; stop() does the cleanup
+        self.running = False
+        self.stopping.set()
+
+    def wait(self, timeout=None):
+        # Blocks until a stop is requested; True if it was
+        return self.stopping.wait(timeout)
 
     def stop(self):
-        self.running = False
-        self.sensor_thread.join()
-        self.backup_sensor_thread.join()
-        self.flight_control_thread.join()
-        self.navigation_thread.join()
-        self.bite_thread.join()
-        self.communication_thread.join()
-        self.power_management_thread.join()
-        self.security_thread.join()
-        self.flight_mode_thread.join()
-        self.maintenance_thread.join()
-        self.flight_scenario_thread.join()
+        self.request_stop()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        self.bus.close()
+        self.sensor_redundancy.close()
+        if self.communication_system.downlink is not None:
+            self.communication_system.downlink.close()
+        if self.metrics is not None:
+            self.metrics.stop()
+        if self.flight_recorder is not None:
+            self.flight_recorder.close()
 
 # Main function
 if __name__ == "__main__":
-    avionics_computer = AvionicsMissionComputer()
+    configure_logging(level=os.environ.get("AV_SM_LOG_LEVEL", "INFO"))
+    # AV_SM_ROUTE_GRID=N plans over a synthetic N x N airway grid
+    grid_size = int(os.environ.get("AV_SM_ROUTE_GRID", "0"))
+    route_graph = synthetic_grid(grid_size, grid_size) if grid_size else None
+    # AV_SM_AIRPORTS=N and AV_SM_OBSTACLES=N index that many synthetic locations
+    n_airports = int(os.environ.get("AV_SM_AIRPORTS", "0"))
+    n_obstacles = int(os.environ.get("AV_SM_OBSTACLES", "0"))
+    airports = SpatialIndex(*synthetic_points(n_airports, seed=1)) if n_airports else None
+    obstacles = SpatialIndex(*synthetic_points(n_obstacles, seed=2)) if n_obstacles else None
+    # AV_SM_DOWNLINK=udp:HOST:PORT or unix:PATH streams binary telemetry there;
+    # AV_SM_DOWNLINK_POLICY=drop_oldest|priority picks what a full queue sheds
+    downlink_address = os.environ.get("AV_SM_DOWNLINK")
+    downlink = TelemetryDownlink(parse_address(downlink_address),
+                                 policy=os.environ.get("AV_SM_DOWNLINK_POLICY", DROP_OLDEST)) if downlink_address else None
+    # AV_SM_METRICS=HOST:PORT serves Prometheus metrics at http://HOST:PORT/metrics
+    metrics_address = os.environ.get("AV_SM_METRICS")
+    if metrics_address:
+        metrics_host, _, metrics_port = metrics_address.rpartition(":")
+        metrics = MetricsServer((metrics_host or "127.0.0.1", int(metrics_port)))
+    else:
+        metrics = None
+    avionics_computer = AvionicsMissionComputer(recorder_path=os.environ.get("AV_SM_RECORDER"),
+                                                sensor_process=os.environ.get("AV_SM_SENSOR_PROCESS") == "1",
+                                                route_graph=route_graph, airports=airports, obstacles=obstacles,
+                                                # AV_SM_STANDBY=hot|warm|cold, warm heartbeat in seconds
+                                                standby=os.environ.get("AV_SM_STANDBY", "hot"),
+                                                heartbeat=float(os.environ.get("AV_SM_HEARTBEAT", "1.0")),
+                                                downlink=downlink, metrics=metrics)
+    # SIGTERM from a process supervisor stops as cleanly as Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: avionics_computer.request_stop())
     try:
         avionics_computer.start()
-        while True:
-            time.sleep(1)
+        avionics_computer.wait()
     except KeyboardInterrupt:
+        pass
+    finally:
         avionics_computer.stop()
-        print("Avionics Mission Computer Stopped")
+        log_mission.info("Avionics Mission Computer Stopped")
+        shutdown_logging()
@@ -0,0 +1,217 @@
+import heapq
+import math
+
+import numpy as np
+
+# Spatial index for waypoints, airports and obstacles.
+#
+# Points are stored on the spherical Earth surface in Earth-centred (ECEF)
+# coordinates, where straight-line chord length grows monotonically with
+# great-circle distance. Nearest-neighbour order in the KD-tree is therefore
+# great-circle order, and a great-circle radius maps to a chord radius, so
+# kNN and radius queries need no special handling near the poles or the
+# antimeridian. Results are reported as great-circle distances in metres.
+
+EARTH_RADIUS = 6371000.0
+
+
+def ecef(lon, lat):
+    # (n, 3) surface points in metres for longitude/latitude in degrees
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)), axis=-1) * EARTH_RADIUS
+
+
+def _surface(lon, lat):
+    lon, lat = math.radians(lon), math.radians(lat)
+    cos_lat = math.cos(lat)
+    return np.array((cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat))) * EARTH_RADIUS
+
+
+def chord_to_arc(chord):
+    return 2 * EARTH_RADIUS * math.asin(min(chord / (2 * EARTH_RADIUS), 1.0))
+
+
+def arc_to_chord(arc):
+    return 2 * EARTH_RADIUS * math.sin(min(arc / (2 * EARTH_RADIUS), math.pi / 2))
+
+
+def synthetic_points(n, lon_range=(-10.0, 60.0), lat_range=(-10.0, 60.0), seed=0):
+    # Uniformly scattered test locations (airports, obstacles)
+    rng = np.random.default_rng(seed)
+    return rng.uniform(*lon_range, n), rng.uniform(*lat_range, n)
+
+
+# Static KD-tree over 3-D points, built once by median splits on the widest axis
+class KDTree:
+    def __init__(self, points, leaf_size=16):
+        points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 3)
+        self.leaf_size = leaf_size
+        self._order = np.arange(len(points))
+        self._start = []
+        self._end = []
+        self._dim = []
+        self._split = []
+        self._children = []
+        if len(points):
+            self._build(points, 0, len(points))
+        # Leaves cover contiguous ranges of the reordered points
+        self.points = points[self._order]
+        self.index = self._order
+
+    def __len__(self):
+        return len(self.points)
+
+    def _build(self, points, start, end):
+        node = len(self._start)
+        self._start.append(start)
+        self._end.append(end)
+        self._dim.append(-1)
+        self._split.append(0.0)
+        self._children.append(None)
+        if end - start <= self.leaf_size:
+            return node
+        rows = self._order[start:end]
+        block = points[rows]
+        dim = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+        mid = (end - start) // 2
+        part = np.argpartition(block[:, dim], mid)
+        self._order[start:end] = rows[part]
+        self._dim[node] = dim
+        self._split[node] = float(block[part[mid], dim])
+        left = self._build(points, start, start + mid)
+        right = self._build(points, start + mid, end)
+        self._children[node] = (left, right)
+        return node
+
+    def query(self, point, k=1):
+        # k nearest (squared distance, position in self.points), nearest first
+        if not len(self.points):
+            return []
+        points = self.points
+        start, end, dims, splits, children = self._start, self._end, self._dim, self._split, self._children
+        coords = point.tolist()
+        best = []  # max-heap of (-d2, i)
+        worst = math.inf
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if bound >= worst:
+                continue
+            dim = dims[node]
+            if dim < 0:
+                s = start[node]
+                delta = points[s:end[node]] - point
+                d2 = np.einsum("ij,ij->i", delta, delta)
+                for j in np.flatnonzero(d2 < worst).tolist():
+                    distance = float(d2[j])
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, s + j))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, s + j))
+                    if len(best) == k:
+                        worst = -best[0][0]
+                continue
+            diff = coords[dim] - splits[node]
+            left, right = children[node]
+            near, far = (left, right) if diff < 0 else (right, left)
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+        return sorted((-d2, i) for d2, i in best)
+
+    def query_radius(self, point, radius):
+        # All (squared distance, position) within radius, nearest first
+        points = self.points
+        start, end, dims, splits, children = self._start, self._end, self._dim, self._split, self._children
+        coords = point.tolist()
+        r2 = radius * radius
+        found = []
+        stack = [0] if len(points) else []
+        while stack:
+            node = stack.pop()
+            dim = dims[node]
+            if dim < 0:
+                s = start[node]
+                delta = points[s:end[node]] - point
+                d2 = np.einsum("ij,ij->i", delta, delta)
+                hits = np.flatnonzero(d2 <= r2)
+                found.extend(zip(d2[hits].tolist(), (hits + s).tolist()))
+                continue
+            diff = coords[dim] - splits[node]
+            left, right = children[node]
+            if diff < 0 or diff * diff <= r2:
+                stack.append(left)
+            if diff >= 0 or diff * diff <= r2:
+                stack.append(right)
+        found.sort()
+        return found
+
+
+# Longitude/latitude facing index with incremental inserts.
+# Inserts go to a small buffer that is scanned brute force and merged into a
+# rebuilt tree once it outgrows a fraction of the tree, so inserts are
+# amortised O(log n) and queries stay logarithmic plus a bounded scan.
+class SpatialIndex:
+    def __init__(self, lon=(), lat=(), ids=None, leaf_size=16, min_buffer=256, buffer_fraction=0.125):
+        self.leaf_size = leaf_size
+        self.min_buffer = min_buffer
+        self.buffer_fraction = buffer_fraction
+        self.build(lon, lat, ids)
+
+    def __len__(self):
+        return len(self._tree) + len(self._pending_ids)
+
+    def build(self, lon, lat, ids=None):
+        # Bulk load; replaces everything indexed so far
+        points = ecef(lon, lat).reshape(-1, 3)
+        ids = list(range(len(points))) if ids is None else list(ids)
+        self._set_tree(points, ids)
+
+    def _set_tree(self, points, ids):
+        self._tree = KDTree(points, self.leaf_size)
+        self._ids = [ids[i] for i in self._tree.index.tolist()]
+        self._pending_points = []
+        self._pending_ids = []
+        self._pending_array = np.empty((0, 3))
+
+    def insert(self, lon, lat, item_id):
+        self._pending_points.append(_surface(lon, lat))
+        self._pending_ids.append(item_id)
+        self._pending_array = None
+        if len(self._pending_ids) > max(self.min_buffer, self.buffer_fraction * len(self._tree)):
+            self.rebuild()
+
+    def rebuild(self):
+        if self._pending_ids:
+            points = np.concatenate((self._tree.points, np.array(self._pending_points)))
+            self._set_tree(points, self._ids + self._pending_ids)
+
+    def _pending(self):
+        if self._pending_array is None:
+            self._pending_array = np.array(self._pending_points).reshape(-1, 3)
+        return self._pending_array
+
+    def nearest(self, lon, lat, k=1):
+        # [(great-circle metres, id)] for the k nearest items, nearest first
+        point = _surface(lon, lat)
+        found = [(d2, self._ids[i]) for d2, i in self._tree.query(point, k)]
+        if self._pending_ids:
+            delta = self._pending() - point
+            d2 = np.einsum("ij,ij->i", delta, delta)
+            nearest = np.argsort(d2)[:k]
+            found = heapq.nsmallest(k, found + [(float(d2[j]), self._pending_ids[j]) for j in nearest.tolist()],
+                                    key=lambda hit: hit[0])
+        return [(chord_to_arc(math.sqrt(d2)), item) for d2, item in found]
+
+    def within(self, lon, lat, radius):
+        # [(great-circle metres, id)] for every item within radius metres, nearest first
+        point = _surface(lon, lat)
+        chord = arc_to_chord(radius)
+        found = [(d2, self._ids[i]) for d2, i in self._tree.query_radius(point, chord)]
+        if self._pending_ids:
+            delta = self._pending() - point
+            d2 = np.einsum("ij,ij->i", delta, delta)
+            found.extend((float(d2[j]), self._pending_ids[j]) for j in np.flatnonzero(d2 <= chord * chord).tolist())
+            found.sort(key=lambda hit: hit[0])
+        return [(chord_to_arc(math.sqrt(d2)), item) for d2, item in found]
@@ -0,0 +1,444 @@
+import argparse
+import os
+import select
+import socket
+import stat
+import struct
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from operator import itemgetter
+
+import av_log
+from av_datalog import SENSOR_CHANNELS, sensor_values
+from av_frames import frame_from_values
+from av_journal import ERROR, Event
+from av_log import get_logger
+from av_recorder import COMMAND_CHANNELS
+
+# Binary telemetry downlink (little endian).
+#
+#   datagram   DATAGRAM_HEADER, then `records` back-to-back records
+#   frame      FRAME_RECORD: one sensor frame in SENSOR_CHANNELS order
+#   command    COMMAND_RECORD: control commands in COMMAND_CHANNELS order
+#   event      EVENT_RECORD, then the utf-8 subsystem and message
+#
+# Producers only append to a bounded queue and never block or encode. A
+# sender thread drains the queue, packs records with precompiled structs into
+# one reusable buffer and sends a datagram whenever the next record would
+# not fit in max_datagram. Datagrams are numbered so a receiver can count
+# what the link lost. When the queue is full, the policy decides what goes:
+#   drop_oldest  one FIFO; the oldest record is shed for the new one
+#   priority     urgent events, commands, frames, then other events are sent
+#                in that order; the oldest record of the least urgent level
+#                at or below the new record's is shed, or the new one if
+#                everything queued is more urgent
+
+log_telemetry = get_logger("telemetry")
+
+MAGIC = b"AVTM"
+VERSION = 1
+MAX_DATAGRAM = 1400  # fits an Ethernet MTU without IP fragmentation
+
+FRAME, COMMAND, EVENT = 1, 2, 3
+RECORD_NAMES = {FRAME: "frame", COMMAND: "command", EVENT: "event"}
+
+DATAGRAM_HEADER = struct.Struct("<4sBBHId")  # magic, version, flags, records, datagram sequence, send time
+FRAME_RECORD = struct.Struct(f"<BQd{len(SENSOR_CHANNELS)}d")  # type, frame seq, timestamp, channel values
+COMMAND_RECORD = struct.Struct(f"<Bd{len(COMMAND_CHANNELS)}d")  # type, timestamp, command values
+EVENT_RECORD = struct.Struct("<BdBBH")  # type, timestamp, severity, subsystem size, message size
+
+# Queue levels, sent most urgent first under the priority policy
+URGENT, COMMANDS, FRAMES, BULK = range(4)
+
+DROP_OLDEST, PRIORITY = "drop_oldest", "priority"
+BACKPRESSURE_POLICIES = (DROP_OLDEST, PRIORITY)
+
+TelemetryCommand = namedtuple("TelemetryCommand", ("timestamp", "commands"))
+
+_command_values = itemgetter(*COMMAND_CHANNELS)
+
+
+class TelemetryFormatError(Exception):
+    pass
+
+
+def parse_address(spec):
+    # "udp:host:port" -> (host, port); "unix:/path" -> "/path"
+    scheme, _, rest = spec.partition(":")
+    if scheme == "udp":
+        host, _, port = rest.rpartition(":")
+        return host.strip("[]") or "127.0.0.1", int(port)
+    if scheme == "unix" and rest:
+        return rest
+    raise ValueError(f"telemetry address must be udp:HOST:PORT or unix:PATH, not {spec!r}")
+
+
+def _socket_for(address):
+    if isinstance(address, str):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    family = socket.AF_INET6 if ":" in address[0] else socket.AF_INET
+    return socket.socket(family, socket.SOCK_DGRAM)
+
+
+def _encode_text(text, size):
+    # utf-8 bytes of text, cut to at most `size` bytes on a character boundary
+    data = text.encode("utf-8")
+    if len(data) > size:
+        data = data[:size].decode("utf-8", "ignore").encode("utf-8")
+    return data
+
+
+# Bounded multi-producer queue of (record type, payload) items
+class TelemetryQueue:
+    def __init__(self, capacity=4096, policy=DROP_OLDEST):
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"unknown backpressure policy {policy!r}")
+        self.capacity = capacity
+        self.policy = policy
+        self.size = 0
+        self.enqueued = 0
+        self.dropped = dict.fromkeys(RECORD_NAMES, 0)
+        self._levels = [deque() for _ in range(BULK + 1)]
+        self._lock = threading.Lock()
+
+    def put(self, level, item):
+        # Never blocks; False if the new item itself was shed
+        if self.policy == DROP_OLDEST:
+            level = 0
+        with self._lock:
+            self.enqueued += 1
+            if self.size >= self.capacity:
+                victim = self._shed(level)
+                if victim is None:
+                    self.dropped[item[0]] += 1
+                    return False
+                self.dropped[victim[0]] += 1
+            else:
+                self.size += 1
+            self._levels[level].append(item)
+            return True
+
+    def _shed(self, level):
+        # Oldest item of the least urgent non-empty level no more urgent than `level`
+        for queue in reversed(self._levels[level:]):
+            if queue:
+                return queue.popleft()
+        return None
+
+    def drain(self):
+        # Takes everything queued: one deque per level, most urgent first
+        with self._lock:
+            if not self.size:
+                return ()
+            levels = self._levels
+            self._levels = [deque() for _ in levels]
+            self.size = 0
+        return levels
+
+
+class TelemetryDownlink:
+    def __init__(self, address, capacity=4096, policy=DROP_OLDEST, max_datagram=MAX_DATAGRAM, flush_interval=0.02,
+                 clock=time.monotonic, alert_interval=5.0):
+        if max_datagram < DATAGRAM_HEADER.size + FRAME_RECORD.size:
+            raise ValueError(f"max_datagram must hold at least one frame record "
+                             f"({DATAGRAM_HEADER.size + FRAME_RECORD.size} bytes)")
+        self.address = address
+        self.queue = TelemetryQueue(capacity, policy)
+        self.max_datagram = max_datagram
+        # Longest a record waits in the queue while traffic is light
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.sequence = 0
+        self.datagrams = 0
+        self.records = 0
+        self.bytes_sent = 0
+        self.send_errors = 0
+        # Records in datagrams the socket refused
+        self.records_lost = 0
+        self._buffer = bytearray(max_datagram)
+        self._view = memoryview(self._buffer)
+        # Queue size that wakes the sender early: about one full datagram
+        self._wake_size = max((max_datagram - DATAGRAM_HEADER.size) // FRAME_RECORD.size, 1)
+        self._socket = _socket_for(address)
+        self._socket.setblocking(False)
+        self.alert_interval = alert_interval
+        self._last_alert = None
+        self._unreported = 0
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def send_frame(self, frame):
+        # Any SensorFrame-like object; frames are immutable, so no copy is taken
+        self._put(FRAMES, (FRAME, frame))
+
+    def send_commands(self, timestamp, commands):
+        # Snapshot of a command mapping keyed by COMMAND_CHANNELS
+        self._put(COMMANDS, (COMMAND, (timestamp,) + _command_values(commands)))
+
+    def send_event(self, event):
+        self._put(URGENT if event.severity >= ERROR else BULK, (EVENT, event))
+
+    def _put(self, level, item):
+        queue = self.queue
+        queue.put(level, item)
+        if queue.size >= self._wake_size and not self._wake.is_set():
+            self._wake.set()
+
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="av-telemetry", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        # Stops the sender after a last flush
+        if self._thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        self._socket.close()
+
+    def flush(self):
+        # Encodes and sends everything queued; returns the number of records sent
+        with self._flush_lock:
+            levels = self.queue.drain()
+            buffer = self._buffer
+            limit = self.max_datagram
+            start = DATAGRAM_HEADER.size
+            offset, count, sent = start, 0, 0
+            for queue in levels:
+                for kind, payload in queue:
+                    if kind == FRAME:
+                        size = FRAME_RECORD.size
+                    elif kind == COMMAND:
+                        size = COMMAND_RECORD.size
+                    else:
+                        subsystem = _encode_text(payload.subsystem, 255)
+                        message = _encode_text(payload.message, limit - start - EVENT_RECORD.size - len(subsystem))
+                        size = EVENT_RECORD.size + len(subsystem) + len(message)
+                    if offset + size > limit:
+                        sent += self._send(offset, count)
+                        offset, count = start, 0
+                    if kind == FRAME:
+                        FRAME_RECORD.pack_into(buffer, offset, FRAME, payload.seq, payload.timestamp,
+                                               *sensor_values(payload))
+                    elif kind == COMMAND:
+                        COMMAND_RECORD.pack_into(buffer, offset, COMMAND, *payload)
+                    else:
+                        EVENT_RECORD.pack_into(buffer, offset, EVENT, payload.timestamp, payload.severity,
+                                               len(subsystem), len(message))
+                        text = offset + EVENT_RECORD.size
+                        buffer[text:text + len(subsystem)] = subsystem
+                        buffer[text + len(subsystem):offset + size] = message
+                    offset += size
+                    count += 1
+            if count:
+                sent += self._send(offset, count)
+            return sent
+
+    def _send(self, size, count):
+        DATAGRAM_HEADER.pack_into(self._buffer, 0, MAGIC, VERSION, 0, count, self.sequence, self.clock())
+        # A refused datagram still uses its number, so the receiver counts it as lost
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        try:
+            self._socket.sendto(self._view[:size], self.address)
+        except OSError as e:
+            # Full socket buffer or no receiver: the datagram is dropped, never waited on
+            self.send_errors += 1
+            self.records_lost += count
+            self._unreported += 1
+            now = time.monotonic()
+            if self._last_alert is None or now - self._last_alert >= self.alert_interval:
+                dropped, self._unreported = self._unreported, 0
+                self._last_alert = now
+                log_telemetry.warning("Telemetry downlink to {} dropped {} datagram(s): {}", self.address, dropped, e)
+            return 0
+        self.datagrams += 1
+        self.records += count
+        self.bytes_sent += size
+        return count
+
+    def summary(self):
+        queue = self.queue
+        return {
+            "address": self.address,
+            "policy": queue.policy,
+            "queued": queue.size,
+            "enqueued": queue.enqueued,
+            "dropped": {RECORD_NAMES[kind]: n for kind, n in queue.dropped.items()},
+            "datagrams": self.datagrams,
+            "records": self.records,
+            "bytes": self.bytes_sent,
+            "send_errors": self.send_errors,
+            "records_lost": self.records_lost,
+        }
+
+
+def decode_datagram(data):
+    # (datagram sequence, send time, records); records are SensorFrame,
+    # TelemetryCommand or av_journal.Event (with data None)
+    if len(data) < DATAGRAM_HEADER.size:
+        raise TelemetryFormatError(f"datagram of {len(data)} bytes is shorter than its header")
+    magic, version, flags, count, sequence, sent = DATAGRAM_HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise TelemetryFormatError(f"not a version {VERSION} telemetry datagram")
+    records = []
+    offset = DATAGRAM_HEADER.size
+    try:
+        for _ in range(count):
+            kind = data[offset]
+            if kind == FRAME:
+                values = FRAME_RECORD.unpack_from(data, offset)
+                records.append(frame_from_values(values[1], values[2], values[3:]))
+                offset += FRAME_RECORD.size
+            elif kind == COMMAND:
+                values = COMMAND_RECORD.unpack_from(data, offset)
+                records.append(TelemetryCommand(values[1], dict(zip(COMMAND_CHANNELS, values[2:]))))
+                offset += COMMAND_RECORD.size
+            elif kind == EVENT:
+                _, timestamp, severity, subsystem_size, message_size = EVENT_RECORD.unpack_from(data, offset)
+                text = offset + EVENT_RECORD.size
+                end = text + subsystem_size + message_size
+                if end > len(data):
+                    raise TelemetryFormatError("event text runs past the end of the datagram")
+                subsystem = bytes(data[text:text + subsystem_size]).decode("utf-8", "replace")
+                message = bytes(data[text + subsystem_size:end]).decode("utf-8", "replace")
+                records.append(Event(timestamp, subsystem, severity, message, None))
+                offset = end
+            else:
+                raise TelemetryFormatError(f"unknown record type {kind} at offset {offset}")
+    except (IndexError, struct.error) as e:
+        raise TelemetryFormatError(f"truncated datagram: {e}") from e
+    return sequence, sent, records
+
+
+# Ground side of the downlink: binds the address and decodes what arrives
+class TelemetryReceiver:
+    def __init__(self, address, buffer_size=1 << 20):
+        self.address = address
+        self.datagrams = 0
+        self.records = 0
+        self.counts = dict.fromkeys(RECORD_NAMES.values(), 0)
+        # Datagrams missing from the sequence, and ones arriving after a later one
+        self.lost = 0
+        self.late = 0
+        self.format_errors = 0
+        self._expected = None
+        self._socket = _socket_for(address)
+        try:
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, buffer_size)
+        except OSError:
+            pass
+        if isinstance(address, str) and os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+            # Left behind by a receiver that did not close
+            os.unlink(address)
+        self._socket.bind(address)
+        self._socket.setblocking(False)
+        if not isinstance(address, str):
+            # Port 0 binds a free port
+            self.address = self._socket.getsockname()[:2]
+
+    def receive(self, timeout=None):
+        # Records of every datagram waiting, after waiting up to `timeout` for
+        # the first; [] on timeout
+        ready, _, _ = select.select((self._socket,), (), (), timeout)
+        records = []
+        if not ready:
+            return records
+        while True:
+            try:
+                data = self._socket.recv(65535)
+            except BlockingIOError:
+                return records
+            try:
+                sequence, sent, decoded = decode_datagram(data)
+            except TelemetryFormatError as e:
+                self.format_errors += 1
+                log_telemetry.warning("Telemetry datagram rejected: {}", e)
+                continue
+            self._track(sequence)
+            self.datagrams += 1
+            self.records += len(decoded)
+            counts = self.counts
+            for record in decoded:
+                if isinstance(record, TelemetryCommand):
+                    counts["command"] += 1
+                elif isinstance(record, Event):
+                    counts["event"] += 1
+                else:
+                    counts["frame"] += 1
+            records.extend(decoded)
+
+    def _track(self, sequence):
+        if self._expected is not None:
+            gap = (sequence - self._expected) & 0xFFFFFFFF
+            if gap >= 1 << 31:
+                self.late += 1
+                return
+            self.lost += gap
+        self._expected = (sequence + 1) & 0xFFFFFFFF
+
+    def close(self):
+        self._socket.close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def summary(self):
+        return {
+            "address": self.address,
+            "datagrams": self.datagrams,
+            "records": self.records,
+            "lost_datagrams": self.lost,
+            "late_datagrams": self.late,
+            "format_errors": self.format_errors,
+            **self.counts,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Receive and summarise the telemetry downlink")
+    parser.add_argument("address", nargs="?", default="udp:127.0.0.1:5600", help="udp:HOST:PORT or unix:PATH")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between rate reports")
+    parser.add_argument("--events", action="store_true", help="print every received event")
+    args = parser.parse_args(argv)
+
+    av_log.configure(level="WARNING")
+    receiver = TelemetryReceiver(parse_address(args.address))
+    print(f"listening on {args.address}")
+    last, last_records = time.monotonic(), 0
+    try:
+        while True:
+            records = receiver.receive(args.interval)
+            if args.events:
+                for record in records:
+                    if isinstance(record, Event):
+                        print(f"  t={record.timestamp:.3f} {record.subsystem}: {record.message}")
+            now = time.monotonic()
+            if now - last >= args.interval:
+                rate = (receiver.records - last_records) / (now - last)
+                print(f"{rate:8.0f} records/s  frames={receiver.counts['frame']} "
+                      f"commands={receiver.counts['command']} events={receiver.counts['event']} "
+                      f"lost datagrams={receiver.lost}")
+                last, last_records = now, receiver.records
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.close()
+        av_log.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+import time
+
+# Low-overhead task timing instrumentation.
+# LatencyHistogram is an HDR-style log-linear histogram over integer
+# nanoseconds: values are grouped by power of two and each power is split into
+# 2**SUB_BUCKET_BITS linear sub-buckets, so recording is a bit_length, a shift
+# and a list increment, with a relative error below 1 / 2**(SUB_BUCKET_BITS - 1).
+
+SUB_BUCKET_BITS = 5
+MAX_MAGNITUDE = 32  # values up to ~2**37 ns (~2 minutes) keep full resolution
+
+
+class LatencyHistogram:
+    def __init__(self, sub_bucket_bits=SUB_BUCKET_BITS, max_magnitude=MAX_MAGNITUDE):
+        self.bits = sub_bucket_bits
+        self.max_magnitude = max_magnitude
+        self.counts = [0] * ((max_magnitude + 1) << sub_bucket_bits)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value):
+        value = int(value)
+        if value < 0:
+            value = 0
+        magnitude = value.bit_length() - self.bits
+        if magnitude < 0:
+            magnitude = 0
+        elif magnitude > self.max_magnitude:
+            magnitude = self.max_magnitude
+            value = ((1 << self.bits) - 1) << magnitude
+        self.counts[(magnitude << self.bits) + (value >> magnitude)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def _bucket_value(self, index):
+        magnitude = index >> self.bits
+        sub = index & ((1 << self.bits) - 1)
+        # Upper edge of the bucket, so percentiles never under-report
+        return ((sub + 1) << magnitude) - 1 if magnitude else sub
+
+    def percentile(self, q):
+        if self.count == 0:
+            return 0
+        target = max(1, int(self.count * q / 100.0 + 0.5))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if n:
+                seen += n
+                if seen >= target:
+                    return min(self._bucket_value(index), self.max)
+        return self.max
+
+    def percentiles(self, qs):
+        # Several percentiles in one pass, stopping at the bucket of the highest
+        if self.count == 0:
+            return [0] * len(qs)
+        targets = sorted((max(1, int(self.count * q / 100.0 + 0.5)), i) for i, q in enumerate(qs))
+        values = [self.max] * len(qs)
+        seen = 0
+        k = 0
+        for index, n in enumerate(self.counts):
+            if n:
+                seen += n
+                while k < len(targets) and seen >= targets[k][0]:
+                    values[targets[k][1]] = min(self._bucket_value(index), self.max)
+                    k += 1
+                if k == len(targets):
+                    break
+        return values
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def summary(self, scale=1e-6):
+        # Default scale reports nanosecond samples in milliseconds
+        return {
+            "count": self.count,
+            "min": (self.min or 0) * scale,
+            "mean": self.mean() * scale,
+            "p50": self.percentile(50) * scale,
+            "p90": self.percentile(90) * scale,
+            "p99": self.percentile(99) * scale,
+            "p999": self.percentile(99.9) * scale,
+            "max": self.max * scale,
+        }
+
+
+# Per-task loop metrics
+# work:   duration of one step (perf_counter_ns)
+# period: start-to-start interval on the task clock (virtual in simulation)
+# jitter: |period - nominal period|
+# A run is an overrun when its work exceeds the nominal period, and a late
+# start when it starts more than half a period after the previous start plus
+# one period. That is start-to-start jitter, not lateness against a release;
+# the scheduler counts deadline misses (ScheduledTask.deadline_misses).
+class TaskMetrics:
+    def __init__(self, name, period):
+        self.name = name
+        self.period_ns = int(period * 1e9)
+        self.work = LatencyHistogram()
+        self.period = LatencyHistogram()
+        self.jitter = LatencyHistogram()
+        self.runs = 0
+        self.overruns = 0
+        self.late_starts = 0
+        # Steps that raised; the scheduler restarts the task after a backoff
+        self.crashes = 0
+        self._last_start = None
+
+    def record(self, start, work_ns):
+        # start is the task clock in seconds
+        start_ns = int(start * 1e9)
+        self.runs += 1
+        self.work.record(work_ns)
+        if work_ns > self.period_ns:
+            self.overruns += 1
+        if self._last_start is not None:
+            actual = start_ns - self._last_start
+            self.period.record(actual)
+            deviation = actual - self.period_ns
+            self.jitter.record(-deviation if deviation < 0 else deviation)
+            if deviation > self.period_ns // 2:
+                self.late_starts += 1
+        self._last_start = start_ns
+
+    def summary(self):
+        return {
+            "nominal_period_ms": self.period_ns * 1e-6,
+            "runs": self.runs,
+            "overruns": self.overruns,
+            "late_starts": self.late_starts,
+            "crashes": self.crashes,
+            "work_ms": self.work.summary(),
+            "period_ms": self.period.summary(),
+            "jitter_ms": self.jitter.summary(),
+        }
+
+    def describe(self):
+        work = self.work.summary()
+        period = self.period.summary()
+        jitter = self.jitter.summary()
+        return (f"{self.name}: runs={self.runs} work p50={work['p50']:.3f}ms p99={work['p99']:.3f}ms "
+                f"max={work['max']:.3f}ms period mean={period['mean']:.3f}ms (nominal {self.period_ns * 1e-6:.3f}ms) "
+                f"jitter p99={jitter['p99']:.3f}ms overruns={self.overruns} late_starts={self.late_starts} "
+                f"crashes={self.crashes}")
+
+
+def timed(metrics, step, clock, perf_counter_ns=time.perf_counter_ns):
+    # Runs one step and records it into metrics; a step that raises is only
+    # counted, and the exception is left to the caller's supervision
+    start = clock()
+    t0 = perf_counter_ns()
+    try:
+        step()
+    except Exception:
+        metrics.crashes += 1
+        raise
+    metrics.record(start, perf_counter_ns() - t0)
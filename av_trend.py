@@ -0,0 +1,72 @@
+import numpy as np
+
+# Incremental min/max decimation for live trend plots.
+#
+# The time axis is cut into fixed-width buckets (span / columns seconds) kept
+# in a circular array. New samples are folded into their bucket's running min
+# and max, so the cost per update is proportional to the number of new samples
+# and the cost per redraw to the number of columns, however long the history.
+# Min/max is idempotent, so folding the same sample twice changes nothing and
+# consumers need not track exactly which samples they have already seen.
+
+
+class MinMaxTrend:
+    def __init__(self, n_channels, span, columns=2048):
+        self.n_channels = n_channels
+        self.span = span
+        self.columns = columns
+        self.bucket = span / columns
+        self.lo = np.full((columns, n_channels), np.nan)
+        self.hi = np.full((columns, n_channels), np.nan)
+        self.last = None
+
+    def add(self, times, data):
+        # times: (samples,), data: (n_channels, samples), both in time order
+        if len(times) == 0:
+            return
+        buckets = np.floor(np.asarray(times) / self.bucket).astype(np.int64)
+        newest = int(buckets[-1])
+        if self.last is not None and newest > self.last:
+            # Recycle the columns that scrolled out of the span
+            if newest - self.last >= self.columns:
+                self.lo.fill(np.nan)
+                self.hi.fill(np.nan)
+            else:
+                stale = np.arange(self.last + 1, newest + 1) % self.columns
+                self.lo[stale] = np.nan
+                self.hi[stale] = np.nan
+        if self.last is None or newest > self.last:
+            self.last = newest
+        keep = buckets > self.last - self.columns
+        columns = buckets[keep] % self.columns
+        values = np.asarray(data)[:, keep].T
+        # fmin/fmax ignore the NaN that marks an empty column
+        np.fmin.at(self.lo, columns, values)
+        np.fmax.at(self.hi, columns, values)
+
+    def clear(self):
+        self.lo.fill(np.nan)
+        self.hi.fill(np.nan)
+        self.last = None
+
+    def time_range(self):
+        if self.last is None:
+            return None
+        end = (self.last + 1) * self.bucket
+        return end - self.span, end
+
+    def envelope(self, width=None):
+        # (lo, hi) arrays of shape (width, n_channels), oldest column first.
+        # Columns are merged down to `width` so a plot never draws more than
+        # one min/max pair per pixel column; empty columns are NaN.
+        if self.last is None:
+            empty = np.full((0, self.n_channels), np.nan)
+            return empty, empty
+        order = np.arange(self.last + 1, self.last + 1 + self.columns) % self.columns
+        lo = self.lo[order]
+        hi = self.hi[order]
+        if width is not None and 0 < width < self.columns:
+            edges = np.linspace(0, self.columns, width, endpoint=False).astype(np.intp)
+            lo = np.fmin.reduceat(lo, edges, axis=0)
+            hi = np.fmax.reduceat(hi, edges, axis=0)
+        return lo, hi
@@ -0,0 +1,204 @@
+import numpy as np
+
+from av_datalog import SENSOR_CHANNELS
+
+# Schema-driven replacement for the recursive ai_check walk.
+# A schema maps field names to specs; compile_schema() turns it into one flat
+# generated predicate that is evaluated per frame without any dict walking.
+
+
+class Range:
+    def __init__(self, lo, hi):
+        self.lo = float(lo)
+        self.hi = float(hi)
+
+
+class OneOf:
+    def __init__(self, *values):
+        self.values = frozenset(values)
+
+
+class Vector:
+    # Fixed-length tuple; component i is stored as channel <field>_<names[i]>
+    def __init__(self, *components, names=("x", "y", "z")):
+        self.components = components
+        self.names = names
+
+
+class Mapping:
+    # Nested dict; sub-keys are stored as channels under their own names
+    def __init__(self, fields):
+        self.fields = fields
+
+
+class Each:
+    # Every item of a list (e.g. route waypoints) must match spec
+    def __init__(self, spec):
+        self.spec = spec
+
+
+POSITION = Vector(Range(-180, 180), Range(-90, 90), Range(-500, 15000))
+
+SENSOR_SCHEMA = {
+    "altitude": Range(-500, 15000),
+    "speed": Range(0, 1000),
+    "position": POSITION,
+    "temperature": Range(-80, 80),
+    "pressure": Range(800, 1100),
+    "gyro": Vector(Range(-250, 250), Range(-250, 250), Range(-250, 250)),
+    "accelerometer": Vector(Range(-40, 40), Range(-40, 40), Range(-40, 40)),
+    "magnetometer": Vector(Range(-150, 150), Range(-150, 150), Range(-150, 150)),
+    "weather": Mapping({
+        "wind_speed": Range(0, 150),
+        "wind_direction": Range(0, 360),
+        "humidity": Range(0, 100),
+    }),
+    "fuel_level": Range(0, 100),
+    "engine_status": OneOf("ON", "OFF"),
+    "oil_pressure": Range(0, 120),
+    "hydraulic_pressure": Range(0, 3500),
+    "battery_temperature": Range(-40, 70),
+    "system_voltage": Range(0, 32),
+}
+
+CONTROL_SCHEMA = {
+    "pitch": Range(-1.5, 1.5),
+    "roll": Range(-1.5, 1.5),
+    "yaw": Range(-1.5, 1.5),
+    "throttle": Range(0, 1),
+}
+
+NAVIGATION_SCHEMA = {
+    "current_position": POSITION,
+    "route": Each(POSITION),
+}
+
+POWER_SCHEMA = {
+    "battery_level": Range(0, 100),
+    "power_consumption": Range(0, 10),
+}
+
+BITE_SCHEMA = {
+    "status": OneOf("OK", "ERROR"),
+}
+
+SECURITY_SCHEMA = {
+    "threat_level": OneOf("LOW", "MEDIUM", "HIGH"),
+}
+
+
+class _Compiler:
+    def __init__(self):
+        self.namespace = {}
+        self.n = 0
+
+    def constant(self, value):
+        name = f"_c{self.n}"
+        self.n += 1
+        self.namespace[name] = value
+        return name
+
+    def terms(self, spec, expr):
+        if isinstance(spec, Range):
+            return [f"{self.constant(spec.lo)} <= {expr} <= {self.constant(spec.hi)}"]
+        if isinstance(spec, OneOf):
+            return [f"{expr} in {self.constant(spec.values)}"]
+        if isinstance(spec, Vector):
+            terms = [f"len({expr}) == {len(spec.components)}"]
+            for i, component in enumerate(spec.components):
+                terms += self.terms(component, f"{expr}[{i}]")
+            return terms
+        if isinstance(spec, Mapping):
+            terms = []
+            for key, field in spec.fields.items():
+                terms += self.terms(field, f"{expr}[{key!r}]")
+            return terms
+        if isinstance(spec, Each):
+            item = self.function(spec.spec)
+            return [f"all(map({self.constant(item)}, {expr}))"]
+        raise TypeError(f"unsupported schema spec: {spec!r}")
+
+    def function(self, spec):
+        source = (
+            "def check(d):\n"
+            "    try:\n"
+            f"        return bool({' and '.join(self.terms(spec, 'd')) or 'True'})\n"
+            "    except (TypeError, KeyError, IndexError):\n"
+            "        return False\n"
+        )
+        namespace = dict(self.namespace)
+        exec(source, namespace)
+        return namespace["check"]
+
+
+# Per-frame validator compiled once from a schema
+class Validator:
+    def __init__(self, schema):
+        self.schema = schema
+        self._check = _Compiler().function(Mapping(schema))
+        self._field_checks = None
+
+    def __call__(self, data):
+        # data is a mapping such as self.__dict__ or a control command dict
+        return self._check(data)
+
+    def failures(self, data):
+        # Diagnostic path: names of the fields that fail their spec
+        if self._field_checks is None:
+            self._field_checks = [(key, _Compiler().function(Mapping({key: spec})))
+                                  for key, spec in self.schema.items()]
+        return [key for key, check in self._field_checks if not check(data)]
+
+
+def compile_schema(schema):
+    return Validator(schema)
+
+
+def channel_limits(schema):
+    # Flatten numeric ranges to {channel: (lo, hi)} using the DataLogger channel names
+    limits = {}
+    for key, spec in schema.items():
+        if isinstance(spec, Range):
+            limits[key] = (spec.lo, spec.hi)
+        elif isinstance(spec, Vector):
+            for name, component in zip(spec.names, spec.components):
+                if isinstance(component, Range):
+                    limits[f"{key}_{name}"] = (component.lo, component.hi)
+        elif isinstance(spec, Mapping):
+            limits.update(channel_limits(spec.fields))
+    return limits
+
+
+# Vectorized validator for (channels x samples) windows such as DataLogger.window()
+class BatchValidator:
+    def __init__(self, channels, limits):
+        self.channels = tuple(channels)
+        self.lo = np.full((len(self.channels), 1), -np.inf)
+        self.hi = np.full((len(self.channels), 1), np.inf)
+        for i, name in enumerate(self.channels):
+            if name in limits:
+                self.lo[i, 0], self.hi[i, 0] = limits[name]
+
+    def _bad(self, data):
+        # NaN fails both comparisons, so it is reported as out of range
+        return ~((data >= self.lo) & (data <= self.hi))
+
+    def check(self, data):
+        # Boolean mask with one entry per sample
+        return ~self._bad(data).any(axis=0)
+
+    def __call__(self, data):
+        return bool(self.check(data).all())
+
+    def failing_channels(self, data):
+        bad = self._bad(data).any(axis=1)
+        return [name for name, failed in zip(self.channels, bad) if failed]
+
+
+SENSOR_VALIDATOR = compile_schema(SENSOR_SCHEMA)
+CONTROL_VALIDATOR = compile_schema(CONTROL_SCHEMA)
+NAVIGATION_VALIDATOR = compile_schema(NAVIGATION_SCHEMA)
+POWER_VALIDATOR = compile_schema(POWER_SCHEMA)
+BITE_VALIDATOR = compile_schema(BITE_SCHEMA)
+SECURITY_VALIDATOR = compile_schema(SECURITY_SCHEMA)
+SENSOR_BATCH_VALIDATOR = BatchValidator(SENSOR_CHANNELS, channel_limits(SENSOR_SCHEMA))
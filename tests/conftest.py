@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# The av_* modules live at the repository root, next to this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import av_log  # noqa: E402
+
+
+@pytest.fixture(autouse=True, scope="session")
+def quiet_logging():
+    av_log.configure(level="OFF")
+    yield
+    av_log.shutdown()
+
+
+@pytest.fixture
+def make_frame():
+    # Factory of in-range sensor frames whose values shift with `seq`
+    from av_datalog import SENSOR_CHANNELS
+    from av_frames import frame_from_values
+    from av_validation import SENSOR_SCHEMA, channel_limits
+
+    limits = channel_limits(SENSOR_SCHEMA)
+    nominal = [(limits[name][0] + limits[name][1]) / 2 if name in limits else 1.0 for name in SENSOR_CHANNELS]
+
+    def make(seq, timestamp=None):
+        values = [value + seq * 0.001 for value in nominal]
+        values[SENSOR_CHANNELS.index("engine_on")] = 1.0
+        return frame_from_values(seq, seq * 0.01 if timestamp is None else timestamp, values)
+    return make
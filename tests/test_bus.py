@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+
+from av_bus import CONTROL_COMMANDS, POWER_STATUS, SENSOR_FRAMES, DataBus, PowerStatus
+
+
+def power(i):
+    return PowerStatus(float(i), 100.0 - i, 5.0)
+
+
+def test_latest_value_and_sequence():
+    bus = DataBus()
+    topic = bus.topic(POWER_STATUS)
+    assert bus.latest(POWER_STATUS) is None
+    bus.publish(POWER_STATUS, power(1))
+    assert topic.read_newer(0) == power(1)
+    assert topic.read_newer(1) is None
+    assert bus.latest(POWER_STATUS) == power(1)
+
+
+def test_topics_are_typed():
+    bus = DataBus()
+    with pytest.raises(TypeError):
+        bus.publish(POWER_STATUS, {"battery_level": 50.0})
+
+
+def test_full_subscription_drops_oldest_and_counts():
+    bus = DataBus()
+    subscription = bus.subscribe(POWER_STATUS, capacity=4)
+    for i in range(10):
+        bus.publish(POWER_STATUS, power(i))
+    assert subscription.received == 10
+    assert subscription.dropped == 6
+    assert [message for _, message in subscription.drain()] == [power(i) for i in range(6, 10)]
+    # A slow subscriber never holds the publisher or other subscribers back
+    assert bus.summary()[POWER_STATUS]["subscriptions"] == [{"received": 10, "dropped": 6, "errors": 0,
+                                                                  "queued": 0}]
+
+
+def test_subscription_starts_from_latest_state(make_frame):
+    bus = DataBus()
+    bus.topic(SENSOR_FRAMES).publish(make_frame(1))
+    subscription = bus.subscribe((SENSOR_FRAMES, POWER_STATUS))
+    bus.publish(POWER_STATUS, power(2))
+    assert [name for name, _ in subscription.drain()] == [SENSOR_FRAMES, POWER_STATUS]
+
+
+def test_consume_wakes_on_new_data_and_stops_on_close():
+    bus = DataBus()
+    done = threading.Event()
+    seen = []
+
+    def handler(name, message):
+        seen.append(message)
+        if len(seen) == 3:
+            done.set()
+    bus.consume(POWER_STATUS, handler)
+    for i in range(3):
+        bus.publish(POWER_STATUS, power(i))
+    assert done.wait(1.0)
+    bus.close()
+    assert seen == [power(0), power(1), power(2)]
+    assert bus.summary()[POWER_STATUS]["subscriptions"] == []
+
+
+def test_get_times_out_when_idle():
+    subscription = DataBus().subscribe(CONTROL_COMMANDS)
+    assert subscription.get(timeout=0.01) is None
+    subscription.close()
+    assert subscription.get() is None
+
+
+def test_consumer_survives_a_failing_handler():
+    bus = DataBus()
+    done = threading.Event()
+    seen = []
+
+    def handler(name, message):
+        if message.timestamp == 1.0:
+            raise ValueError("bad reading")
+        seen.append(message)
+        if len(seen) == 2:
+            done.set()
+    subscription = bus.consume(POWER_STATUS, handler)
+    for i in range(3):
+        bus.publish(POWER_STATUS, power(i))
+    assert done.wait(1.0)
+    bus.close()
+    assert seen == [power(0), power(2)]
+    assert subscription.errors == 1
+
+
+def test_failing_listener_is_counted_and_publish_continues():
+    bus = DataBus()
+    seen = []
+
+    def broken(message):
+        raise ValueError("bad listener")
+    bus.listen(POWER_STATUS, broken)
+    bus.listen(POWER_STATUS, seen.append)
+    subscription = bus.subscribe(POWER_STATUS)
+    bus.publish(POWER_STATUS, power(1))
+    assert seen == [power(1)]
+    assert subscription.drain() == [(POWER_STATUS, power(1))]
+    assert bus.summary()[POWER_STATUS]["listener_errors"] == 1
+
+
+def test_concurrent_subscribe_and_close_lose_no_subscription():
+    bus = DataBus()
+    topic = bus.topic(POWER_STATUS)
+    kept = []
+    start = threading.Barrier(4)
+
+    def churn():
+        start.wait()
+        for _ in range(500):
+            bus.subscribe(POWER_STATUS).close()
+            kept.append(bus.subscribe(POWER_STATUS))
+    threads = [threading.Thread(target=churn) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(topic._subscriptions) == len(kept) == 2000
+    assert set(map(id, topic._subscriptions)) == set(map(id, kept))
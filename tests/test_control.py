@@ -0,0 +1,72 @@
+import tracemalloc
+
+import numpy as np
+
+from av_control import CONTROL_AXES, DEFAULT_SETPOINTS, OUTPUT_LIMITS, TRIM, PIDBank
+
+SETPOINTS = np.array([DEFAULT_SETPOINTS])
+PITCH = CONTROL_AXES.index("pitch")
+
+
+def test_outputs_saturate_at_the_axis_limits():
+    bank = PIDBank(2)
+    measured = np.array([[0.0, -500.0, -500.0, 0.0], [20000.0, 500.0, 500.0, 2000.0]])
+    output = bank.update_many(np.repeat(SETPOINTS, 2, axis=0), measured, 0.01)
+    np.testing.assert_array_equal(output[0], OUTPUT_LIMITS[1])
+    np.testing.assert_array_equal(output[1], OUTPUT_LIMITS[0])
+
+
+def test_integrator_freezes_while_saturated_and_recovers_at_once():
+    bank = PIDBank(1)
+    low = SETPOINTS.copy()
+    low[0, PITCH] -= 2000.0
+    for _ in range(1000):
+        bank.update_many(SETPOINTS, low, 0.01)
+    # Pinned at the limit the whole time, without winding the integrator up
+    assert bank.output[0, PITCH] == OUTPUT_LIMITS[1][PITCH]
+    assert bank.integral[0, PITCH] == 0.0
+    # Once the error reverses the output leaves the limit on the next step
+    high = SETPOINTS.copy()
+    high[0, PITCH] += 100.0
+    bank.update_many(SETPOINTS, high, 0.01)
+    assert bank.output[0, PITCH] < OUTPUT_LIMITS[1][PITCH]
+
+
+def test_integrator_accumulates_inside_the_limits():
+    bank = PIDBank(1)
+    measured = SETPOINTS.copy()
+    measured[0, PITCH] -= 1.0
+    for _ in range(100):
+        bank.update_many(SETPOINTS, measured, 0.01)
+    assert np.isclose(bank.integral[0, PITCH], 1.0)
+    assert TRIM[PITCH] < bank.output[0, PITCH] < OUTPUT_LIMITS[1][PITCH]
+
+
+def test_rows_match_independent_controllers():
+    rng = np.random.default_rng(4)
+    setpoints = np.repeat(SETPOINTS, 3, axis=0)
+    dt = np.array([[0.01], [0.02], [0.05]])
+    fleet = PIDBank(3)
+    fleet.set_mode("HIGH_ALTITUDE", rows=[1])
+    single = [PIDBank(1), PIDBank(1, mode="HIGH_ALTITUDE"), PIDBank(1)]
+    for _ in range(50):
+        measured = setpoints + rng.normal(0.0, 5.0, setpoints.shape)
+        output = fleet.update_many(setpoints, measured, dt)
+        for row, bank in enumerate(single):
+            expected = bank.update_many(setpoints[row:row + 1], measured[row:row + 1], dt[row, 0])
+            np.testing.assert_allclose(output[row], expected[0], rtol=1e-12)
+
+
+def test_update_many_allocates_no_state_sized_arrays():
+    bank = PIDBank(1000)
+    setpoints = np.repeat(SETPOINTS, 1000, axis=0)
+    measured = setpoints + np.random.default_rng(1).normal(0.0, 1.0, setpoints.shape)
+    bank.update_many(setpoints, measured, 0.01)
+    tracemalloc.start()
+    try:
+        bank.update_many(setpoints, measured, 0.01)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # One (1000, 4) float64 temporary would be 32 kB
+    assert peak < 8000
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from av_datalog import SENSOR_CHANNELS, ColumnarRingBuffer, sensor_record, sensor_values
+
+
+def filled(capacity, n):
+    buffer = ColumnarRingBuffer(("a", "b"), capacity)
+    for i in range(n):
+        buffer.append(float(i), (i, -i))
+    return buffer
+
+
+def test_window_before_wraparound():
+    buffer = filled(8, 5)
+    times, data = buffer.window()
+    assert len(buffer) == 5
+    np.testing.assert_array_equal(times, np.arange(5.0))
+    np.testing.assert_array_equal(data[1], -np.arange(5.0))
+
+
+def test_window_after_wraparound_keeps_latest_in_order():
+    buffer = filled(8, 21)
+    times, data = buffer.window()
+    assert len(buffer) == 8
+    assert buffer.count == 21
+    np.testing.assert_array_equal(times, np.arange(13.0, 21.0))
+    np.testing.assert_array_equal(data[0], np.arange(13.0, 21.0))
+    np.testing.assert_array_equal(buffer.channel("b", 3), [-18.0, -19.0, -20.0])
+    assert buffer.latest()[0] == 20.0
+
+
+def test_window_is_a_read_only_view():
+    times, data = filled(8, 10).window(4)
+    assert not times.flags.writeable
+    with pytest.raises(ValueError):
+        data[0, 0] = 1.0
+
+
+def test_between_and_since_across_the_seam():
+    buffer = filled(8, 12)
+    times, data = buffer.between(6.0, 10.0)
+    np.testing.assert_array_equal(times, [6.0, 7.0, 8.0, 9.0])
+    np.testing.assert_array_equal(data[0], [6.0, 7.0, 8.0, 9.0])
+    times, _ = buffer.since(9)
+    np.testing.assert_array_equal(times, [9.0, 10.0, 11.0])
+    # Older than the buffer holds: everything retained
+    assert len(buffer.since(0)[0]) == 8
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        ColumnarRingBuffer(("a",), 0)
+
+
+def test_sensor_record_round_trip(make_frame):
+    frame = make_frame(3)
+    values = sensor_values(frame)
+    assert len(values) == len(SENSOR_CHANNELS)
+    record = sensor_record(values)
+    assert record["position"] == frame.position
+    assert record["weather"] == dict(frame.weather)
+    assert record["engine_status"] == "ON"
+
+
+def test_data_logger_records_rebuild_the_latest_entries(make_frame):
+    from av_sm1 import DataLogger
+    from av_sim import VirtualClock
+
+    logger = DataLogger(capacity=8, clock=VirtualClock())
+    for i in range(12):
+        logger.log_data(make_frame(i), float(i))
+    records = logger.records(3)
+    assert len(records) == 3
+    assert records[-1]["sensor_data"] == sensor_record(sensor_values(make_frame(11)))
+    assert records[-1]["sensor_data"]["engine_status"] == "ON"
+    assert len(logger.records()) == 8
+    assert logger.get_log() == logger.records()
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from av_bus import ATTITUDE
+from av_fusion import SensorFusion
+from av_sensor_models import SensorModel
+from av_sim import create_simulation
+
+
+def samples(seed, n):
+    # (channels, n) samples of the flight shared by every sensor with truth seed 0
+    model = SensorModel(seed, block_size=512, truth_seed=0)
+    return np.array([model.next_values() for _ in range(n)]).T
+
+
+def assert_same_fusion(batch, stepped, fusion):
+    # Wrapped channels may sit on either side of their wrap point
+    difference = batch - stepped
+    for row, period in zip(fusion.wrap_rows.tolist(), fusion.wrap_period.tolist()):
+        difference[row] = (difference[row] + period / 2) % period - period / 2
+    np.testing.assert_allclose(difference, 0.0, atol=1e-6)
+
+
+@pytest.mark.parametrize("with_backup", [False, True])
+def test_fuse_batch_matches_step_wise_updates(with_backup):
+    primary = samples(1, 3000)
+    backup = samples(2, 3000) if with_backup else None
+    stepped = SensorFusion()
+    expected = np.array([stepped.update(primary[:, i], None if backup is None else backup[:, i]).copy()
+                         for i in range(primary.shape[1])]).T
+    batched = SensorFusion()
+    # Several blocks, each continuing from the state the last one left
+    out = batched.fuse_batch(primary, backup, block=1024)
+    assert_same_fusion(out, expected, batched)
+    np.testing.assert_allclose(batched.variance, stepped.variance, rtol=1e-9)
+    np.testing.assert_allclose(batched.attitude, stepped.attitude, atol=1e-6)
+    # And update() carries on from where the batch stopped
+    assert_same_fusion(batched.update(primary[:, 0])[:, None], stepped.update(primary[:, 0])[:, None], batched)
+
+
+def test_fused_attitude_is_published_on_the_bus():
+    simulation = create_simulation(seed=3)
+    computer = simulation.computer
+    try:
+        simulation.run(0.5)
+    finally:
+        computer.stop()
+    attitude = computer.bus.latest(ATTITUDE)
+    assert attitude.timestamp == computer.sensor_frames.read().timestamp
+    assert attitude[1:] == computer.sensor_fusion.attitude
+    assert 0.0 <= attitude.heading < 360.0
@@ -0,0 +1,91 @@
+from av_journal import CRITICAL, DEBUG, ERROR, INFO, WARNING, EventJournal
+from av_sim import VirtualClock
+
+
+def journal_with_events():
+    clock = VirtualClock()
+    journal = EventJournal(clock=clock)
+    severities = (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+    for i in range(50):
+        clock.time = float(i)
+        journal.record("bite" if i % 2 else "security", severities[i % 5], f"event {i}")
+    return clock, journal
+
+
+def test_range_query_is_half_open_and_time_ordered():
+    _, journal = journal_with_events()
+    events = journal.query(start=10.0, end=20.0)
+    assert [event.timestamp for event in events] == [float(i) for i in range(10, 20)]
+    assert journal.query(start=49.5) == []
+
+
+def test_severity_and_subsystem_filters():
+    _, journal = journal_with_events()
+    errors = journal.query(min_severity="error")
+    assert errors and all(event.severity >= ERROR for event in errors)
+    assert len(errors) == 20
+    bite = journal.query("bite", start=0.0, end=10.0, min_severity=WARNING)
+    assert [event.message for event in bite] == ["event 3", "event 7", "event 9"]
+    assert journal.count("security", min_severity=CRITICAL) == 5
+
+
+def test_recent_is_relative_to_the_clock():
+    clock, journal = journal_with_events()
+    clock.time = 50.0
+    assert [event.timestamp for event in journal.recent(3)] == [47.0, 48.0, 49.0]
+
+
+def test_listeners_see_every_event():
+    journal = EventJournal()
+    seen = []
+    listener = seen.append
+    journal.subscribe(listener)
+    journal.record("maintenance", INFO, "oil check")
+    journal.unsubscribe(listener)
+    journal.record("maintenance", INFO, "not seen")
+    assert [event.message for event in seen] == ["oil check"]
+
+
+def test_clear_one_subsystem():
+    _, journal = journal_with_events()
+    journal.clear("bite")
+    assert journal.count("bite") == 0
+    assert journal.count("security") == 25
+
+
+def test_retention_cap_covers_all_severities_of_a_subsystem():
+    clock = VirtualClock()
+    journal = EventJournal(clock=clock, retention={"bite": 10}, default_retention=3)
+    for i in range(100):
+        clock.time = float(i)
+        journal.record("bite", i % 5, f"event {i}")
+        journal.record("security", INFO, f"event {i}")
+    assert journal.count("bite") == 10
+    # The oldest events go first, whatever their severity
+    assert [event.timestamp for event in journal.query("bite")] == [float(i) for i in range(90, 100)]
+    assert [event.message for event in journal.query("security")] == ["event 97", "event 98", "event 99"]
+
+
+def test_failing_listener_is_counted_and_others_still_run():
+    journal = EventJournal()
+    seen = []
+
+    def broken(event):
+        raise RuntimeError("downlink gone")
+    journal.subscribe(broken)
+    journal.subscribe(seen.append)
+    event = journal.record("bite", ERROR, "BITE Test Failed")
+    assert seen == [event]
+    assert journal.listener_errors == 1
+    assert journal.count("bite") == 1
+
+
+def test_recorded_counts_outlive_retention_and_clear():
+    journal = EventJournal(retention={"bite": 10})
+    for i in range(25):
+        journal.record("bite", ERROR if i % 5 == 0 else INFO, f"event {i}")
+    assert journal.count("bite") == 10
+    assert journal.recorded("bite") == 25
+    assert journal.recorded("bite", min_severity=ERROR) == 5
+    journal.clear()
+    assert journal.recorded() == 25
@@ -0,0 +1,50 @@
+import io
+import threading
+
+from av_log import INFO, LogPipeline
+
+
+def test_records_are_formatted_and_written_by_stop():
+    stream = io.StringIO()
+    pipeline = LogPipeline(stream, flush_interval=10.0)
+    log = pipeline.get_logger("nav")
+    log.info("waypoint {} of {}", 3, 7)
+    log.debug("suppressed {}", 1)
+    pipeline.stop()
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1
+    assert lines[0].endswith("INFO [nav] waypoint 3 of 7")
+
+
+def test_logging_after_stop_never_restarts_the_writer():
+    stream = io.StringIO()
+    pipeline = LogPipeline(stream, level=INFO, flush_interval=10.0)
+    log = pipeline.get_logger("shutdown")
+    log.info("before stop")
+    pipeline.stop()
+    log.info("after stop")
+    assert not pipeline._running
+    assert not pipeline._thread.is_alive()
+    assert stream.getvalue().splitlines()[-1].endswith("after stop")
+    # A second stop, as from atexit, returns at once
+    pipeline.stop()
+
+
+def test_logging_from_another_thread_during_stop_lets_stop_return():
+    stream = io.StringIO()
+    pipeline = LogPipeline(stream, flush_interval=0.001)
+    log = pipeline.get_logger("busy")
+    done = threading.Event()
+
+    def chatter():
+        while not done.is_set():
+            log.info("tick")
+    thread = threading.Thread(target=chatter)
+    thread.start()
+    stopper = threading.Thread(target=pipeline.stop)
+    stopper.start()
+    stopper.join(2.0)
+    done.set()
+    thread.join()
+    assert not stopper.is_alive()
+    assert not pipeline._running
@@ -0,0 +1,89 @@
+import re
+import urllib.request
+
+import pytest
+
+from av_metrics import CONTENT_TYPE, MetricsRegistry, MetricsServer
+
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*"'
+                    r'(,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*")*\})? \S+$')
+
+
+def exposition_lines(registry):
+    text = registry.collect().decode("utf-8")
+    assert text.endswith("\n")
+    return text.splitlines()
+
+
+def test_every_line_is_valid_exposition_format():
+    registry = MetricsRegistry()
+    registry.counter("av_frames_total", "Frames").inc(3)
+    registry.gauge("av_mode", "Mode", ("mode",)).set_state("NORMAL", ("NORMAL", "EMERGENCY"))
+    registry.gauge("av_odd", "Odd labels", ("name",)).labels('quote " back\\slash\nnewline').set(float("nan"))
+    registry.histogram("av_latency_seconds", "Latency", buckets=(0.1, 1.0)).observe(0.5)
+    registry.summary("av_work_seconds", "Work", ("task",)).labels("nav").set({0.5: 0.001, 0.99: 0.002}, 1.0, 900)
+    for line in exposition_lines(registry):
+        if line.startswith("#"):
+            assert re.match(r"^# (HELP|TYPE) [a-zA-Z_:][a-zA-Z0-9_:]* .+$", line)
+        else:
+            assert SAMPLE.match(line), line
+
+
+def test_metric_values_and_types():
+    registry = MetricsRegistry()
+    registry.counter("av_frames_total", "Frames").set_function(lambda: 42)
+    registry.gauge("av_mode", "Mode", ("mode",)).set_state("NORMAL", ("NORMAL", "EMERGENCY"))
+    lines = exposition_lines(registry)
+    assert "# TYPE av_frames_total counter" in lines
+    assert "av_frames_total 42.0" in lines
+    assert 'av_mode{mode="NORMAL"} 1.0' in lines
+    assert 'av_mode{mode="EMERGENCY"} 0.0' in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("av_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 5.0):
+        histogram.observe(value)
+    lines = exposition_lines(registry)
+    assert 'av_latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'av_latency_seconds_bucket{le="1.0"} 3' in lines
+    assert 'av_latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "av_latency_seconds_count 4" in lines
+    assert "av_latency_seconds_sum 6.25" in lines
+
+
+def test_counters_only_go_up_and_names_are_unique():
+    registry = MetricsRegistry()
+    counter = registry.counter("av_frames_total", "Frames")
+    with pytest.raises(ValueError):
+        counter.inc(-1)
+    assert registry.counter("av_frames_total", "Frames") is counter
+    with pytest.raises(ValueError):
+        registry.gauge("av_frames_total", "Frames")
+
+
+def test_failing_collector_is_counted_not_fatal():
+    registry = MetricsRegistry()
+    registry.gauge("av_up", "Up").set(1)
+
+    def broken():
+        raise RuntimeError("sensor gone")
+    registry.add_collector(broken)
+    lines = exposition_lines(registry)
+    assert "av_up 1.0" in lines
+    assert "av_metrics_collect_errors_total 1" in lines
+
+
+def test_server_serves_the_snapshot():
+    server = MetricsServer(("127.0.0.1", 0), interval=0.05)
+    server.registry.counter("av_frames_total", "Frames").inc()
+    server.start()
+    try:
+        host, port = server.address
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=2) as response:
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            body = response.read().decode("utf-8")
+    finally:
+        server.stop()
+    assert "av_frames_total 1.0" in body.splitlines()
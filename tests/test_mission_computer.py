@@ -0,0 +1,60 @@
+import time
+
+from av_metrics import MetricsRegistry
+from av_sim import create_simulation
+from av_sm1 import AvionicsMissionComputer
+
+
+def fail_control(computer):
+    def update(frame):
+        raise RuntimeError("actuator bus fault")
+    computer.flight_control_system.update = update
+
+
+def restarts_metric(registry, task):
+    for line in registry.collect().decode("utf-8").splitlines():
+        if line.startswith(f'av_task_restarts_total{{task="{task}"}} '):
+            return float(line.split()[-1])
+    return None
+
+
+def test_simulated_task_fault_is_backed_off_and_restarted():
+    simulation = create_simulation(seed=1)
+    computer = simulation.computer
+    registry = MetricsRegistry()
+    computer.register_metrics(registry)
+    fail_control(computer)
+    try:
+        simulation.run(10.0)
+    finally:
+        computer.stop()
+    # Crashes at 0, 0.05, 0.15, 0.35, 0.75, 1.55, 3.15 and 6.35 s; the next
+    # restart is at 11.35 s. At its 100 Hz rate it would have failed 1000 times.
+    assert simulation.crashes["flight_control"] == 8
+    assert computer.task_metrics["flight_control"].crashes == 8
+    assert restarts_metric(registry, "flight_control") == 8.0
+    crashes = computer.journal.query("scheduler")
+    assert len(crashes) == 8
+    assert "restart 8 in 5000 ms" in crashes[-1].message
+    # The other tasks keep running at their own rates
+    assert computer.task_metrics["sensor_data"].runs == 1001
+
+
+def test_scheduled_task_fault_is_backed_off_and_restarted():
+    computer = AvionicsMissionComputer(seed=1)
+    registry = MetricsRegistry()
+    computer.register_metrics(registry)
+    fail_control(computer)
+    computer.start()
+    try:
+        deadline = time.monotonic() + 5.0
+        while computer.scheduler.tasks["flight_control"].crashes < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        computer.stop()
+    task = computer.scheduler.tasks["flight_control"]
+    assert task.crashes >= 3
+    # Restart delays double (50, 100, 200 ms ...), so far fewer releases ran than elapsed periods
+    assert task.runs < task.releases
+    assert restarts_metric(registry, "flight_control") == computer.task_metrics["flight_control"].crashes
+    assert computer.error_management_system.get_error_log()
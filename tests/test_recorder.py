@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from av_datalog import SENSOR_CHANNELS, sensor_values
+from av_recorder import COMMAND_CHANNELS, FlightRecorder, FlightRecording, RecorderFormatError
+
+
+def record_flight(path, make_frame, n, chunk_frames=16, close=True):
+    recorder = FlightRecorder(path, chunk_frames=chunk_frames)
+    frames = [make_frame(i) for i in range(n)]
+    for i, frame in enumerate(frames):
+        recorder.record(frame, {"pitch": i * 0.1, "roll": -i * 0.1, "yaw": 0.0, "throttle": 0.5}, frame.timestamp)
+    if close:
+        recorder.close()
+    else:
+        recorder.flush()
+    return recorder, frames
+
+
+def test_round_trip_through_memory_map(tmp_path, make_frame):
+    path = str(tmp_path / "flight.avr")
+    record_flight(path, make_frame, 40)
+    with FlightRecording(path) as recording:
+        assert len(recording) == 40
+        # Two full chunks of 16 and the final partial one
+        assert recording.n_chunks == 3
+        assert recording.channels == SENSOR_CHANNELS + COMMAND_CHANNELS
+        times, data = recording.read(SENSOR_CHANNELS)
+        np.testing.assert_array_equal(times, np.arange(40) * 0.01)
+        np.testing.assert_array_equal(data[:, 17], sensor_values(make_frame(17)))
+        np.testing.assert_allclose(recording.channel("pitch"), np.arange(40) * 0.1)
+
+
+def test_time_range_spans_chunks(tmp_path, make_frame):
+    path = str(tmp_path / "flight.avr")
+    record_flight(path, make_frame, 40)
+    with FlightRecording(path) as recording:
+        times = recording.times(0.10, 0.35)
+        assert len(times) == 25
+        assert times[0] == pytest.approx(0.10)
+        assert times[-1] == pytest.approx(0.34)
+
+
+def test_unclosed_recording_is_still_readable(tmp_path, make_frame):
+    path = str(tmp_path / "crashed.avr")
+    recorder, _ = record_flight(path, make_frame, 20, close=False)
+    try:
+        with FlightRecording(path) as recording:
+            assert len(recording) == 20
+            np.testing.assert_allclose(recording.channel("roll")[-1], -1.9)
+    finally:
+        recorder.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not-a-recording"
+    path.write_bytes(b"\0" * 8192)
+    with pytest.raises(RecorderFormatError):
+        FlightRecording(str(path))
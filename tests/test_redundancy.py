@@ -0,0 +1,72 @@
+import pytest
+
+from av_redundancy import COLD, HOT, SensorFault, SensorRedundancy, SensorUnit
+from av_sim import VirtualClock
+from av_sm1 import SensorData
+
+
+class _Model:
+    def skip(self, n):
+        pass
+
+
+class _Sensor:
+    def __init__(self):
+        self.model = _Model()
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+
+
+def redundancy(history=256):
+    clock = VirtualClock()
+    return clock, SensorRedundancy(SensorUnit("primary", _Sensor()), SensorUnit("backup", _Sensor()), HOT,
+                                   clock=clock, history=history)
+
+
+def test_failover_hands_over_in_the_same_step():
+    clock, pair = redundancy()
+    primary, backup = pair.units
+    pair.sample()
+    clock.time = 1.0
+    pair.inject_fault("primary")
+    assert pair.sample() is backup.sensor
+    assert pair.active == 1
+    assert pair.history[-1].kind == "failover"
+
+
+def test_both_units_failing_raises():
+    _, pair = redundancy()
+    pair.inject_fault("primary")
+    pair.inject_fault("backup")
+    with pytest.raises(SensorFault):
+        pair.sample()
+
+
+def test_summary_counts_outlive_the_bounded_history():
+    _, pair = redundancy(history=2)
+    for _ in range(3):
+        pair.inject_fault("primary")
+        pair.sample()
+        pair.clear_fault("primary")
+        assert pair.failback()
+    summary = pair.summary()
+    assert len(pair.history) == 2
+    assert summary["failovers"] == 3
+    assert summary["failbacks"] == 3
+    assert summary["active"] == "primary"
+
+
+def test_cold_failover_after_a_long_idle_period_is_fast():
+    clock = VirtualClock()
+    backup = SensorUnit("backup", SensorData(2, truth_seed=0))
+    pair = SensorRedundancy(SensorUnit("primary", _Sensor()), backup, COLD, clock=clock)
+    # A day at 100 Hz on the primary; the cold backup has not drawn a sample yet
+    pair.index = 100 * 3600 * 24
+    clock.time = 3600.0 * 24
+    pair.inject_fault("primary")
+    assert pair.sample() is backup.sensor
+    assert backup.samples == pair.index
+    # Catching up advances model state; it must not regenerate the missed day of noise
+    assert pair.history[-1].switchover_latency < 0.25
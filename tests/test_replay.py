@@ -0,0 +1,28 @@
+import random
+
+import numpy as np
+
+from av_recorder import COMMAND_CHANNELS, FlightRecording
+from av_replay import FlightReplay
+from av_sim import VirtualClock, create_simulation
+from av_sm1 import AvionicsMissionComputer
+
+
+def test_replay_reproduces_live_commands(tmp_path):
+    path = str(tmp_path / "flight.avr")
+    simulation = create_simulation(seed=3, recorder_path=path)
+    simulation.run(20.0)
+    simulation.computer.stop()
+
+    random.seed(3)
+    computer = AvionicsMissionComputer(seed=3, clock=VirtualClock())
+    result = FlightReplay(computer).replay_recording(path)
+    computer.stop()
+
+    with FlightRecording(path) as recording:
+        assert result.frames == len(recording)
+        np.testing.assert_array_equal(result.times, recording.times())
+        for name in COMMAND_CHANNELS:
+            # Live, a frame is recorded with the commands the control step
+            # computed from the frame before it
+            np.testing.assert_array_equal(result.commands[name][:-1], recording.channel(name)[1:])
@@ -0,0 +1,118 @@
+import heapq
+import math
+
+import numpy as np
+import pytest
+
+from av_route import RoutePlanner, WaypointGraph, astar, synthetic_grid
+
+
+def dijkstra(graph, start):
+    # Oracle: shortest airway distance from start to every node
+    indptr, indices, weights = graph._adjacency
+    distance = [math.inf] * len(graph)
+    distance[start] = 0.0
+    heap = [(0.0, start)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > distance[u]:
+            continue
+        for j in range(indptr[u], indptr[u + 1]):
+            v = indices[j]
+            if d + weights[j] < distance[v]:
+                distance[v] = d + weights[j]
+                heapq.heappush(heap, (distance[v], v))
+    return distance
+
+
+def path_cost(graph, path):
+    indptr, indices, weights = graph._adjacency
+    total = 0.0
+    for u, v in zip(path, path[1:]):
+        total += min(weights[j] for j in range(indptr[u], indptr[u + 1]) if indices[j] == v)
+    return total
+
+
+def flown_cost(planner):
+    return path_cost(planner.graph, planner.path)
+
+
+def test_astar_matches_dijkstra():
+    graph = synthetic_grid(15, 15, seed=3)
+    rng = np.random.default_rng(0)
+    # Random reweights make straight lines a poor guide without breaking the heuristic
+    for u, v in graph._edges[rng.choice(len(graph._edges), 60, replace=False)].tolist():
+        graph.set_edge_cost(u, v, path_cost(graph, [u, v]) * rng.uniform(1.0, 5.0))
+    for start, goal in rng.integers(0, len(graph), (20, 2)).tolist():
+        path = astar(graph, start, goal)
+        assert path[0] == start and path[-1] == goal
+        assert path_cost(graph, path) == pytest.approx(dijkstra(graph, start)[goal], rel=1e-12)
+
+
+def test_unreachable_goal_returns_none():
+    graph = synthetic_grid(3, 1)
+    graph.set_edge_cost(1, 2, math.inf)
+    assert astar(graph, 0, 2) is None
+
+
+def planned(graph):
+    planner = RoutePlanner(graph)
+    start, goal = graph.position(0), graph.position(len(graph) - 1)
+    planner.update(start, goal)
+    return planner, start, goal
+
+
+def test_replans_around_a_closed_airway():
+    graph = synthetic_grid(12, 12, seed=1)
+    planner, start, goal = planned(graph)
+    u, v = planner.path[2], planner.path[3]
+    graph.set_edge_cost(u, v, math.inf)
+    planner.update(start, goal)
+    assert (u, v) not in set(zip(planner.path, planner.path[1:]))
+    assert flown_cost(planner) == pytest.approx(dijkstra(graph, planner.path[0])[planner.path[-1]], rel=1e-12)
+
+
+def test_replans_onto_a_cheaper_airway():
+    graph = synthetic_grid(12, 12, seed=1)
+    planner, start, goal = planned(graph)
+    before = planner.stats["searches"]
+    # An airway off the route becomes nearly free
+    on_route = set(zip(planner.path, planner.path[1:]))
+    u, v = next(edge for edge in graph._edges.tolist() if tuple(edge) not in on_route
+                and tuple(edge[::-1]) not in on_route and planner.path[0] in edge)
+    graph.set_edge_cost(u, v, 1.0)
+    planner.update(start, goal)
+    assert planner.stats["searches"] == before + 1
+    assert flown_cost(planner) == pytest.approx(dijkstra(graph, planner.path[0])[planner.path[-1]], rel=1e-12)
+
+
+def test_dearer_airway_off_the_route_does_not_replan():
+    graph = synthetic_grid(12, 12, seed=1)
+    planner, start, goal = planned(graph)
+    before = planner.stats["searches"]
+    on_route = set(planner.path)
+    u, v = next(edge for edge in graph._edges.tolist() if not on_route & set(edge))
+    graph.set_edge_cost(u, v, 1e9)
+    planner.update(start, goal)
+    assert planner.stats["searches"] == before
+
+
+def test_change_history_is_bounded_and_forces_a_full_replan():
+    grid = synthetic_grid(12, 12, seed=1)
+    graph = WaypointGraph(grid.lon, grid.lat, grid._edges, history=4)
+    planner, start, goal = planned(graph)
+    before = planner.stats["searches"]
+    on_route = set(planner.path)
+    off_route = [edge for edge in graph._edges.tolist() if not on_route & set(edge)]
+    for u, v in off_route[:3]:
+        graph.set_edge_cost(u, v, 1e9)
+    assert len(graph.changes_since(0)) == 3
+    for u, v in off_route[3:10]:
+        graph.set_edge_cost(u, v, 1e9)
+    assert len(graph._changes) == 4
+    assert graph.changes_since(0) is None
+    assert len(graph.changes_since(graph.version - 4)) == 4
+    # Only dearer airways off the route, but the planner cannot know that any more
+    planner.update(start, goal)
+    assert planner.stats["searches"] == before + 1
+    assert planner.graph_version == graph.version
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from av_sched import ALERT, DEGRADE, SKIP, RateMonotonicScheduler
+
+
+def run_for(scheduler, seconds):
+    scheduler.start()
+    try:
+        time.sleep(seconds)
+    finally:
+        scheduler.stop()
+
+
+def test_stop_does_not_wait_for_long_periods():
+    scheduler = RateMonotonicScheduler(workers=2)
+    scheduler.add("slow", lambda: None, 30.0)
+    scheduler.add("slower", lambda: None, 60.0)
+    scheduler.start()
+    time.sleep(0.05)
+    started = time.perf_counter()
+    scheduler.stop()
+    assert time.perf_counter() - started < 0.5
+    assert not scheduler._threads
+
+
+def test_runs_on_an_absolute_release_grid():
+    runs = []
+    readings = []
+
+    def clock():
+        readings.append(time.monotonic())
+        return readings[-1]
+    scheduler = RateMonotonicScheduler(workers=1, clock=clock)
+    scheduler.add("tick", lambda: runs.append(time.monotonic()), 0.01)
+    run_for(scheduler, 0.3)
+    stopped = time.monotonic()
+    # Releases sit on start + k * period: the i-th run never starts before slot
+    # i, however late earlier wakeups were, so the count is bounded by the grid
+    start = readings[0]
+    assert len(runs) >= 5
+    assert runs == sorted(runs)
+    assert all(run >= start + i * 0.01 - 1e-9 for i, run in enumerate(runs))
+    assert len(runs) <= (stopped - start) / 0.01 + 1
+
+
+def test_skip_policy_drops_the_release_after_an_overrun():
+    scheduler = RateMonotonicScheduler(workers=1, on_alert=lambda name, message: None)
+    scheduler.add("busy", lambda: time.sleep(0.015), 0.01, policy=SKIP)
+    run_for(scheduler, 0.2)
+    summary = scheduler.summary()["busy"]
+    assert summary["overruns"] > 0
+    assert summary["skipped"] > 0
+
+
+def test_degrade_policy_stretches_the_period():
+    scheduler = RateMonotonicScheduler(workers=1, max_degrade=4)
+    scheduler.add("busy", lambda: time.sleep(0.005), 0.01, budget=0.001, policy=DEGRADE)
+    run_for(scheduler, 0.15)
+    assert scheduler.tasks["busy"].period == 0.04
+
+
+def test_crashed_task_is_restarted_with_backoff():
+    crashes = []
+    attempts = []
+    scheduler = RateMonotonicScheduler(workers=1, on_crash=lambda name, message: crashes.append(name),
+                                       restart_delay=0.02)
+
+    def boom():
+        attempts.append(time.monotonic())
+        raise RuntimeError("sensor bus fault")
+    scheduler.add("faulty", boom, 0.01)
+    run_for(scheduler, 0.2)
+    # Restarts wait at least 20, 40, 80, ... ms after the previous crash: a
+    # slow machine only stretches the gaps, so their lower bounds always hold
+    assert len(attempts) >= 2
+    gaps = [later - earlier for earlier, later in zip(attempts, attempts[1:])]
+    assert all(gap >= 0.02 * 2 ** i - 1e-3 for i, gap in enumerate(gaps))
+    # Every attempt crashed, was counted and reported
+    assert scheduler.summary()["faulty"]["restarts"] == len(attempts) == len(crashes)
+
+
+def test_callbacks_run_without_the_scheduler_lock():
+    blocked = []
+    scheduler = RateMonotonicScheduler(workers=2)
+
+    def on_alert(name, message):
+        # summary() takes the lock; from another thread it would hang if held
+        reader = threading.Thread(target=scheduler.summary)
+        reader.start()
+        reader.join(1.0)
+        blocked.append(reader.is_alive())
+    scheduler.on_alert = on_alert
+    scheduler.add("busy", lambda: time.sleep(0.002), 0.01, budget=0.001, policy=ALERT)
+    run_for(scheduler, 0.1)
+    assert blocked
+    assert not any(blocked)
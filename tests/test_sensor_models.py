@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from av_datalog import SENSOR_CHANNELS
+from av_sensor_models import ChannelModel, RandomWalk, SensorModel, default_channel_models
+
+
+def values(model, n):
+    return np.array([model.next_values() for _ in range(n)])
+
+
+def test_same_seed_reproduces_the_stream_across_blocks():
+    first = values(SensorModel(3, block_size=256), 1000)
+    assert np.array_equal(first, values(SensorModel(3, block_size=256), 1000))
+    assert not np.array_equal(first, values(SensorModel(4, block_size=256), 1000))
+
+
+@pytest.mark.parametrize("n", [0, 1, 255, 256, 257, 256 * 7 + 13])
+def test_skip_lands_where_stepping_would(n):
+    stepped = SensorModel(3, block_size=256, truth_seed=9)
+    skipped = SensorModel(3, block_size=256, truth_seed=9)
+    values(stepped, 100)
+    values(skipped, 100)
+    values(stepped, n)
+    skipped.skip(n)
+    # Bit for bit, including walk positions and drifted biases carried past skipped blocks
+    assert np.array_equal(values(stepped, 600), values(skipped, 600))
+
+
+def test_sensors_sharing_a_truth_seed_observe_the_same_flight():
+    altitude = SENSOR_CHANNELS.index("altitude")
+    primary = SensorModel(1, block_size=256, truth_seed=0)
+    backup = SensorModel(2, block_size=256, truth_seed=0)
+    # The backup sat in cold standby for a while
+    values(primary, 5000)
+    backup.skip(5000)
+    difference = values(primary, 500)[:, altitude] - values(backup, 500)[:, altitude]
+    # Only independent measurement noise (sigma 1.5 m each, 0.5 m steps) separates them
+    assert abs(difference.mean()) < 0.5
+    assert difference.std() == pytest.approx(1.5 * np.sqrt(2), rel=0.2)
+
+
+def test_channels_stay_within_their_limits():
+    models = default_channel_models()
+    data = values(SensorModel(6, block_size=1024), 20000)
+    for i, name in enumerate(SENSOR_CHANNELS):
+        assert models[name].lo <= data[:, i].min() and data[:, i].max() <= models[name].hi, name
+
+
+def test_random_walk_increments_have_the_configured_spread():
+    channel = ChannelModel(0.0, [RandomWalk(2.0)])
+    model = SensorModel(8, block_size=512, channel_models={name: channel if name == "altitude" else ChannelModel(0.0)
+                                                             for name in SENSOR_CHANNELS})
+    steps = np.diff(values(model, 20000)[:, 0])
+    assert steps.std() == pytest.approx(2.0, rel=0.05)
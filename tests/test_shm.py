@@ -0,0 +1,91 @@
+import time
+
+import numpy as np
+import pytest
+
+from av_datalog import SENSOR_CHANNELS
+from av_redundancy import HOT, SensorRedundancy, SensorUnit
+from av_sensor_models import SensorModel
+from av_shm import SensorProcessError, SensorProducer, SharedFrameRing
+from av_sm1 import SensorData
+
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameRing(capacity=8, create=True)
+    yield ring
+    ring.close()
+
+
+def frame(ring):
+    return np.zeros(1 + ring.n_channels)
+
+
+def test_read_returns_the_newest_complete_frame(ring):
+    out = frame(ring)
+    assert ring.read_latest(out) == 0
+    for seq in range(1, 12):
+        ring.write(seq * 0.01, np.full(ring.n_channels, float(seq)))
+    # The ring wrapped; only the newest slot matters to readers
+    assert ring.read_latest(out) == 11
+    assert out[0] == 0.11
+    assert (out[1:] == 11.0).all()
+
+
+def test_read_rejects_a_slot_being_rewritten(ring):
+    out = frame(ring)
+    ring.write(0.0, np.zeros(ring.n_channels))
+    # The producer has claimed the newest slot but not published it yet
+    ring.seqs[0] = -1
+    with pytest.raises(SensorProcessError):
+        ring.read_latest(out, retries=4)
+    ring.seqs[0] = 1
+    assert ring.read_latest(out) == 1
+
+
+def test_frames_read_from_the_producer_process_are_never_torn():
+    producer = SensorProducer(seed=5, truth_seed=0, period=0.0005)
+    reference = SensorModel(5, truth_seed=0)
+    expected = [reference.next_values()]
+    reader = producer.reader()
+    seen = set()
+    try:
+        producer.start()
+        producer.wait_ready()
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            values = reader.next_values()
+            while len(expected) < reader.seq:
+                expected.append(reference.next_values())
+            # Every field of one frame comes from the same sample
+            assert values == expected[reader.seq - 1]
+            seen.add(reader.seq)
+    finally:
+        producer.stop()
+    assert len(seen) > 10
+    assert len(values) == len(SENSOR_CHANNELS)
+
+
+def test_stalled_producer_fails_over_to_the_backup():
+    units = []
+    for name, seed in (("primary", 1), ("backup", 2)):
+        producer = SensorProducer(seed, truth_seed=0, period=0.005, stale_after=0.05)
+        units.append(SensorUnit(name, SensorData(model=producer.reader()), producer))
+    pair = SensorRedundancy(*units, mode=HOT)
+    primary, backup = units
+    try:
+        pair.start()
+        assert pair.sample() is primary.sensor
+        primary.producer.process.kill()
+        primary.producer.process.join()
+        time.sleep(0.1)
+        assert pair.sample() is backup.sensor
+        assert pair.history[-1].kind == "failover"
+        assert "stalled" in pair.history[-1].reason
+        # The backup keeps producing fresh frames
+        seq = backup.sensor.model.seq
+        time.sleep(0.02)
+        pair.sample()
+        assert backup.sensor.model.seq > seq
+    finally:
+        pair.close()
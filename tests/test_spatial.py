@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from av_route import haversine
+from av_spatial import SpatialIndex, synthetic_points
+
+
+def brute_force(lon, lat, ids, qlon, qlat):
+    # [(great-circle metres, id)] for every point, nearest first
+    distances = haversine(lon, lat, qlon, qlat)
+    return sorted(zip(distances.tolist(), ids))
+
+
+def queries(rng, n=25):
+    # Random locations plus the awkward ones: poles and both sides of the antimeridian
+    lon = np.concatenate((rng.uniform(-180, 180, n), [179.9, -179.9, 0.0, 45.0]))
+    lat = np.concatenate((rng.uniform(-90, 90, n), [0.0, 10.0, 89.99, -89.99]))
+    return zip(lon.tolist(), lat.tolist())
+
+
+def world(n, seed):
+    return synthetic_points(n, (-180.0, 180.0), (-90.0, 90.0), seed)
+
+
+@pytest.mark.parametrize("k", [1, 5, 40])
+def test_nearest_matches_brute_force(k):
+    lon, lat = world(2000, 1)
+    index = SpatialIndex(lon, lat, leaf_size=8)
+    for qlon, qlat in queries(np.random.default_rng(k)):
+        expected = brute_force(lon, lat, range(len(lon)), qlon, qlat)[:k]
+        found = index.nearest(qlon, qlat, k)
+        assert [item for _, item in found] == [item for _, item in expected]
+        np.testing.assert_allclose([d for d, _ in found], [d for d, _ in expected], rtol=1e-9, atol=1e-3)
+
+
+@pytest.mark.parametrize("radius", [1e4, 5e5, 3e6])
+def test_within_matches_brute_force(radius):
+    lon, lat = world(2000, 2)
+    index = SpatialIndex(lon, lat)
+    for qlon, qlat in queries(np.random.default_rng(int(radius))):
+        expected = [hit for hit in brute_force(lon, lat, range(len(lon)), qlon, qlat) if hit[0] <= radius]
+        found = index.within(qlon, qlat, radius)
+        assert [item for _, item in found] == [item for _, item in expected]
+
+
+def test_inserted_points_are_found_before_and_after_the_rebuild():
+    lon, lat = world(1000, 3)
+    extra_lon, extra_lat = world(300, 4)
+    index = SpatialIndex(lon[:500], lat[:500], min_buffer=64, buffer_fraction=0.5)
+    ids = list(range(500))
+    for i in range(500, 1000):
+        index.insert(lon[i], lat[i], i)
+        ids.append(i)
+        if i % 97 == 0:
+            # Some queries run with part of the points still in the insert buffer
+            expected = brute_force(lon[:i + 1], lat[:i + 1], ids, extra_lon[i % 300], extra_lat[i % 300])
+            assert [item for _, item in index.nearest(extra_lon[i % 300], extra_lat[i % 300], 3)] == \
+                [item for _, item in expected[:3]]
+            assert [item for _, item in index.within(extra_lon[i % 300], extra_lat[i % 300], 2e6)] == \
+                [item for d, item in expected if d <= 2e6]
+    assert len(index) == 1000
+
+
+def test_empty_index():
+    index = SpatialIndex()
+    assert index.nearest(0.0, 0.0, 3) == []
+    assert index.within(0.0, 0.0, 1e6) == []
+    index.insert(10.0, 20.0, "EDDF")
+    assert index.nearest(10.0, 20.0) == [(0.0, "EDDF")]
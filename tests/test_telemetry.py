@@ -0,0 +1,161 @@
+import pytest
+
+from av_datalog import sensor_values
+from av_journal import ERROR, INFO, Event
+from av_telemetry import (DATAGRAM_HEADER, DROP_OLDEST, EVENT, FRAME, FRAME_RECORD, PRIORITY, URGENT,
+                          TelemetryCommand, TelemetryDownlink, TelemetryFormatError, TelemetryQueue, TelemetryReceiver,
+                          decode_datagram, parse_address)
+
+
+@pytest.fixture
+def link():
+    receiver = TelemetryReceiver(("127.0.0.1", 0))
+    downlink = TelemetryDownlink(receiver.address)
+    yield downlink, receiver
+    downlink.close()
+    receiver.close()
+
+
+def receive_all(receiver, expected):
+    records = []
+    while len(records) < expected:
+        batch = receiver.receive(1.0)
+        if not batch:
+            break
+        records.extend(batch)
+    return records
+
+
+def test_frames_commands_and_events_round_trip(link, make_frame):
+    downlink, receiver = link
+    frames = [make_frame(i) for i in range(100)]
+    for frame in frames:
+        downlink.send_frame(frame)
+    downlink.send_commands(1.5, {"pitch": 0.1, "roll": 0.2, "yaw": 0.3, "throttle": 0.4})
+    downlink.send_event(Event(2.0, "bite", ERROR, "BITE Test Failed", None))
+    assert downlink.flush() == 102
+    records = receive_all(receiver, 102)
+    assert len(records) == 102
+    assert [sensor_values(r) for r in records[:100]] == [sensor_values(f) for f in frames]
+    assert [r.seq for r in records[:100]] == list(range(100))
+    assert records[100] == TelemetryCommand(1.5, {"pitch": 0.1, "roll": 0.2, "yaw": 0.3, "throttle": 0.4})
+    assert records[101] == Event(2.0, "bite", ERROR, "BITE Test Failed", None)
+    # Many datagrams, none lost
+    assert downlink.datagrams > 1
+    assert receiver.summary()["lost_datagrams"] == 0
+
+
+def test_datagrams_respect_max_size(link, make_frame):
+    downlink, receiver = link
+    per_datagram = (downlink.max_datagram - DATAGRAM_HEADER.size) // FRAME_RECORD.size
+    for i in range(5 * per_datagram):
+        downlink.send_frame(make_frame(i))
+    downlink.flush()
+    assert downlink.datagrams == 5
+    assert downlink.bytes_sent == 5 * (DATAGRAM_HEADER.size + per_datagram * FRAME_RECORD.size)
+    assert len(receive_all(receiver, 5 * per_datagram)) == 5 * per_datagram
+
+
+def test_drop_oldest_accounting():
+    queue = TelemetryQueue(capacity=4, policy=DROP_OLDEST)
+    for i in range(10):
+        assert queue.put(URGENT, (FRAME, i))
+    assert queue.size == 4
+    assert queue.enqueued == 10
+    assert queue.dropped[FRAME] == 6
+    assert [item[1] for level in queue.drain() for item in level] == [6, 7, 8, 9]
+
+
+def test_priority_policy_sends_urgent_records_first(make_frame):
+    receiver = TelemetryReceiver(("127.0.0.1", 0))
+    downlink = TelemetryDownlink(receiver.address, policy=PRIORITY)
+    try:
+        downlink.send_event(Event(0.5, "maintenance", INFO, "oil check", None))
+        downlink.send_frame(make_frame(0))
+        downlink.send_commands(1.5, {"pitch": 0.1, "roll": 0.2, "yaw": 0.3, "throttle": 0.4})
+        downlink.send_event(Event(2.0, "bite", ERROR, "BITE Test Failed", None))
+        downlink.flush()
+        records = receive_all(receiver, 4)
+    finally:
+        downlink.close()
+        receiver.close()
+    assert [type(record).__name__ for record in records] == ["Event", "TelemetryCommand", "SensorFrame", "Event"]
+    assert records[0].severity == ERROR
+
+
+def test_priority_policy_sheds_bulk_before_frames():
+    queue = TelemetryQueue(capacity=3, policy=PRIORITY)
+    queue.put(3, (EVENT, "bulk"))
+    queue.put(2, (FRAME, 1))
+    queue.put(2, (FRAME, 2))
+    assert queue.put(2, (FRAME, 3))
+    assert queue.dropped[EVENT] == 1
+    # Nothing less urgent left to shed: the new bulk event is the one dropped
+    assert not queue.put(3, (EVENT, "late"))
+    assert queue.dropped[EVENT] == 2
+    assert queue.dropped[FRAME] == 0
+
+
+def test_refused_datagrams_count_as_lost(tmp_path, make_frame):
+    downlink = TelemetryDownlink(str(tmp_path / "nobody-listening.sock"))
+    try:
+        downlink.send_frame(make_frame(0))
+        downlink.send_event(Event(0.0, "security", INFO, "scan", None))
+        assert downlink.flush() == 0
+        summary = downlink.summary()
+        assert summary["send_errors"] == 1
+        assert summary["records_lost"] == 2
+    finally:
+        downlink.close()
+
+
+def test_receiver_counts_gaps_in_the_sequence(link, make_frame):
+    downlink, receiver = link
+    downlink.send_frame(make_frame(0))
+    downlink.flush()
+    downlink.sequence += 3
+    downlink.send_frame(make_frame(1))
+    downlink.flush()
+    receive_all(receiver, 2)
+    assert receiver.lost == 3
+
+
+def test_decode_rejects_garbage():
+    with pytest.raises(TelemetryFormatError):
+        decode_datagram(b"AVTM")
+    with pytest.raises(TelemetryFormatError):
+        decode_datagram(b"XXXX" + bytes(16))
+
+
+def test_parse_address():
+    assert parse_address("udp:10.0.0.2:5600") == ("10.0.0.2", 5600)
+    assert parse_address("udp::5600") == ("127.0.0.1", 5600)
+    assert parse_address("unix:/tmp/telemetry.sock") == "/tmp/telemetry.sock"
+    with pytest.raises(ValueError):
+        parse_address("tcp:host:1")
+
+
+def test_long_event_text_is_cut_on_a_character_boundary(link):
+    downlink, receiver = link
+    # Two bytes per character, so odd byte limits fall inside one
+    downlink.send_event(Event(1.0, "ö" * 200, ERROR, "ç" * 1000, None))
+    downlink.flush()
+    [event] = receive_all(receiver, 1)
+    assert event.subsystem == "ö" * 127
+    assert event.message == "ç" * 556
+    assert downlink.bytes_sent <= downlink.max_datagram
+
+
+def test_refused_datagrams_are_reported_once_per_interval(tmp_path, make_frame):
+    downlink = TelemetryDownlink(str(tmp_path / "nobody-listening.sock"), max_datagram=300)
+    try:
+        for i in range(3):
+            downlink.send_frame(make_frame(i))
+        downlink.flush()
+        summary = downlink.summary()
+        # One frame per datagram; the first refusal is logged, the rest wait for the next interval
+        assert summary["send_errors"] == 3
+        assert summary["records_lost"] == 3
+        assert downlink._unreported == 2
+    finally:
+        downlink.close()
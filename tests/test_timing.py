@@ -0,0 +1,29 @@
+from av_timing import LatencyHistogram, TaskMetrics
+
+
+def test_late_starts_measure_start_to_start_intervals():
+    metrics = TaskMetrics("navigation", 0.01)
+    for start in (0.0, 0.01, 0.02, 0.036, 0.046, 0.06):
+        metrics.record(start, 1000)
+    # Only 0.02 -> 0.036 is over one and a half periods
+    assert metrics.late_starts == 1
+    assert metrics.overruns == 0
+    assert metrics.summary()["late_starts"] == 1
+
+
+def test_overrun_when_work_exceeds_the_period():
+    metrics = TaskMetrics("bite", 0.001)
+    metrics.record(0.0, 2_000_000)
+    assert metrics.overruns == 1
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for value in range(1, 1001):
+        histogram.record(value * 1000)
+    assert histogram.count == 1000
+    p50, p99 = histogram.percentiles([50, 99])
+    assert [p50, p99] == [histogram.percentile(50), histogram.percentile(99)]
+    # Upper bucket edges: never below the true value, within the resolution above it
+    assert 500_000 <= p50 <= 500_000 * (1 + 1 / 16)
+    assert 990_000 <= p99 <= 990_000 * (1 + 1 / 16)
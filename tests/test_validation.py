@@ -0,0 +1,43 @@
+import numpy as np
+
+from av_datalog import SENSOR_CHANNELS, sensor_values
+from av_validation import CONTROL_VALIDATOR, NAVIGATION_VALIDATOR, SENSOR_BATCH_VALIDATOR, SENSOR_VALIDATOR
+
+
+def sensor_dict(frame, **changes):
+    fields = frame._asdict()
+    fields.update(changes)
+    return fields
+
+
+def test_sensor_ranges(make_frame):
+    frame = make_frame(1)
+    assert SENSOR_VALIDATOR(sensor_dict(frame))
+    assert not SENSOR_VALIDATOR(sensor_dict(frame, altitude=15000.5))
+    assert SENSOR_VALIDATOR(sensor_dict(frame, altitude=15000.0))
+    assert not SENSOR_VALIDATOR(sensor_dict(frame, gyro=(0.0, 300.0, 0.0)))
+    assert not SENSOR_VALIDATOR(sensor_dict(frame, engine_status="IDLE"))
+    weather = dict(frame.weather, humidity=101.0)
+    assert SENSOR_VALIDATOR.failures(sensor_dict(frame, weather=weather, speed=-1.0)) == ["speed", "weather"]
+
+
+def test_nan_fails_its_range(make_frame):
+    assert not SENSOR_VALIDATOR(sensor_dict(make_frame(1), temperature=float("nan")))
+
+
+def test_control_and_route_ranges():
+    commands = {"pitch": 0.1, "roll": -1.5, "yaw": 1.5, "throttle": 1.0}
+    assert CONTROL_VALIDATOR(commands)
+    assert not CONTROL_VALIDATOR(dict(commands, throttle=1.01))
+    route = [(0.0, 0.0, 100.0), (50.0, 50.0, 10000.0)]
+    assert NAVIGATION_VALIDATOR({"current_position": route[0], "route": route})
+    assert not NAVIGATION_VALIDATOR({"current_position": route[0], "route": route + [(200.0, 0.0, 0.0)]})
+
+
+def test_batch_validator_flags_samples_and_channels(make_frame):
+    data = np.array([sensor_values(make_frame(i)) for i in range(6)]).T
+    data[SENSOR_CHANNELS.index("pressure"), 2] = 700.0
+    data[SENSOR_CHANNELS.index("system_voltage"), 4] = np.nan
+    np.testing.assert_array_equal(SENSOR_BATCH_VALIDATOR.check(data), [True, True, False, True, False, True])
+    assert not SENSOR_BATCH_VALIDATOR(data)
+    assert SENSOR_BATCH_VALIDATOR.failing_channels(data) == ["pressure", "system_voltage"]